@@ -0,0 +1,268 @@
+import tkinter as tk
+from tkinter import ttk
+from collections import OrderedDict
+from datetime import date, timedelta
+
+from db_worker import deliver
+from daily_view import WORKSPACE_DEFAULT, workspace_choices, workspace_of_choice
+from reminder import event_key
+
+AGENDA_DAYS = 14        # 日程视图每段的天数，滚动到底部时追加下一段
+WEEKDAYS = "一二三四五六日"
+
+
+def _fetch_range(db, start, end, workspace, known_seq):
+    """
+    在数据库线程中读取日期范围；数据版本号与 known_seq 相同时不再查询
+    :return: (版本号, 按天分组的结果；未变化时为 None)
+    """
+    seq = db.get_change_seq()
+    if seq == known_seq:
+        return seq, None
+    return seq, db.get_events_by_day(start, end, workspace)
+
+
+class RangeCache:
+    """
+    按日期范围缓存 Database.get_events_by_day 的结果
+    以 get_change_seq 为版本号：看到新版本时丢弃全部旧结果，因此任何写入（包括同步、API）之后都会重新查询
+    """
+    def __init__(self, worker, max_ranges=12):
+        self.worker = worker
+        self.max_ranges = max_ranges
+        self.seq = None                 # 缓存结果所属的数据版本号
+        self._ranges = OrderedDict()    # (start, end, 工作区) -> 按天分组的结果，按最近使用排序
+        self._prefetching = set()
+
+    def load(self, root, start, end, callback, workspace=None):
+        """
+        读取范围，在 Tk 线程中调用 callback(按天分组的结果)
+        已缓存的范围先立即回调一次，再在后台比较版本号，数据有变化时带新结果再回调一次
+        :param workspace: 见 Database.get_events_by_day
+        """
+        key = (start, end, workspace)
+        cached = self._ranges.get(key)
+        if cached is not None:
+            self._ranges.move_to_end(key)
+            callback(cached)
+        known = self.seq if cached is not None else None
+        future = self.worker.submit(_fetch_range, start, end, workspace, known)
+        deliver(root, future, lambda result: self._on_fetched(key, result, cached, callback))
+
+    def prefetch(self, root, start, end, workspace=None):
+        """在后台预取范围放入缓存（已缓存或正在预取时跳过）"""
+        key = (start, end, workspace)
+        if key in self._ranges or key in self._prefetching:
+            return
+        self._prefetching.add(key)
+
+        def done(result):
+            self._prefetching.discard(key)
+            self._on_fetched(key, result, None, None)
+
+        future = self.worker.submit(_fetch_range, start, end, workspace, None)
+        deliver(root, future, done, errback=lambda e: self._prefetching.discard(key))
+
+    def _on_fetched(self, key, result, cached, callback):
+        seq, days = result
+        if days is None:            # 版本未变，缓存的结果仍然有效
+            days = cached
+        self._put(key, seq, days)
+        if callback and days is not cached:
+            callback(days)
+
+    def _put(self, key, seq, days):
+        if self.seq is not None and seq < self.seq:
+            return                  # 比已缓存的结果更旧（晚到的预取），不再缓存
+        if seq != self.seq:
+            self._ranges.clear()
+            self.seq = seq
+        self._ranges[key] = days
+        self._ranges.move_to_end(key)
+        while len(self._ranges) > self.max_ranges:
+            self._ranges.popitem(last=False)
+
+
+def _date_str(d):
+    return d.strftime("%Y-%m-%d")
+
+
+class AgendaView:
+    """周视图和日程视图：整段日期一次查询、按天分组显示，结果按范围缓存，日程滚动时在后台预取下一段"""
+    def __init__(self, parent, db, app_callback, worker):
+        self.parent = parent
+        self.db = db
+        self.app_callback = app_callback  # 双击日期或事项时跳转到今日视图
+        self.worker = worker
+        self.cache = RangeCache(worker)
+        self._load_seq = 0                # 切换周、模式或工作区时加一，丢弃之前的回调
+        self.workspace = None             # 显示的工作区，见 daily_view.workspace_of_choice
+
+        today = date.today()
+        self.week_start = today - timedelta(days=today.weekday())
+        self.chunks = []                  # 日程视图已显示的各段 (start, end)
+        self._extending = False
+
+        self.frame = ttk.Frame(parent)
+        self.frame.pack(fill=tk.BOTH, expand=True)
+
+        nav_frame = ttk.Frame(self.frame)
+        nav_frame.pack(fill=tk.X, padx=5, pady=5)
+        self.prev_btn = ttk.Button(nav_frame, text="< 上一周", command=lambda: self.move_week(-1))
+        self.prev_btn.pack(side=tk.LEFT, padx=2)
+        ttk.Button(nav_frame, text="今天", command=self.go_today).pack(side=tk.LEFT, padx=2)
+        self.range_label = ttk.Label(nav_frame, text="", font=("Arial", 12, "bold"))
+        self.range_label.pack(side=tk.LEFT, expand=True)
+        self.loading_label = ttk.Label(nav_frame, text="", foreground="gray")
+        self.loading_label.pack(side=tk.LEFT, padx=5)
+        self.next_btn = ttk.Button(nav_frame, text="下一周 >", command=lambda: self.move_week(1))
+        self.next_btn.pack(side=tk.RIGHT, padx=2)
+        choices = workspace_choices(self.db)
+        if len(choices) > 1:
+            self.workspace_var = tk.StringVar(value=WORKSPACE_DEFAULT)
+            workspace_box = ttk.Combobox(nav_frame, textvariable=self.workspace_var, values=choices,
+                                         state="readonly", width=10)
+            workspace_box.pack(side=tk.RIGHT, padx=5)
+            workspace_box.bind("<<ComboboxSelected>>",
+                               lambda e: self.set_workspace(workspace_of_choice(self.workspace_var.get())))
+        self.mode_var = tk.StringVar(value="week")
+        ttk.Radiobutton(nav_frame, text="日程", variable=self.mode_var, value="agenda",
+                        command=self.reload).pack(side=tk.RIGHT, padx=2)
+        ttk.Radiobutton(nav_frame, text="周", variable=self.mode_var, value="week",
+                        command=self.reload).pack(side=tk.RIGHT, padx=2)
+
+        tree_frame = ttk.Frame(self.frame)
+        tree_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.tree = ttk.Treeview(tree_frame, columns=("time", "status"), show="tree headings", height=15)
+        self.tree.heading("#0", text="日期 / 标题")
+        self.tree.heading("time", text="时间")
+        self.tree.heading("status", text="状态")
+        self.tree.column("#0", width=260)
+        self.tree.column("time", width=120)
+        self.tree.column("status", width=120)
+        self.tree.tag_configure("day", background="#f0f0f0")
+        self.tree.tag_configure("today", background="#fff2e0")
+
+        self.v_scroll = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_yscroll)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.v_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.tree.bind("<Double-1>", self.on_double_click)
+
+        self.reload()
+
+    # ---------- 导航 ----------
+    def move_week(self, step):
+        self.week_start += timedelta(days=7 * step)
+        self.reload()
+
+    def set_workspace(self, workspace):
+        self.workspace = workspace
+        self.reload()
+
+    def go_today(self):
+        today = date.today()
+        self.week_start = today - timedelta(days=today.weekday())
+        self.reload()
+
+    def reload(self):
+        """清空列表，按当前模式从头加载"""
+        self._load_seq += 1
+        self.tree.delete(*self.tree.get_children())
+        self.chunks = []
+        self._extending = False
+        week = self.mode_var.get() == "week"
+        for btn in (self.prev_btn, self.next_btn):
+            btn.state(["!disabled"] if week else ["disabled"])
+        if week:
+            end = self.week_start + timedelta(days=6)
+            self.range_label.config(text=f"{_date_str(self.week_start)} ~ {_date_str(end)}")
+            self._load(self.week_start, end)
+        else:
+            self.range_label.config(text="日程")
+            self._extend(date.today())
+
+    def refresh(self):
+        """数据可能已变化（有写入）：重新读取已显示的范围，版本号未变时不重绘"""
+        if self.mode_var.get() == "week":
+            self._load(self.week_start, self.week_start + timedelta(days=6))
+        else:
+            for start, end in self.chunks:
+                self._load(start, end)
+
+    def _load(self, start, end):
+        seq = self._load_seq
+        self.loading_label.config(text="加载中…")
+
+        def on_loaded(days):
+            if seq != self._load_seq:
+                return
+            self.loading_label.config(text="")
+            self._render_days(days)
+            self._extending = False
+            self._prefetch_around(start, end)
+
+        self.cache.load(self.frame, _date_str(start), _date_str(end), on_loaded, self.workspace)
+
+    def _extend(self, start):
+        """日程视图追加从 start 开始的一段"""
+        self._extending = True
+        end = start + timedelta(days=AGENDA_DAYS - 1)
+        self.chunks.append((start, end))
+        self._load(start, end)
+
+    def _prefetch_around(self, start, end):
+        """预取接下来可能查看的范围：周视图为前后两周，日程视图为下一段"""
+        if self.mode_var.get() == "week":
+            for step in (-7, 7):
+                self.cache.prefetch(self.frame, _date_str(start + timedelta(days=step)),
+                                    _date_str(end + timedelta(days=step)), self.workspace)
+        elif self.chunks:
+            last_end = self.chunks[-1][1]
+            self.cache.prefetch(self.frame, _date_str(last_end + timedelta(days=1)),
+                                _date_str(last_end + timedelta(days=AGENDA_DAYS)), self.workspace)
+
+    def _on_yscroll(self, first, last):
+        self.v_scroll.set(first, last)
+        # 日程视图滚动到接近底部时追加下一段（多半已预取到缓存中）
+        if self.mode_var.get() == "agenda" and self.chunks and not self._extending and float(last) > 0.9:
+            self._extend(self.chunks[-1][1] + timedelta(days=1))
+
+    # ---------- 显示 ----------
+    def _render_days(self, days):
+        """按天显示事件；已显示的日期原地更新，其余追加到末尾"""
+        today = _date_str(date.today())
+        for day, events in days:
+            d = date.fromisoformat(day)
+            text = f"{d.month}月{d.day}日 周{WEEKDAYS[d.weekday()]}" + ("（今天）" if day == today else "")
+            done = sum(1 for e in events if e['day_completed'])
+            summary = f"{done}/{len(events)} 完成" if events else "无事项"
+            tags = ("day", "today") if day == today else ("day",)
+            if self.tree.exists(day):
+                self.tree.item(day, text=text, values=("", summary), tags=tags)
+                self.tree.delete(*self.tree.get_children(day))
+            else:
+                self.tree.insert("", tk.END, iid=day, text=text, values=("", summary), tags=tags, open=True)
+            for event in events:
+                title = f"[{event['workspace']}] {event['title']}" if event['workspace'] else event['title']
+                self.tree.insert(day, tk.END, iid=f"{day}/{event_key(event['id'], event['workspace'])}",
+                                 text=title,
+                                 values=(self._time_text(event), self._status_text(event)))
+
+    @staticmethod
+    def _time_text(event):
+        if event['start_time'] and event['end_time']:
+            return f"{event['start_time']} - {event['end_time']}"
+        return event['start_time'] or ""
+
+    @staticmethod
+    def _status_text(event):
+        if event['end_date'] is None or event['end_date'] == event['start_date']:
+            return "已完成" if event['day_completed'] else "未完成"
+        return "已提交进度" if event['day_completed'] else "未提交进度"
+
+    def on_double_click(self, event):
+        item = self.tree.identify_row(event.y)
+        if item and self.app_callback:
+            self.app_callback(item.split("/")[0])
@@ -0,0 +1,103 @@
+"""
+API 服务压力测试：多个保持连接的并发客户端循环请求，统计每秒请求数和延迟
+
+命令行用法：
+    python api_loadtest.py [--url http://127.0.0.1:8765] [--concurrency 32] [--duration 10]
+                           [--path /api/day/2026-02-18 --path /api/month/2026-02] [--etag] [--token 口令]
+--etag 时客户端记住每个路径的 ETag 并携带 If-None-Match，用于对比 304 的效果。
+"""
+import asyncio
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from urllib.parse import urlsplit
+
+
+async def _client(host, port, paths, deadline, use_etag, token, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    etags = {}
+    i = 0
+    try:
+        while time.perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            lines = [f"GET {path} HTTP/1.1", f"Host: {host}:{port}"]
+            if use_etag and path in etags:
+                lines.append(f"If-None-Match: {etags[path]}")
+            if token:
+                lines.append(f"Authorization: Bearer {token}")
+            started = time.perf_counter()
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+            await writer.drain()
+
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                name = name.strip().lower()
+                if name == 'content-length':
+                    length = int(value)
+                elif name == 'etag':
+                    etags[path] = value.strip()
+            if length:
+                await reader.readexactly(length)
+            latencies.append(time.perf_counter() - started)
+            statuses[status] += 1
+    finally:
+        writer.close()
+
+
+async def run(url, concurrency, duration, paths, use_etag=False, token=None):
+    """
+    执行压力测试
+    :return: 字典，包含 requests, rps, statuses, p50/p95/p99（毫秒）
+    """
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    latencies, statuses = [], Counter()
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(_client(host, port, paths, deadline, use_etag, token, latencies, statuses)
+                           for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0
+
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed,
+        'statuses': dict(statuses),
+        'p50': percentile(0.50),
+        'p95': percentile(0.95),
+        'p99': percentile(0.99),
+    }
+
+
+def main(argv=None):
+    import argparse
+    today = datetime.now()
+    parser = argparse.ArgumentParser(description="API 服务压力测试")
+    parser.add_argument('--url', default='http://127.0.0.1:8765', help="服务地址")
+    parser.add_argument('--concurrency', type=int, default=32, help="并发连接数")
+    parser.add_argument('--duration', type=float, default=10, help="持续秒数")
+    parser.add_argument('--path', action='append', help="请求路径，可多次指定（轮流请求）")
+    parser.add_argument('--etag', action='store_true', help="携带 If-None-Match")
+    parser.add_argument('--token', help="访问口令")
+    args = parser.parse_args(argv)
+    paths = args.path or [f"/api/day/{today:%Y-%m-%d}", f"/api/month/{today:%Y-%m}",
+                          f"/api/events?date={today:%Y-%m-%d}"]
+
+    result = asyncio.run(run(args.url, args.concurrency, args.duration, paths, args.etag, args.token))
+    print(f"请求数 {result['requests']}，{result['rps']:.0f} 次/秒", file=sys.stderr)
+    print(f"延迟 p50 {result['p50']:.1f} ms，p95 {result['p95']:.1f} ms，p99 {result['p99']:.1f} ms", file=sys.stderr)
+    print("状态码 " + "，".join(f"{code}: {n}" for code, n in sorted(result['statuses'].items())), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
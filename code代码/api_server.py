@@ -0,0 +1,485 @@
+"""
+本地 JSON API 服务（asyncio），供编辑器插件、脚本或局域网内的手机读写待办事项
+
+读请求由固定数量的只读连接处理（每个连接一个 DBWorker 线程，同一时间只执行一个请求），
+写请求全部交给唯一的写线程串行执行。启动时把数据库切换为 WAL 模式，读写互不阻塞。
+日视图和月汇总带 ETag（取自 Database.get_change_seq），客户端携带 If-None-Match 且
+数据未变时返回 304；服务端同时按版本号缓存响应，数据未变时不再查询。
+
+接口（请求体和响应均为 JSON）：
+    GET    /api/version                       数据版本号
+    GET    /api/events?date=YYYY-MM-DD        某天的事件
+    GET    /api/events?from=...&to=...        日期范围内的事件
+    POST   /api/events                        新建事件，返回 {"id": ...}
+    GET    /api/events/{id}
+    PATCH  /api/events/{id}                   修改部分字段
+    DELETE /api/events/{id}
+    GET    /api/events/{id}/progress          某事件的全部进度
+    PUT    /api/events/{id}/progress/{date}   提交进度 {"value": 60, "completed": 1}
+    GET    /api/day/{date}                    今日视图（含状态列），支持 ETag
+    GET    /api/month/{yyyy-mm}               每日汇总，支持 ETag
+    GET    /api/timers                        正在进行的计时任务（嵌入程序运行时可用）
+    GET    /api/metrics                       界面命令队列的等待时长（嵌入程序运行时可用）
+
+命令行用法（独立运行）：
+    python api_server.py [--host 127.0.0.1] [--port 8765] [--readers 4] [--token 口令]
+也可以在主程序中启动：python main.py --api 8765
+监听局域网地址时请设置 --token，请求需携带 Authorization: Bearer <口令>。
+"""
+import asyncio
+import calendar
+import json
+import re
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from db_worker import DBWorker
+
+EVENT_FIELDS = ('title', 'description', 'start_date', 'end_date', 'start_time', 'end_time',
+                'completed', 'is_recurring', 'recurring_rule')
+_TIME = re.compile(r'^([01]\d|2[0-3]):[0-5]\d$')   # HH:MM，与界面和提醒使用的格式一致
+MAX_BODY = 1024 * 1024      # 请求体上限（字节）
+IDLE_TIMEOUT = 30           # 保持连接的空闲超时（秒）
+
+
+class HttpError(Exception):
+    def __init__(self, status, message=None):
+        super().__init__(message or HTTPStatus(status).phrase)
+        self.status = status
+
+
+class Request:
+    def __init__(self, method, target, headers, body):
+        url = urlsplit(target)
+        self.method = method
+        self.path = url.path.rstrip('/') or '/'
+        self.query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        try:
+            data = json.loads(self.body.decode('utf-8')) if self.body else None
+        except (UnicodeDecodeError, ValueError):
+            raise HttpError(400, "请求体不是有效的 JSON")
+        if not isinstance(data, dict):
+            raise HttpError(400, "请求体应为 JSON 对象")
+        return data
+
+
+def _check_date(value, fmt="%Y-%m-%d"):
+    # 要求补零的标准格式（strptime 也接受 2026-1-5），日期按字符串比较和建索引
+    try:
+        valid = datetime.strptime(value, fmt).strftime(fmt) == value
+    except (TypeError, ValueError):
+        valid = False
+    if not valid:
+        raise HttpError(400, f"日期格式错误: {value}")
+    return value
+
+
+def _event_fields(data, partial=False):
+    """
+    检查事件的字段名和取值，不合法时返回 400（格式不对的日期会从每日汇总、日历和今日视图中消失）
+    :param partial: 为 True（PATCH）时只检查提供的字段，否则 title 和 start_date 必填
+    """
+    unknown = set(data) - set(EVENT_FIELDS)
+    if unknown:
+        raise HttpError(400, f"未知字段: {', '.join(sorted(unknown))}")
+    if not partial:
+        missing = [field for field in ('title', 'start_date') if field not in data]
+        if missing:
+            raise HttpError(400, f"缺少字段: {', '.join(missing)}")
+    if 'title' in data and not (isinstance(data['title'], str) and data['title'].strip()):
+        raise HttpError(400, "title 不能为空")
+    if 'start_date' in data:
+        _check_date(data['start_date'])
+    if data.get('end_date') is not None:
+        _check_date(data['end_date'])
+    for field in ('start_time', 'end_time'):
+        value = data.get(field)
+        if value not in (None, '') and not (isinstance(value, str) and _TIME.match(value)):
+            raise HttpError(400, f"{field} 应为 HH:MM 格式: {value}")
+    for field in ('completed', 'is_recurring'):
+        if field in data and data[field] not in (0, 1):
+            raise HttpError(400, f"{field} 应为 0 或 1")
+    _check_date_range(data.get('start_date'), data.get('end_date'))
+    return data
+
+
+def _check_date_range(start, end):
+    if start and end and end < start:
+        raise HttpError(400, f"end_date 不能早于 start_date: {end} < {start}")
+
+
+# ---------- 在数据库线程中执行的函数 ----------
+def _list_events(db, date, start, end):
+    if date:
+        return db.get_events_by_date(date)
+    return list(db.iter_events_between(start, end))
+
+
+def _update_event(db, event_id, data):
+    event = db.get_event(event_id)
+    if event is None:
+        return None
+    # 只修改一个日期时，与另一个现有日期比较（写入都在这个线程中，检查与写入之间不会被插入修改）
+    merged = {**event, **data}
+    _check_date_range(merged['start_date'], merged['end_date'])
+    if not db.update_event(event_id, data):
+        return None
+    return db.get_event(event_id)
+
+
+def _event_progress(db, event_id):
+    if db.get_event(event_id) is None:
+        return None
+    return db.get_progress_by_event(event_id)
+
+
+def _put_progress(db, event_id, date, value, completed):
+    if db.get_event(event_id) is None:
+        return None
+    existing = db.get_progress_for_event_and_date(event_id, date)
+    if existing:
+        db.update_progress(existing['id'], {'value': value, 'completed': completed})
+        return existing['id']
+    return db.add_progress({'event_id': event_id, 'date': date, 'value': value, 'completed': completed})
+
+
+class ReaderPool:
+    """固定数量的只读数据库连接，请求排队等待空闲连接"""
+
+    def __init__(self, db_path, size):
+        # 表结构已由写连接初始化，读连接只需打开数据库
+        self.workers = [DBWorker(db_path, name=f"api-reader-{i}", init_schema=False) for i in range(size)]
+        for worker in self.workers:
+            worker.submit(lambda db: db.conn.execute("PRAGMA query_only = 1").fetchall())
+        self._idle = asyncio.Queue()
+        for worker in self.workers:
+            self._idle.put_nowait(worker)
+
+    async def run(self, func, *args):
+        worker = await self._idle.get()
+        try:
+            return await asyncio.wrap_future(worker.submit(func, *args))
+        finally:
+            self._idle.put_nowait(worker)
+
+    def stop(self):
+        for worker in self.workers:
+            worker.stop(wait=False)
+
+
+class ApiServer:
+    def __init__(self, db_path='todo.db', host='127.0.0.1', port=8765, readers=4, token=None,
+                 timer_provider=None, metrics_provider=None, cache_size=256):
+        """
+        :param readers: 只读连接数
+        :param token: 访问口令，为空表示不校验
+        :param timer_provider: 返回计时任务列表的函数（如 TimerManager.snapshot），独立运行时为空
+        :param metrics_provider: 返回界面命令等待时长统计的函数（如 UiDispatcher.stats），独立运行时为空
+        :param cache_size: 日视图 / 月汇总响应缓存的条目数
+        """
+        self.db_path = db_path
+        self.host = host
+        self.port = port
+        self.reader_count = readers
+        self.token = token
+        self.timer_provider = timer_provider
+        self.metrics_provider = metrics_provider
+        self.cache_size = cache_size
+        self._cache = OrderedDict()     # 路径 -> (版本号, 响应体)
+        self._loop = None
+        self._stopping = None
+        self._thread = None
+        self._ready = threading.Event()
+        self.readers = None
+        self.writer = None
+        self.error = None               # 启动失败的原因（如端口被占用）
+
+        self.routes = [
+            ('GET', r'/api/version', self.get_version),
+            ('GET', r'/api/events', self.list_events),
+            ('POST', r'/api/events', self.create_event),
+            ('GET', r'/api/events/(\d+)', self.get_event),
+            ('PATCH', r'/api/events/(\d+)', self.update_event),
+            ('DELETE', r'/api/events/(\d+)', self.delete_event),
+            ('GET', r'/api/events/(\d+)/progress', self.get_progress),
+            ('PUT', r'/api/events/(\d+)/progress/([\d-]+)', self.put_progress),
+            ('GET', r'/api/day/([\d-]+)', self.get_day),
+            ('GET', r'/api/month/([\d-]+)', self.get_month),
+            ('GET', r'/api/timers', self.get_timers),
+            ('GET', r'/api/metrics', self.get_metrics),
+        ]
+        self.routes = [(method, re.compile(pattern), handler) for method, pattern, handler in self.routes]
+
+    # ---------- 启动与停止 ----------
+    def start(self):
+        """在后台线程中运行（嵌入主程序），监听成功后返回"""
+        self._thread = threading.Thread(target=self.serve_forever, name="api-server", daemon=True)
+        self._thread.start()
+        self._ready.wait(10)
+        if self.error:
+            raise self.error
+        return self
+
+    def serve_forever(self):
+        """在当前线程中运行，直到 stop() 被调用"""
+        try:
+            asyncio.run(self._main())
+        except OSError as e:
+            self.error = e
+            raise
+        finally:
+            self._ready.set()
+
+    def stop(self):
+        if self._loop and self._stopping:
+            self._loop.call_soon_threadsafe(self._stopping.set)
+
+    async def _main(self):
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        self.writer = DBWorker(self.db_path, name="api-writer")
+        try:
+            # WAL 模式下读连接不阻塞写入（设置会保存在数据库文件中）
+            await self._write(lambda db: db.conn.execute("PRAGMA journal_mode = WAL").fetchone())
+            self.readers = ReaderPool(self.db_path, self.reader_count)
+            server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+            self.port = server.sockets[0].getsockname()[1]
+            self._ready.set()
+            async with server:
+                await self._stopping.wait()
+        finally:
+            if self.readers:
+                self.readers.stop()
+            self.writer.stop(wait=False)
+
+    # ---------- 连接处理 ----------
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), IDLE_TIMEOUT)
+                except HttpError as e:
+                    await self._send(writer, e.status, _encode({'error': str(e)}), {}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                keep_alive = request.headers.get('connection', '').lower() != 'close'
+                status, body, headers = await self._dispatch(request)
+                await self._send(writer, status, body, headers, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_request(reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode('latin-1').split()
+        except ValueError:
+            raise HttpError(400)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            if len(headers) >= 100:
+                raise HttpError(431)
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if version == 'HTTP/1.0' and headers.get('connection', '').lower() != 'keep-alive':
+            headers['connection'] = 'close'
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HttpError(400)
+        if length > MAX_BODY:
+            raise HttpError(413)
+        body = await reader.readexactly(length) if length else b''
+        return Request(method.upper(), target, headers, body)
+
+    @staticmethod
+    async def _send(writer, status, body, headers, keep_alive):
+        lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+                 f"Content-Length: {len(body)}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if body:
+            lines.append("Content-Type: application/json; charset=utf-8")
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+    async def _dispatch(self, request):
+        """找到路由并执行，返回 (状态码, 响应体, 额外响应头)"""
+        if self.token and request.headers.get('authorization') != f"Bearer {self.token}":
+            return 401, _encode({'error': "口令错误"}), {'WWW-Authenticate': 'Bearer'}
+        allowed = []
+        for method, pattern, handler in self.routes:
+            match = pattern.fullmatch(request.path)
+            if not match:
+                continue
+            if method != request.method:
+                allowed.append(method)
+                continue
+            try:
+                result = await handler(request, *match.groups())
+            except HttpError as e:
+                return e.status, _encode({'error': str(e)}), {}
+            except ValueError as e:     # Database 的参数校验
+                return 400, _encode({'error': str(e)}), {}
+            except sqlite3.IntegrityError as e:
+                return 409, _encode({'error': str(e)}), {}
+            except Exception as e:
+                print(f"API 请求处理失败: {request.method} {request.path}: {e}", file=sys.stderr)
+                return 500, _encode({'error': "服务器内部错误"}), {}
+            if len(result) == 2:
+                return result[0], result[1], {}
+            return result
+        if allowed:
+            return 405, _encode({'error': "不支持的请求方法"}), {'Allow': ', '.join(allowed)}
+        return 404, _encode({'error': "接口不存在"}), {}
+
+    async def _read(self, func, *args):
+        return await self.readers.run(func, *args)
+
+    async def _write(self, func, *args):
+        return await asyncio.wrap_future(self.writer.submit(func, *args))
+
+    async def _cached(self, request, func, *args):
+        """
+        带 ETag 的读取：版本号未变时直接返回 304 或缓存的响应体
+        先取版本号再查数据，并发写入时最多让客户端多下载一次，不会把旧数据标成新版本
+        """
+        version = await self._read(lambda db: db.get_change_seq())
+        etag = f'"{version}"'
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if_none_match = request.headers.get('if-none-match', '')
+        if if_none_match == '*' or etag in (tag.strip() for tag in if_none_match.split(',')):
+            return 304, b'', headers
+
+        hit = self._cache.get(request.path)
+        if hit and hit[0] == version:
+            self._cache.move_to_end(request.path)
+            return 200, hit[1], headers
+        body = _encode(await self._read(func, *args))
+        self._cache[request.path] = (version, body)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return 200, body, headers
+
+    # ---------- 接口 ----------
+    async def get_version(self, request):
+        return 200, _encode({'version': await self._read(lambda db: db.get_change_seq())})
+
+    async def list_events(self, request):
+        date = request.query.get('date')
+        start, end = request.query.get('from'), request.query.get('to')
+        if date:
+            _check_date(date)
+        elif start and end:
+            _check_date(start), _check_date(end)
+        else:
+            raise HttpError(400, "需要 date 参数，或 from 和 to 参数")
+        return 200, _encode(await self._read(_list_events, date, start, end))
+
+    async def create_event(self, request):
+        data = _event_fields(request.json())
+        event_id = await self._write(lambda db: db.add_event(data))
+        return 201, _encode({'id': event_id}), {'Location': f"/api/events/{event_id}"}
+
+    async def get_event(self, request, event_id):
+        event = await self._read(lambda db: db.get_event(int(event_id)))
+        if event is None:
+            raise HttpError(404, "事件不存在")
+        return 200, _encode(event)
+
+    async def update_event(self, request, event_id):
+        data = _event_fields(request.json(), partial=True)
+        event = await self._write(_update_event, int(event_id), data)
+        if event is None:
+            raise HttpError(404, "事件不存在")
+        return 200, _encode(event)
+
+    async def delete_event(self, request, event_id):
+        if not await self._write(lambda db: db.delete_event(int(event_id))):
+            raise HttpError(404, "事件不存在")
+        return 204, b''
+
+    async def get_progress(self, request, event_id):
+        progress = await self._read(_event_progress, int(event_id))
+        if progress is None:
+            raise HttpError(404, "事件不存在")
+        return 200, _encode(progress)
+
+    async def put_progress(self, request, event_id, date):
+        _check_date(date)
+        data = request.json()
+        if not isinstance(data.get('value'), (int, float)):
+            raise HttpError(400, "value 应为数字")
+        progress_id = await self._write(_put_progress, int(event_id), date, data['value'],
+                                        int(data.get('completed', 1)))
+        if progress_id is None:
+            raise HttpError(404, "事件不存在")
+        return 200, _encode({'id': progress_id})
+
+    async def get_day(self, request, date):
+        _check_date(date)
+        return await self._cached(request, lambda db: {'date': date, 'events': db.get_day_view(date)})
+
+    async def get_month(self, request, month):
+        _check_date(month, "%Y-%m")
+        year, mon = map(int, month.split('-'))
+        first = f"{month}-01"
+        last = f"{month}-{calendar.monthrange(year, mon)[1]:02d}"
+        return await self._cached(request, lambda db: {'month': month, 'days': db.get_daily_summary(first, last)})
+
+    async def get_timers(self, request):
+        if self.timer_provider is None:
+            return 200, _encode({'available': False, 'timers': []})
+        return 200, _encode({'available': True, 'timers': self.timer_provider()})
+
+    async def get_metrics(self, request):
+        if self.metrics_provider is None:
+            return 200, _encode({'available': False, 'dispatch': {}})
+        return 200, _encode({'available': True, 'dispatch': self.metrics_provider()})
+
+
+def _encode(obj):
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="待办事项本地 JSON API 服务")
+    parser.add_argument('--db', default='todo.db', help="数据库文件路径")
+    parser.add_argument('--host', default='127.0.0.1', help="监听地址，局域网访问可用 0.0.0.0")
+    parser.add_argument('--port', type=int, default=8765, help="监听端口")
+    parser.add_argument('--readers', type=int, default=4, help="只读连接数")
+    parser.add_argument('--token', help="访问口令")
+    args = parser.parse_args(argv)
+    if args.host not in ('127.0.0.1', 'localhost') and not args.token:
+        print("警告：监听非本机地址但未设置 --token，任何人都可以修改数据", file=sys.stderr)
+
+    server = ApiServer(args.db, args.host, args.port, args.readers, args.token)
+    print(f"API 服务运行在 http://{args.host}:{args.port}/api/ （Ctrl+C 退出）", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+冷热分离：把早已完成的历史事件移到归档库 todo_archive.db
+
+今日视图等日常查询只扫描主库；Database 的读取接口在查询日期早于归档截止日期时
+才会合并归档库（见 Database._select_events）。归档按批次在事务中进行，
+完成后对主库执行 incremental_vacuum 回收空间。
+
+命令行用法：
+    python archive.py [--days 180] [--batch 500]
+"""
+import sys
+from datetime import date, timedelta
+
+from database import Database
+
+
+def enable_incremental_vacuum(db):
+    """
+    确保主库为 auto_vacuum=INCREMENTAL
+    旧数据库需要执行一次 VACUUM 才能切换，之后每次归档只需 incremental_vacuum
+    """
+    mode = db.conn.execute("PRAGMA main.auto_vacuum").fetchone()[0]
+    if mode != 2:
+        db.conn.execute("PRAGMA main.auto_vacuum = INCREMENTAL")
+        db.conn.execute("VACUUM main")
+
+
+def archive_completed(db, horizon_days=180, batch_size=500, progress=None):
+    """
+    归档结束日期早于 horizon_days 天前且已完成的事件（连同其进度）
+    :param horizon_days: 保留在主库中的天数
+    :param batch_size: 每个事务搬移的事件数
+    :param progress: 回调 progress(已归档事件数)
+    :return: 归档的事件总数
+    """
+    cutoff = (date.today() - timedelta(days=horizon_days)).strftime("%Y-%m-%d")
+    db.attach_archive(create=True)
+    total = 0
+    while True:
+        rows = db.conn.execute('''
+            SELECT id FROM main.events
+            WHERE completed = 1 AND COALESCE(end_date, start_date) < ?
+            LIMIT ?
+        ''', (cutoff, batch_size)).fetchall()
+        if not rows:
+            break
+        total += db.move_events([row[0] for row in rows], to_archive=True)
+        if progress:
+            progress(total)
+
+    if total:
+        enable_incremental_vacuum(db)
+        db.conn.execute("PRAGMA main.incremental_vacuum")
+    return total
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="归档已完成的历史事件")
+    parser.add_argument('--db', default='todo.db', help="数据库文件路径")
+    parser.add_argument('--days', type=int, default=180, help="主库保留最近多少天的已完成事件")
+    parser.add_argument('--batch', type=int, default=500, help="每个事务归档的事件数")
+    args = parser.parse_args(argv)
+
+    with Database(args.db) as db:
+        count = archive_completed(
+            db, args.days, args.batch,
+            progress=lambda n: print(f"\r已归档 {n} 个事件", end='', file=sys.stderr, flush=True))
+        print(f"\n归档完成，共 {count} 个事件，归档库：{db.archive_path}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
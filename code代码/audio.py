@@ -0,0 +1,154 @@
+"""
+提醒声音服务：在后台线程初始化混音器、预先解码声音，播放时不阻塞界面
+
+声音解码为 pygame.mixer.Sound 后按路径缓存，按解码后占用的内存做 LRU 淘汰（默认声音常驻）。
+pygame 未安装或没有音频设备时（如无声卡的测试机）静默跳过播放。
+"""
+import os
+import queue
+import threading
+import warnings
+from collections import OrderedDict
+
+# 隐藏 pygame 欢迎信息，忽略 pygame.pkgdata 模块中的 UserWarning（弃用警告）
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+warnings.filterwarnings("ignore", category=UserWarning, module="pygame.pkgdata")
+
+try:
+    import pygame
+except ImportError:
+    pygame = None
+
+# 默认提醒声音，按顺序取第一个存在的文件
+DEFAULT_SOUNDS = ("resources/reminder.mp3", "resources/reminder.wav", r"C:\Windows\Media\Alarm01.wav")
+
+
+def find_default_sound(candidates=DEFAULT_SOUNDS):
+    for path in candidates:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+class AudioService:
+    def __init__(self, default_sound=None, max_cache_bytes=32 * 1024 * 1024):
+        """
+        :param default_sound: 默认提醒声音，为空时在 DEFAULT_SOUNDS 中查找
+        :param max_cache_bytes: 已解码声音缓存的内存上限（字节）
+        """
+        self.default_sound = default_sound
+        self.max_cache_bytes = max_cache_bytes
+        self.available = False          # 混音器是否可用
+        self.error = None               # 不可用的原因
+        self._cache = OrderedDict()     # 路径 -> (Sound, 字节数)
+        self._cache_bytes = 0
+        self._requests = queue.Queue()
+        self._thread = None
+
+    def start(self):
+        """启动音频线程（初始化混音器并预加载默认声音）"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="audio", daemon=True)
+            self._thread.start()
+        return self
+
+    def play(self, path=None):
+        """播放声音（立即返回），path 为空或文件不存在时播放默认声音"""
+        self._requests.put(('play', path))
+
+    def stop(self):
+        self._requests.put(('stop', None))
+
+    def preload(self, path):
+        """提前解码并缓存声音，如事项设置了自定义提醒声音时"""
+        self._requests.put(('load', path))
+
+    def close(self):
+        self._requests.put(None)
+
+    # ---------- 音频线程 ----------
+    def _run(self):
+        self._init_mixer()
+        if self.available and self.default_sound:
+            self._load(self.default_sound)
+        while True:
+            item = self._requests.get()
+            if item is None:
+                break
+            if not self.available:
+                continue
+            action, path = item
+            try:
+                if action == 'play':
+                    self._play(path)
+                elif action == 'stop':
+                    self._stop_all()
+                else:
+                    self._load(path)
+            except Exception as e:
+                print(f"播放声音失败: {e}")
+        if self.available:
+            pygame.mixer.quit()
+
+    def _init_mixer(self):
+        if self.default_sound is None:
+            self.default_sound = find_default_sound()
+            if self.default_sound is None:
+                print("音频文件错误，请配置音频文件reminder.mp3到resources")
+        if pygame is None:
+            self.error = "未安装 pygame"
+            return
+        try:
+            pygame.mixer.init()
+            self.available = True
+        except pygame.error as e:
+            self.error = str(e)
+
+    def _load(self, path):
+        """返回已解码的 Sound；无法解码为 Sound 时返回 None"""
+        entry = self._cache.get(path)
+        if entry:
+            self._cache.move_to_end(path)
+            return entry[0]
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            sound = pygame.mixer.Sound(path)
+        except pygame.error:
+            return None
+        size = self._sound_bytes(sound)
+        if size > self.max_cache_bytes:
+            return sound
+        self._cache[path] = (sound, size)
+        self._cache_bytes += size
+        for old in list(self._cache):
+            if self._cache_bytes <= self.max_cache_bytes:
+                break
+            if old != self.default_sound:
+                self._cache_bytes -= self._cache.pop(old)[1]
+        return sound
+
+    @staticmethod
+    def _sound_bytes(sound):
+        """解码后的 PCM 数据大小（不复制数据，按时长和混音器格式计算）"""
+        frequency, fmt, channels = pygame.mixer.get_init()
+        return int(sound.get_length() * frequency * channels * (abs(fmt) // 8))
+
+    def _play(self, path):
+        if not path or not os.path.exists(path):
+            path = self.default_sound
+        if not path:
+            return
+        self._stop_all()  # 先停止正在播放的声音（避免重叠）
+        sound = self._load(path)
+        if sound is not None:
+            sound.play()
+        else:
+            # 无法解码为 Sound 的格式退回流式播放
+            pygame.mixer.music.load(path)
+            pygame.mixer.music.play()
+
+    @staticmethod
+    def _stop_all():
+        pygame.mixer.stop()
+        pygame.mixer.music.stop()
@@ -0,0 +1,329 @@
+"""
+在线备份：使用 SQLite 备份 API 分步复制数据库，程序运行时也能得到一致的快照
+
+备份在独立线程和独立连接上进行，每复制 pages_per_step 页休眠片刻，
+不占用 Tk 线程，计时器和提醒不会卡顿。分步复制期间其他连接（程序、API、同步）写入时，
+SQLite 会从头重新复制；重新开始超过 MAX_RESTARTS 次后改为一步复制完，写入频繁时也能结束。快照带时间戳，按数量轮换。
+归档库和登记的工作区数据库与主库在同一次备份中复制，文件名带同一时间戳：
+    todo-20260219-080000.db           主库
+    todo-20260219-080000.archive.db   归档库 todo_archive.db
+    todo-20260219-080000.ws-工作.db    工作区“工作”
+校验、恢复、轮换都按整组处理。
+
+命令行用法：
+    python backup.py backup [--dir backups] [--keep 7]
+    python backup.py list [--dir backups]
+    python backup.py verify backups/todo-20260219-080000.db
+    python backup.py restore backups/todo-20260219-080000.db   # 请先退出程序
+"""
+import glob
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# 分步复制因源库被写入而从头开始的次数上限，超过后改为一步复制完
+MAX_RESTARTS = 3
+
+
+class _TooManyRestarts(Exception):
+    """分步复制重新开始的次数超过上限"""
+
+
+def snapshot_prefix(db_path):
+    """快照文件名前缀，如 todo.db -> todo"""
+    return os.path.splitext(os.path.basename(db_path))[0]
+
+
+_STAMPED = re.compile(r'-\d{8}-\d{6}\.db$')
+
+
+def list_snapshots(db_path, backup_dir):
+    """返回该数据库的所有主库快照路径（不含同组的归档库、工作区快照），按时间从旧到新排列"""
+    pattern = os.path.join(backup_dir, f"{snapshot_prefix(db_path)}-*.db")
+    return sorted(path for path in glob.glob(pattern) if _STAMPED.search(path))
+
+
+def archive_path_of(db_path):
+    """主库对应的归档库路径（与 Database.archive_path 一致）"""
+    root, ext = os.path.splitext(db_path)
+    return f"{root}_archive{ext or '.db'}"
+
+
+def companion_databases(db_path):
+    """
+    与主库一起备份的数据库：归档库和 workspaces 表中登记的工作区（只含存在的文件）
+    :return: [(快照后缀, 文件路径), ...]，后缀为 'archive' 或 'ws-<工作区名>'
+    """
+    result = []
+    archive = archive_path_of(db_path)
+    if os.path.exists(archive):
+        result.append(('archive', archive))
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute("SELECT name, path FROM workspaces ORDER BY name").fetchall()
+    except sqlite3.OperationalError:
+        rows = []       # 旧数据库没有 workspaces 表
+    finally:
+        conn.close()
+    result += [(f"ws-{name}", path) for name, path in rows if os.path.exists(path)]
+    return result
+
+
+def companion_snapshots(snapshot):
+    """主库快照同组的其他快照：{后缀: 路径}"""
+    stem = snapshot[:-len('.db')]
+    return {path[len(stem) + 1:-len('.db')]: path
+            for path in sorted(glob.glob(glob.escape(stem) + ".*.db"))}
+
+
+def _copy_database(src_path, tmp, pages_per_step, on_step, max_restarts=MAX_RESTARTS):
+    """
+    用备份 API 把 src_path 复制到临时文件 tmp
+    每步之间源库被其他连接修改时，SQLite 从第一页重新复制（剩余页数回升），写入频繁时可能一直复制不完。
+    重新开始超过 max_restarts 次后改为一步复制：复制期间持有读锁，写入方等待锁释放
+    （受其 busy timeout 限制；数据库只有几十 MB 时只需零点几秒），快照仍然一致
+    :return: 重新开始的次数
+    """
+    state = {'remaining': None, 'restarts': 0}
+
+    def step(status, remaining, total):
+        if state['remaining'] is not None and remaining > state['remaining']:
+            state['restarts'] += 1
+            if state['restarts'] > max_restarts:
+                raise _TooManyRestarts()    # 回调中抛出异常会中止本次备份
+        state['remaining'] = remaining
+        on_step(status, remaining, total)
+
+    src = sqlite3.connect(src_path)
+    dst = sqlite3.connect(tmp)
+    try:
+        try:
+            src.backup(dst, pages=pages_per_step, progress=step)
+        except _TooManyRestarts:
+            src.backup(dst, pages=-1)
+        return state['restarts']
+    finally:
+        dst.close()
+        src.close()
+
+
+def backup_database(db_path, backup_dir, pages_per_step=256, step_sleep=0.005, progress=None):
+    """
+    生成一组快照（主库及 companion_databases 中的归档库、工作区，时间戳相同）
+    先全部写入临时文件，完成后再改名（主库快照最后改名），中途失败不会留下残缺的一组
+    :param pages_per_step: 每步复制的页数
+    :param step_sleep: 每步之间的休眠秒数，让出数据库锁和 CPU
+    :param progress: 回调 progress(剩余页数, 总页数)
+    :return: 主库快照路径
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    target = os.path.join(backup_dir, f"{snapshot_prefix(db_path)}-{stamp}.db")
+    files = [(path, f"{target[:-len('.db')]}.{suffix}.db") for suffix, path in companion_databases(db_path)]
+    files.append((db_path, target))
+
+    def on_step(status, remaining, total):
+        if progress:
+            progress(remaining, total)
+        if remaining and step_sleep:
+            time.sleep(step_sleep)
+
+    written = []
+    try:
+        for src_path, final in files:
+            written.append(final + ".part")
+            _copy_database(src_path, written[-1], pages_per_step, on_step)
+    except BaseException:
+        for tmp in written:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        raise
+    for _, final in files:
+        os.replace(final + ".part", final)
+    return target
+
+
+def rotate_snapshots(db_path, backup_dir, keep):
+    """只保留最新的 keep 组快照，返回删除的文件列表"""
+    snapshots = list_snapshots(db_path, backup_dir)
+    removed = []
+    for snapshot in (snapshots[:-keep] if keep > 0 else []):
+        # 先删同组的其他快照，中途失败时主库快照还在，下次轮换会再删
+        for path in list(companion_snapshots(snapshot).values()) + [snapshot]:
+            os.remove(path)
+            removed.append(path)
+    return removed
+
+
+def verify_snapshot(path):
+    """
+    检查一组快照（主库及同组的归档库、工作区快照）的完整性
+    :param path: 主库快照路径
+    :return: (是否通过, 说明)
+    """
+    ok, message = _verify_file(path)
+    if not ok:
+        return False, message
+    details = [message]
+    for suffix, companion in companion_snapshots(path).items():
+        ok, message = _verify_file(companion)
+        if not ok:
+            return False, f"{os.path.basename(companion)}: {message}"
+        details.append(f"{_companion_name(suffix)}{message}")
+    return True, "完整，" + "；".join(details)
+
+
+def _companion_name(suffix):
+    return "归档库" if suffix == 'archive' else f"工作区 {suffix[len('ws-'):]} "
+
+
+def _verify_file(path):
+    """检查单个快照文件，返回 (是否通过, 说明)"""
+    if not os.path.exists(path):
+        return False, "文件不存在"
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+            if result != 'ok':
+                return False, result
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+            missing = {'events', 'progress'} - tables
+            if missing:
+                return False, f"缺少表: {', '.join(sorted(missing))}"
+            count = conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError as e:
+        return False, str(e)
+    return True, f"共 {count} 个事件"
+
+
+def restore_snapshot(path, db_path, pages_per_step=256):
+    """
+    用一组快照覆盖数据库（整组校验通过后才执行，同样使用备份 API 写入，不直接替换文件）
+    归档库恢复到主库旁的 *_archive.db，工作区恢复到快照中 workspaces 表登记的路径；
+    快照里没有归档库而现在有时，现有归档库改名为 *.before-restore，避免与恢复后的主库重复
+    :param path: 主库快照路径
+    :return: 恢复的文件路径列表
+    """
+    ok, message = verify_snapshot(path)
+    if not ok:
+        raise ValueError(f"快照校验失败: {message}")
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        workspaces = dict(conn.execute("SELECT name, path FROM workspaces").fetchall())
+    except sqlite3.OperationalError:
+        workspaces = {}
+    finally:
+        conn.close()
+
+    targets = [(path, db_path)]
+    companions = companion_snapshots(path)
+    for suffix, companion in companions.items():
+        if suffix == 'archive':
+            targets.append((companion, archive_path_of(db_path)))
+        elif suffix[len('ws-'):] in workspaces:
+            targets.append((companion, workspaces[suffix[len('ws-'):]]))
+    archive = archive_path_of(db_path)
+    if 'archive' not in companions and os.path.exists(archive):
+        os.replace(archive, archive + ".before-restore")
+
+    for src_path, dst_path in targets:
+        src = sqlite3.connect(f"file:{src_path}?mode=ro", uri=True)
+        dst = sqlite3.connect(dst_path)
+        try:
+            src.backup(dst, pages=pages_per_step)
+        finally:
+            dst.close()
+            src.close()
+    return [dst_path for _, dst_path in targets]
+
+
+class BackupService:
+    """定时备份服务：后台线程按间隔生成快照并轮换"""
+
+    def __init__(self, db_path='todo.db', backup_dir='backups', interval_hours=24, keep=7,
+                 pages_per_step=256, step_sleep=0.005):
+        self.db_path = db_path
+        self.backup_dir = backup_dir
+        self.interval = interval_hours * 3600
+        self.keep = keep
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="backup", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _seconds_until_due(self):
+        """距离下次备份的秒数（以最新快照的修改时间为准）"""
+        snapshots = list_snapshots(self.db_path, self.backup_dir)
+        if not snapshots:
+            return 0
+        age = time.time() - os.path.getmtime(snapshots[-1])
+        return max(0, self.interval - age)
+
+    def _run(self):
+        while not self._stop.wait(self._seconds_until_due()):
+            self.backup_now()
+
+    def backup_now(self):
+        """立即备份一次（在调用线程中执行），返回快照路径，失败返回 None"""
+        try:
+            path = backup_database(self.db_path, self.backup_dir, self.pages_per_step, self.step_sleep)
+            rotate_snapshots(self.db_path, self.backup_dir, self.keep)
+            self.last_error = None
+            return path
+        except (sqlite3.Error, OSError) as e:
+            self.last_error = e
+            print(f"备份失败: {e}")
+            # 出错后等待一段时间再重试，避免连续失败占满 CPU
+            self._stop.wait(60)
+            return None
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="数据库在线备份")
+    parser.add_argument('--db', default='todo.db', help="数据库文件路径")
+    parser.add_argument('--dir', default='backups', help="快照目录")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_backup = sub.add_parser('backup', help="立即生成快照")
+    p_backup.add_argument('--keep', type=int, default=7, help="保留的快照数量")
+    sub.add_parser('list', help="列出快照")
+    p_verify = sub.add_parser('verify', help="校验快照")
+    p_verify.add_argument('snapshot')
+    p_restore = sub.add_parser('restore', help="从快照恢复（请先退出程序）")
+    p_restore.add_argument('snapshot')
+    args = parser.parse_args(argv)
+
+    if args.command == 'backup':
+        path = backup_database(args.db, args.dir)
+        rotate_snapshots(args.db, args.dir, args.keep)
+        print(f"已备份到 {path}")
+    elif args.command == 'list':
+        for path in list_snapshots(args.db, args.dir):
+            files = [path] + list(companion_snapshots(path).values())
+            print(f"{path}\t{sum(os.path.getsize(f) for f in files)} 字节（{len(files)} 个文件）")
+    elif args.command == 'verify':
+        ok, message = verify_snapshot(args.snapshot)
+        print(("通过：" if ok else "失败：") + message)
+        raise SystemExit(0 if ok else 1)
+    else:
+        for path in restore_snapshot(args.snapshot, args.db):
+            print(f"已从快照恢复 {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+写入路径微基准：测量 add_event / update_event / add_progress / update_progress 的单次调用开销
+
+对照组“动态拼接”按调用方字典的键顺序每次重新拼接 SQL（改造前的写法）：键顺序不同就是
+不同的语句，语句种类超过 sqlite3 的语句缓存后每次调用都要重新编译（本库的表上有十几个触发器，
+编译一条写入语句需要几十微秒）。Database 按白名单的固定顺序生成 SQL，同一组字段只有一条语句。
+
+命令行用法：
+    python bench_writes.py [-n 100000] [--db bench_writes.db]
+数据库文件会被清空重建；默认关闭同步写盘，测量的是调用本身而不是磁盘。
+"""
+import itertools
+import os
+import sys
+import time
+
+from database import Database
+
+EVENT_UPDATE_SHAPES = [
+    ('completed', 'end_time'),
+    ('title', 'description', 'start_time', 'end_time'),
+    ('start_date', 'end_date', 'title', 'description', 'start_time', 'end_time', 'completed'),
+]
+
+
+def _legacy_update(conn, table, row_id, data):
+    """改造前的写法：按字典键顺序拼接 SQL"""
+    set_clause = ','.join([f"{key}=?" for key in data])
+    with conn:
+        return conn.execute(f"UPDATE {table} SET {set_clause} WHERE id=?", list(data.values()) + [row_id]).rowcount
+
+
+def _update_payloads(n, orders_per_shape=1000):
+    """生成 n 个更新字典：三种字段组合，每种组合的键顺序轮流变化"""
+    values = {'completed': 0, 'end_time': '18:00', 'title': '标题', 'description': '描述',
+              'start_time': '09:00', 'start_date': '2026-03-01', 'end_date': None}
+    orders = [list(itertools.islice(itertools.permutations(shape), orders_per_shape))
+              for shape in EVENT_UPDATE_SHAPES]
+    payloads = []
+    for i in range(n):
+        shape_orders = orders[i % len(orders)]
+        order = shape_orders[(i // len(orders)) % len(shape_orders)]
+        payloads.append({key: values[key] for key in order})
+    return payloads, sum(len(o) for o in orders)
+
+
+def _measure(label, n, func, quiet=False):
+    started = time.perf_counter()
+    for i in range(n):
+        func(i)
+    elapsed = time.perf_counter() - started
+    if not quiet:
+        print(f"{label:<24}{n:>8} 次  {elapsed:7.2f} s  {elapsed / n * 1e6:8.1f} µs/次")
+    return elapsed / n
+
+
+def run(n=100000, db_path='bench_writes.db', rounds=3):
+    for path in (db_path, db_path + '-wal', db_path + '-shm'):
+        if os.path.exists(path):
+            os.remove(path)
+    db = Database(db_path)
+    db.conn.execute("PRAGMA synchronous = OFF")
+
+    print(f"单行写入（每次一个事务，语句缓存 {db.STATEMENT_CACHE_SIZE} 条）")
+    _measure("add_event", n, lambda i: db.add_event(
+        {'title': f"事项{i}", 'start_date': f"2026-{i % 12 + 1:02d}-{i % 28 + 1:02d}", 'start_time': '09:00'}))
+    ids = [row[0] for row in db.conn.execute("SELECT id FROM events ORDER BY id")]
+    payloads, shapes = _update_payloads(n)
+    _measure("update_event", n, lambda i: db.update_event(ids[i % len(ids)], payloads[i]))
+    _measure("add_progress", n, lambda i: db.add_progress(
+        {'event_id': ids[i % len(ids)], 'date': '2026-06-01', 'value': i, 'completed': 1}))
+    progress_ids = [row[0] for row in db.conn.execute("SELECT id FROM progress ORDER BY id")]
+    _measure("update_progress", n, lambda i: db.update_progress(
+        progress_ids[i % len(progress_ids)], {'value': i} if i % 2 else {'completed': 0, 'value': i}))
+
+    # 两种写法交替测量多轮取最好成绩，排除数据增长带来的先后差异
+    m = max(1, n // rounds)
+    fixed, legacy = [], []
+    for r in range(rounds):
+        fixed.append(_measure("", m, lambda i: db.update_event(ids[i % len(ids)], payloads[i]), quiet=True))
+        legacy.append(_measure("", m, lambda i: _legacy_update(db.conn, 'events', ids[i % len(ids)], payloads[i]),
+                               quiet=True))
+    print(f"\n键顺序不固定的更新（3 组字段，{shapes} 种键顺序），{rounds} 轮取最好")
+    print(f"{'update_event（固定语句）':<24}{min(fixed) * 1e6:8.1f} µs/次")
+    print(f"{'动态拼接（对照）':<24}{min(legacy) * 1e6:8.1f} µs/次")
+    db.close()
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="写入路径微基准")
+    parser.add_argument('-n', type=int, default=100000, help="每项测量的调用次数")
+    parser.add_argument('--db', default='bench_writes.db', help="基准测试使用的数据库文件（会被清空）")
+    args = parser.parse_args(argv)
+    if os.path.abspath(args.db) == os.path.abspath('todo.db'):
+        sys.exit("请不要在 todo.db 上运行基准测试")
+    run(args.n, args.db)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,18 @@
 import tkinter as tk
 from tkinter import ttk
 import calendar
-from datetime import datetime, timedelta,date
+from datetime import datetime
+from db_worker import deliver
 
 class CalendarView:
     """日历视图"""
-    def __init__(self, parent, db, app_callback):
+    def __init__(self, parent, db, app_callback, worker):
         self.parent = parent
         self.db = db
         self.app_callback = app_callback
+        self.worker = worker              # 后台数据库线程
+        self._draw_seq = 0                # 绘制序号，丢弃过期的查询结果
+        self._click_seq = 0
 
         self.current_year = datetime.now().year
         self.current_month = datetime.now().month
@@ -27,6 +31,9 @@ class CalendarView:
         self.month_label = ttk.Label(nav_frame, text="", font=("Arial", 12, "bold"))
         self.month_label.pack(side=tk.LEFT, expand=True)
 
+        self.loading_label = ttk.Label(nav_frame, text="", foreground="gray")
+        self.loading_label.pack(side=tk.LEFT, padx=5)
+
         next_btn = ttk.Button(nav_frame, text="下个月 >", command=self.next_month)
         next_btn.pack(side=tk.RIGHT, padx=2)
 
@@ -81,60 +88,35 @@ class CalendarView:
             self.current_month += 1
         self.draw_calendar()
 
-    def get_event_dates_in_month(self, year, month):
-        """返回指定月份内有事件的所有日期（包括多天项目覆盖的每一天）"""
-        # 获取当月所有事件（单日 + 多天）
-        all_events = self.db.get_all_events()
-        event_dates = set()
-
-        # 计算当月第一天和最后一天
-        first_day = date(year, month, 1)
-        if month == 12:
-            last_day = date(year+1, 1, 1) - timedelta(days=1)
-        else:
-            last_day = date(year, month+1, 1) - timedelta(days=1)
-
-        for ev in all_events:
-            start = datetime.strptime(ev['start_date'], "%Y-%m-%d").date()
-            if ev['end_date']:
-                end = datetime.strptime(ev['end_date'], "%Y-%m-%d").date()
-            else:
-                end = start
-
-            # 如果事件区间与当月有交集
-            if end >= first_day and start <= last_day:
-                # 交集起始
-                intersect_start = max(start, first_day)
-                intersect_end = min(end, last_day)
-                current = intersect_start
-                while current <= intersect_end:
-                    event_dates.add(current.strftime("%Y-%m-%d"))
-                    current += timedelta(days=1)
-
-        return event_dates
+    @staticmethod
+    def get_event_dates_in_month(db, year, month):
+        """返回指定月份内有事件的所有日期（包括多天项目覆盖的每一天），在数据库线程中执行"""
+        last_day = calendar.monthrange(year, month)[1]
+        return db.get_event_dates_in_range(f"{year:04d}-{month:02d}-01", f"{year:04d}-{month:02d}-{last_day:02d}")
 
     def draw_calendar(self):
+        """先绘制空白网格，事件日期在后台查询完成后再着色"""
         # 清除旧网格
         for widget in self.calendar_frame.winfo_children():
             widget.destroy()
 
         self.month_label.config(text=f"{self.current_year}年{self.current_month:02d}月")
 
-        cal = calendar.monthcalendar(self.current_year, self.current_month)
-        event_dates = self.get_event_dates_in_month(self.current_year, self.current_month)
+        year, month = self.current_year, self.current_month
+        cal = calendar.monthcalendar(year, month)
+        self.day_labels = {}
 
         for r, week in enumerate(cal):
             for c, day in enumerate(week):
                 if day == 0:
                     label = ttk.Label(self.calendar_frame, text="", relief="solid", borderwidth=1)
                 else:
-                    date_str = f"{self.current_year:04d}-{self.current_month:02d}-{day:02d}"
-                    has_event = date_str in event_dates
-                    bg_color = "lightblue" if has_event else "white"
+                    date_str = f"{year:04d}-{month:02d}-{day:02d}"
                     label = tk.Label(self.calendar_frame, text=str(day), relief="solid", borderwidth=1,
-                                     bg=bg_color, font=("Arial", 10))
+                                     bg="white", font=("Arial", 10))
                     label.bind("<Button-1>", lambda e, d=date_str: self.on_date_click(d))
                     label.bind("<Double-Button-1>", lambda e, d=date_str: self.on_date_double_click(d))
+                    self.day_labels[date_str] = label
 
                 label.grid(row=r, column=c, padx=1, pady=1, sticky="nsew")
                 self.calendar_frame.grid_rowconfigure(r, weight=1)
@@ -144,31 +126,36 @@ class CalendarView:
         for item in self.event_tree.get_children():
             self.event_tree.delete(item)
 
+        self._draw_seq += 1
+        seq = self._draw_seq
+        self.loading_label.config(text="加载中…")
+        future = self.worker.submit(self.get_event_dates_in_month, year, month)
+        deliver(self.frame, future, lambda dates: self._on_dates_loaded(seq, dates))
+
+    def _on_dates_loaded(self, seq, event_dates):
+        """事件日期查询完成回调（Tk 线程），为有事件的日期着色"""
+        if seq != self._draw_seq:
+            return
+        self.loading_label.config(text="")
+        for date_str in event_dates:
+            label = self.day_labels.get(date_str)
+            if label is not None:
+                label.config(bg="lightblue")
+
     def on_date_click(self, date_str):
         self.selected_date = date_str
-        events = self.db.get_events_by_date(date_str)
+        self._click_seq += 1
+        seq = self._click_seq
+        future = self.worker.submit(_query_date_rows, date_str)
+        deliver(self.frame, future, lambda rows: self._on_date_rows_loaded(seq, rows))
+
+    def _on_date_rows_loaded(self, seq, rows):
+        if seq != self._click_seq:
+            return
         for item in self.event_tree.get_children():
             self.event_tree.delete(item)
-        for ev in events:
-            time_str = ""
-            if ev['start_time']:
-                time_str = ev['start_time']
-                if ev['end_time']:
-                    time_str += f"-{ev['end_time']}"
-            # 判断多天项目
-            if ev['end_date'] and ev['end_date'] != ev['start_date']:
-                progress = self.db.get_progress_for_event_and_date(ev['id'], date_str)
-                if progress:
-                    status = f"已提交 ({progress['value']}%)"
-                else:
-                    latest = self.db.get_latest_progress_before_date(ev['id'], date_str)
-                    if latest:
-                        status = f"自动延续 ({latest['value']}%)"
-                    else:
-                        status = "未提交"
-            else:
-                status = "已完成" if ev['completed'] else "未完成"
-            self.event_tree.insert("", tk.END, iid=ev['id'], values=(ev['title'], time_str, status))
+        for event_id, values in rows:
+            self.event_tree.insert("", tk.END, iid=event_id, values=values)
 
     def on_date_double_click(self, date_str):
         if self.app_callback:
@@ -178,4 +165,30 @@ class CalendarView:
         selected = self.event_tree.selection()
         if selected and self.selected_date:
             if self.app_callback:
-                self.app_callback(self.selected_date)
\ No newline at end of file
+                self.app_callback(self.selected_date)
+
+
+def _query_date_rows(db, date_str):
+    """在数据库线程中执行：获取某日事件列表的 (id, 显示值) 行"""
+    rows = []
+    for ev in db.get_events_by_date(date_str):
+        time_str = ""
+        if ev['start_time']:
+            time_str = ev['start_time']
+            if ev['end_time']:
+                time_str += f"-{ev['end_time']}"
+        # 判断多天项目
+        if ev['end_date'] and ev['end_date'] != ev['start_date']:
+            progress = db.get_progress_for_event_and_date(ev['id'], date_str)
+            if progress:
+                status = f"已提交 ({progress['value']}%)"
+            else:
+                latest = db.get_latest_progress_before_date(ev['id'], date_str)
+                if latest:
+                    status = f"自动延续 ({latest['value']}%)"
+                else:
+                    status = "未提交"
+        else:
+            status = "已完成" if ev['completed'] else "未完成"
+        rows.append((ev['id'], (ev['title'], time_str, status)))
+    return rows
@@ -0,0 +1,112 @@
+"""
+时钟与定时器抽象：计时管理器、提醒检查通过它获取时间和设置定时回调
+
+SystemClock 使用系统时间和 Tk 的 after（程序正常运行时）；
+VirtualClock 的时间只在调用 advance() / run_until() 时前进，到期回调按时间顺序同步执行，
+无需界面即可快进模拟数周的运行（见 soak.py）。
+"""
+import heapq
+import itertools
+import time
+import tkinter as tk
+from datetime import datetime, timedelta
+
+
+class SystemClock:
+    """系统时钟：时间取自系统，定时回调交给 Tk 主循环"""
+    def __init__(self, root=None):
+        """
+        :param root: Tk 根窗口，为空时使用默认根窗口（没有根窗口时不设置定时，返回 None）
+        """
+        self._root = root
+
+    @property
+    def root(self):
+        return self._root or tk._default_root
+
+    def now(self):
+        """当前本地时间（datetime）"""
+        return datetime.now()
+
+    def monotonic(self):
+        """单调时间（秒），用于计算时长"""
+        return time.monotonic()
+
+    def after(self, ms, func):
+        root = self.root
+        return root.after(ms, func) if root else None
+
+    def after_idle(self, func):
+        root = self.root
+        return root.after_idle(func) if root else None
+
+    def after_cancel(self, after_id):
+        try:
+            self.root.after_cancel(after_id)
+        except (tk.TclError, AttributeError):
+            pass
+
+
+class VirtualClock:
+    """虚拟时钟：时间只在 advance() / run_until() 时前进，到期回调在调用线程中按时间顺序执行"""
+    def __init__(self, start=None):
+        """
+        :param start: 虚拟时间的起点（datetime），默认为当前时间
+        """
+        self.start = start or datetime.now()
+        self.elapsed = 0.0          # 起点之后经过的秒数
+        self.calls = 0              # 已执行的回调数
+        self.errors = 0             # 回调抛出异常的次数（与 Tk 一样只记录，不中断）
+        self.last_error = None
+        self._queue = []            # 小顶堆 (到期秒数, after ID)
+        self._pending = {}          # after ID -> 回调，取消时删除
+        self._ids = itertools.count(1)
+
+    def now(self):
+        return self.start + timedelta(seconds=self.elapsed)
+
+    def monotonic(self):
+        return self.elapsed
+
+    def after(self, ms, func):
+        after_id = next(self._ids)
+        self._pending[after_id] = func
+        heapq.heappush(self._queue, (self.elapsed + ms / 1000, after_id))
+        return after_id
+
+    def after_idle(self, func):
+        # 排在当前时刻已到期的回调之后
+        return self.after(0, func)
+
+    def after_cancel(self, after_id):
+        self._pending.pop(after_id, None)
+
+    @property
+    def pending(self):
+        """尚未执行的定时回调数"""
+        return len(self._pending)
+
+    def advance(self, seconds):
+        """前进 seconds 秒，期间到期的回调依次执行"""
+        self.run_until(self.elapsed + seconds)
+
+    def run_until(self, target):
+        """
+        执行到期时间不晚于 target 的回调（包括回调中新设置的），然后把时间停在 target
+        :param target: 起点之后的秒数，或 datetime
+        """
+        if isinstance(target, datetime):
+            target = (target - self.start).total_seconds()
+        while self._queue and self._queue[0][0] <= target:
+            due, after_id = heapq.heappop(self._queue)
+            func = self._pending.pop(after_id, None)
+            if func is None:
+                continue
+            self.elapsed = max(self.elapsed, due)
+            self.calls += 1
+            try:
+                func()
+            except Exception as e:
+                self.errors += 1
+                self.last_error = e
+        self.elapsed = max(self.elapsed, target)
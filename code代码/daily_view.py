@@ -1,8 +1,11 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from datetime import datetime, timedelta
 
 import sys
+from database import Database
+from db_worker import deliver
+from reminder import event_key
 
 if sys.platform == 'win32':
     font_family = '微软雅黑'
@@ -19,15 +22,34 @@ def center_window(reference, child):
     y = ref.winfo_rooty() + (ref.winfo_height() - child.winfo_height()) // 2
     child.geometry(f"+{x}+{y}")
 
+WORKSPACE_DEFAULT = "（默认）"
+WORKSPACE_ALL = "（全部）"
+
+
+def workspace_choices(db):
+    """工作区下拉框的选项：默认工作区、已附加的各工作区，有工作区时再加上合并显示的“全部”"""
+    names = sorted(db.list_workspaces())
+    return [WORKSPACE_DEFAULT] + names + ([WORKSPACE_ALL] if names else [])
+
+
+def workspace_of_choice(choice):
+    """下拉框选项 -> Database 查询的 workspace 参数"""
+    if choice == WORKSPACE_ALL:
+        return Database.ALL_WORKSPACES
+    return None if choice == WORKSPACE_DEFAULT else choice
+
 class DailyView:
     """当日规划视图"""
-    def __init__(self, parent, db, app):
+    def __init__(self, parent, db, app, worker):
         self.parent = parent
         self.db = db
         self.app = app
+        self.worker = worker          # 后台数据库线程，查询不阻塞界面
         self.current_date = datetime.now().strftime("%Y-%m-%d")
         self.sort_column = None      # 当前排序列
         self.sort_reverse = False     # 排序方向
+        self._load_seq = 0            # 加载序号，丢弃过期的查询结果
+        self.workspace = None         # 显示的工作区：None 为默认，ALL_WORKSPACES 为合并显示全部
 
         # 创建主框架
         self.frame = ttk.Frame(parent)
@@ -40,6 +62,20 @@ class DailyView:
         self.date_label = ttk.Label(top_frame, text=f"日期：{self.current_date}", font=("Arial", 12))
         self.date_label.pack(side=tk.LEFT, padx=5)
 
+        self.loading_label = ttk.Label(top_frame, text="", foreground="gray")
+        self.loading_label.pack(side=tk.LEFT, padx=5)
+
+        # 工作区选择（登记了其他工作区时才显示）
+        choices = workspace_choices(self.db)
+        if len(choices) > 1:
+            self.workspace_var = tk.StringVar(value=WORKSPACE_DEFAULT)
+            ttk.Label(top_frame, text="工作区：").pack(side=tk.LEFT, padx=(10, 0))
+            workspace_box = ttk.Combobox(top_frame, textvariable=self.workspace_var, values=choices,
+                                         state="readonly", width=10)
+            workspace_box.pack(side=tk.LEFT)
+            workspace_box.bind("<<ComboboxSelected>>",
+                               lambda e: self.set_workspace(workspace_of_choice(self.workspace_var.get())))
+
         add_btn = ttk.Button(top_frame, text="添加事项", command=self.add_event)
         add_btn.pack(side=tk.RIGHT, padx=5)
 
@@ -98,73 +134,50 @@ class DailyView:
         progress_btn = ttk.Button(bottom_frame, text="提交进度", command=self.submit_progress)
         progress_btn.pack(side=tk.LEFT, padx=2)
 
+        chart_btn = ttk.Button(bottom_frame, text="进度图", command=self.open_progress_chart)
+        chart_btn.pack(side=tk.LEFT, padx=2)
+
+        sound_btn = ttk.Button(bottom_frame, text="提醒声音", command=self.set_reminder_sound)
+        sound_btn.pack(side=tk.LEFT, padx=2)
+
         # 初始加载事项
         self.load_events()
 
     def load_events(self):
-        """从数据库加载当天事项，并根据当前排序重新填充"""
-        events = self.db.get_events_by_date(self.current_date)
-        if self.sort_column:
-            events = self._sort_events(events, self.sort_column, self.sort_reverse)
-        self._fill_tree(events)
+        """重新加载当天事项并刷新日历"""
+        self._load_list()
         # 刷新日历
         if hasattr(self.app, 'refresh_calendar'):
             self.app.refresh_calendar()
 
+    def _load_list(self):
+        """在后台线程按当前排序查询当天事项（排序和状态列都在一条 SQL 中完成），完成后重新填充"""
+        self._load_seq += 1
+        seq = self._load_seq
+        self.loading_label.config(text="加载中…")
+        future = self.worker.call('get_day_view', self.current_date, self.sort_column, self.sort_reverse,
+                                  self.workspace)
+        deliver(self.frame, future, lambda events: self._on_events_loaded(seq, events))
+
+    def _on_events_loaded(self, seq, events):
+        """查询完成回调（Tk 线程），忽略已被新请求取代的结果"""
+        if seq != self._load_seq:
+            return
+        self.loading_label.config(text="")
+        self._fill_tree(events)
+
     def _fill_tree(self, events):
-        """根据事件列表填充Treeview"""
+        """根据事件列表填充Treeview（状态已由 Database.get_day_view 计算）"""
         for item in self.tree.get_children():
             self.tree.delete(item)
 
         for ev in events:
-            is_multi_day = ev['end_date'] is not None and ev['end_date'] != ev['start_date']
-
-            if is_multi_day:
-                progress = self.db.get_progress_for_event_and_date(ev['id'], self.current_date)
-                if progress:
-                    status = f"已提交 ({progress['value']}%)"
-                else:
-                    latest = self.db.get_latest_progress_before_date(ev['id'], self.current_date)
-                    if latest:
-                        status = f"自动延续 ({latest['value']})"
-                    else:
-                        status = "未提交"
-            else:
-                status = "已完成" if ev['completed'] else "未完成"
-
             start = ev['start_time'] if ev['start_time'] else ""
             end = ev['end_time'] if ev['end_time'] else ""
-            self.tree.insert("", tk.END, iid=ev['id'], values=(ev['title'], start, end, status))
-
-    def _sort_events(self, events, col, reverse):
-        """对事件列表进行排序"""
-        if col == "title":
-            # 按标题排序，实际是按添加顺序（id）
-            events.sort(key=lambda x: x['id'], reverse=reverse)
-        elif col == "start_time":
-            def time_key(ev):
-                t = ev.get('start_time')
-                if not t:
-                    return (1, None)  # 空值放最后
-                try:
-                    hour, minute = map(int, t.split(':'))
-                    return (0, hour * 60 + minute)  # 有效时间按分钟数排序
-                except:
-                    return (1, None)  # 格式错误放最后
-            events.sort(key=time_key, reverse=reverse)
-        elif col == "status":
-            def status_key(ev):
-                # 对于多天项目，当天是否完成由进度决定
-                if ev['end_date'] and ev['end_date'] != ev['start_date']:
-                    progress = self.db.get_progress_for_event_and_date(ev['id'], self.current_date)
-                    day_completed = 1 if progress else 0
-                else:
-                    day_completed = ev['completed']
-                # 已完成（1）在前还是未完成（0）在前由 reverse 决定
-                # 注意：reverse=True 表示降序，即已完成在前（1在前）
-                return (day_completed, ev['id'])
-            events.sort(key=status_key, reverse=reverse)
-        return events
+            # 标出非默认工作区的事项（合并显示时区分来源）
+            title = f"[{ev['workspace']}] {ev['title']}" if ev['workspace'] else ev['title']
+            self.tree.insert("", tk.END, iid=event_key(ev['id'], ev['workspace']),
+                             values=(title, start, end, ev['status']))
 
     def treeview_sort_column(self, col):
         """点击列标题时的排序处理"""
@@ -178,7 +191,7 @@ class DailyView:
                 self.sort_reverse = True
             else:
                 self.sort_reverse = False
-        self.load_events()  # 重新加载并应用排序
+        self._load_list()  # 按新的排序重新查询（数据未变，不必刷新日历）
 
     def refresh_to_today(self):
         """刷新到今天的日期"""
@@ -187,38 +200,59 @@ class DailyView:
         self.load_events()
 
 
-    def get_selected_event_id(self):
+    def set_workspace(self, workspace):
+        self.workspace = workspace
+        self._load_list()
+
+    def _target_workspace(self):
+        """新事项写入的工作区：当前显示的工作区，合并显示时为默认工作区"""
+        return None if self.workspace == Database.ALL_WORKSPACES else self.workspace
+
+    def get_selected_event(self):
+        """
+        选中的事项
+        :return: (事件 ID, 所在工作区)，未选中时提示并返回 (None, None)
+        """
         selected = self.tree.selection()
         if not selected:
             messagebox.showwarning("提示", "请先选择一个事项")
+            return None, None
+        workspace, _, event_id = selected[0].rpartition("/")
+        return int(event_id), workspace or None
+
+    def get_selected_event_id(self):
+        """选中的默认工作区事项 ID（提醒声音、计时器只支持默认工作区）"""
+        event_id, workspace = self.get_selected_event()
+        if workspace is not None:
+            messagebox.showinfo("提示", "提醒声音和计时器只支持默认工作区的事项")
             return None
-        return int(selected[0])
+        return event_id
 
     def add_event(self):
-        self._event_dialog("添加事项", None)
+        self._event_dialog("添加事项", None, self._target_workspace())
 
     def edit_event(self):
-        event_id = self.get_selected_event_id()
+        event_id, workspace = self.get_selected_event()
         if event_id is None:
             return
-        event = self.db.get_event(event_id)
+        event = self.db.get_event(event_id, workspace)
         if event:
-            self._event_dialog("编辑事项", event)
+            self._event_dialog("编辑事项", event, workspace)
 
     def delete_event(self):
-        event_id = self.get_selected_event_id()
+        event_id, workspace = self.get_selected_event()
         if event_id is None:
             return
         if messagebox.askyesno("确认删除", "确定要删除该事项吗？"):
-            self.db.delete_event(event_id)
+            self.db.delete_event(event_id, workspace)
             self.load_events()
 
     def toggle_complete(self):
         """切换完成状态（仅单日事项可用）"""
-        event_id = self.get_selected_event_id()
+        event_id, workspace = self.get_selected_event()
         if event_id is None:
             return
-        event = self.db.get_event(event_id)
+        event = self.db.get_event(event_id, workspace)
         if not event:
             return
 
@@ -231,15 +265,23 @@ class DailyView:
         update_data = {'completed': new_status}
         if new_status == 1 and not event.get('end_time'):
             update_data['end_time'] = self._get_current_time_str()
-        self.db.update_event(event_id, update_data)
+        self.db.update_event(event_id, update_data, workspace)
         self.load_events()
 
+    def open_progress_chart(self):
+        """打开多天项目的进度图"""
+        event_id, workspace = self.get_selected_event()
+        if event_id is None:
+            return
+        from progress_view import ProgressWindow
+        ProgressWindow(self.parent, self.worker, event_id, workspace)
+
     def submit_progress(self):
         """提交多天项目的当日进度"""
-        event_id = self.get_selected_event_id()
+        event_id, workspace = self.get_selected_event()
         if event_id is None:
             return
-        event = self.db.get_event(event_id)
+        event = self.db.get_event(event_id, workspace)
         if not event:
             return
 
@@ -275,10 +317,10 @@ class DailyView:
                 return
 
             # 检查是否已有进度记录
-            existing = self.db.get_progress_for_event_and_date(event_id, self.current_date)
+            existing = self.db.get_progress_for_event_and_date(event_id, self.current_date, workspace)
             if existing:
                 # 更新
-                self.db.update_progress(existing['id'], {'value': value, 'completed': 1})
+                self.db.update_progress(existing['id'], {'value': value, 'completed': 1}, workspace)
             else:
                 # 新增
                 self.db.add_progress({
@@ -286,13 +328,27 @@ class DailyView:
                     'date': self.current_date,
                     'value': value,
                     'completed': 1
-                })
+                }, workspace)
             dialog.destroy()
             self.load_events()
 
         ttk.Button(dialog, text="保存", command=save).pack(pady=5)
         ttk.Button(dialog, text="取消", command=dialog.destroy).pack()
 
+    def set_reminder_sound(self):
+        """为选中的事项设置自定义提醒声音（未选择文件时可恢复默认声音）"""
+        event_id = self.get_selected_event_id()
+        if event_id is None:
+            return
+        path = filedialog.askopenfilename(
+            parent=self.frame, title="选择提醒声音",
+            filetypes=[("音频文件", "*.wav *.ogg *.mp3"), ("所有文件", "*.*")])
+        if path:
+            self.db.set_event_sound(event_id, path)
+            self.app.audio.preload(path)  # 提前解码，提醒时直接播放
+        elif self.db.get_event_sounds([event_id]) and messagebox.askyesno("提醒声音", "恢复为默认提醒声音？"):
+            self.db.set_event_sound(event_id, None)
+
     def open_timer(self):
         event_id = self.get_selected_event_id()
         if event_id is None:
@@ -358,6 +414,7 @@ class DailyView:
                 return
 
             # 批量生成事项
+            workspace = self._target_workspace()
             created = 0
             for i in range(days):
                 date_str = current.strftime("%Y-%m-%d")
@@ -372,7 +429,7 @@ class DailyView:
                     'completed': 0,
                     'is_recurring': 0,
                     'recurring_rule': None
-                })
+                }, workspace)
                 created += 1
                 current += timedelta(days=1)
 
@@ -382,8 +439,8 @@ class DailyView:
 
         ttk.Button(dialog, text="生成", command=generate).grid(row=5, column=0, columnspan=2, pady=10)
 
-    def _event_dialog(self, title, event=None):
-        """通用事件添加/编辑对话框（增加开始时间控制）"""
+    def _event_dialog(self, title, event=None, workspace=None):
+        """通用事件添加/编辑对话框（增加开始时间控制），保存到 workspace 工作区"""
         dialog = tk.Toplevel(self.parent)
         dialog.title(title)
         dialog.geometry("550x400")
@@ -521,17 +578,16 @@ class DailyView:
             }
 
             if event:
-                self.db.update_event(event['id'], data)
+                self.db.update_event(event['id'], data, workspace)
                 new_id = event['id']
             else:
-                new_id = self.db.add_event(data)
+                new_id = self.db.add_event(data, workspace)
                 # 检查是否需要屏蔽提醒
                 if start_time == self._get_current_time_str():
-                    self.app.mark_event_as_notified(new_id)
+                    self.app.mark_event_as_notified(event_key(new_id, workspace))
 
             dialog.destroy()
             self.load_events()
 
         ttk.Button(btn_frame, text="保存", command=save).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="取消", command=dialog.destroy).pack(side=tk.LEFT, padx=5)
-
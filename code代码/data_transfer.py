@@ -0,0 +1,240 @@
+"""
+事件与进度数据的导出 / 导入（CSV 或 JSON Lines）
+
+全程使用生成器流式处理：导出用 fetchmany 游标分批读取，导入按块 executemany
+并在事务中提交，内存占用与表的行数无关。导入进度记录时，事件 ID 的新旧映射
+保存在 SQLite 临时表中，而不是 Python 字典。
+
+命令行用法：
+    python data_transfer.py export events events.csv
+    python data_transfer.py export progress progress.jsonl
+    python data_transfer.py import events events.csv progress.jsonl
+"""
+import csv
+import json
+import sys
+from itertools import islice
+
+from database import Database
+
+# 各列的类型转换（CSV 读入的都是字符串，空串表示 NULL）
+COLUMN_TYPES = {
+    'id': int, 'event_id': int, 'completed': int, 'is_recurring': int, 'value': float,
+}
+
+
+def guess_format(path):
+    """根据扩展名判断格式：.csv 为 CSV，其余（.json / .jsonl）为 JSON Lines"""
+    return 'csv' if path.lower().endswith('.csv') else 'json'
+
+
+def _chunks(iterable, size):
+    """把迭代器切分成长度不超过 size 的列表"""
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _convert(row, columns):
+    """按列类型转换一行数据，缺失或空值转为 None"""
+    values = {}
+    for col in columns:
+        value = row.get(col)
+        if value == '' or value is None:
+            values[col] = None
+        elif col in COLUMN_TYPES and isinstance(value, str):
+            values[col] = COLUMN_TYPES[col](value)
+        else:
+            values[col] = value
+    return values
+
+
+# ---------- 导出 ----------
+def write_rows(rows, fp, fmt, columns, progress=None, report_every=10000):
+    """
+    将行写入文件对象
+    :param rows: 字典的可迭代对象（通常是生成器）
+    :param fmt: 'csv' 或 'json'（每行一个 JSON 对象）
+    :param progress: 回调 progress(已写行数)，每 report_every 行及结束时调用
+    :return: 写出的行数
+    """
+    if fmt == 'csv':
+        writer = csv.DictWriter(fp, fieldnames=columns)
+        writer.writeheader()
+        write = writer.writerow
+    else:
+        def write(row):
+            fp.write(json.dumps(row, ensure_ascii=False))
+            fp.write('\n')
+
+    count = 0
+    for row in rows:
+        write(row)
+        count += 1
+        if progress and count % report_every == 0:
+            progress(count)
+    if progress:
+        progress(count)
+    return count
+
+
+def export_table(db, table, fp, fmt='csv', batch_size=1000, progress=None):
+    """导出整张表（events 或 progress）到文件对象"""
+    columns = Database.TABLE_COLUMNS[table]
+    return write_rows(db.iter_table(table, batch_size), fp, fmt, columns, progress)
+
+
+# ---------- 导入 ----------
+def read_rows(fp, fmt):
+    """从文件对象逐行读取字典（生成器）"""
+    if fmt == 'csv':
+        yield from csv.DictReader(fp)
+    else:
+        for line in fp:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def import_events(db, rows, remap_ids=True, chunk_size=1000, progress=None):
+    """
+    批量导入事件
+    :param rows: 字典的可迭代对象，通常来自 read_rows
+    :param remap_ids: True 时为每行分配新 ID（及新 uid），并把 旧ID -> 新ID 记入临时表
+                      import_id_map，供随后的 import_progress 使用；False 时保留原 ID
+    :param progress: 回调 progress(已导入行数)，每块提交后调用
+    :return: 导入的行数
+    """
+    columns = Database.TABLE_COLUMNS['events']
+    col_str = ','.join(columns)
+    placeholders = ','.join(['?'] * len(columns))
+    insert_sql = f"INSERT INTO events ({col_str}) VALUES ({placeholders})"
+
+    db.conn.execute('''
+        CREATE TEMP TABLE IF NOT EXISTS import_id_map (
+            old_id INTEGER PRIMARY KEY,
+            new_id INTEGER NOT NULL
+        )
+    ''')
+    with db.conn:
+        db.conn.execute("DELETE FROM temp.import_id_map")
+
+    count = 0
+    for chunk in _chunks(rows, chunk_size):
+        chunk_values = []
+        for row in chunk:
+            values = _convert(row, columns)
+            if values['title'] is None or values['start_date'] is None:
+                raise ValueError(f"缺少必要字段 title/start_date: {row}")
+            if values['completed'] is None:
+                values['completed'] = 0
+            if values['is_recurring'] is None:
+                values['is_recurring'] = 0
+            chunk_values.append(values)
+
+        # 在写锁内分配 ID：导入期间程序、API 或同步可能也在插入事件，预先分配的 ID 会冲突
+        db.conn.execute("BEGIN IMMEDIATE")
+        with db.conn:
+            id_map = []
+            if remap_ids:
+                next_id = db.next_event_id()
+                for values in chunk_values:
+                    old_id = values['id']
+                    values['uid'] = None  # 作为新事件导入，由触发器生成新的 uid
+                    values['id'] = next_id
+                    next_id += 1
+                    if old_id is not None:
+                        id_map.append((old_id, values['id']))
+            db.conn.executemany(insert_sql, [[values[c] for c in columns] for values in chunk_values])
+            if id_map:
+                db.conn.executemany(
+                    "INSERT OR REPLACE INTO temp.import_id_map (old_id, new_id) VALUES (?, ?)", id_map)
+        count += len(chunk)
+        if progress:
+            progress(count)
+    return count
+
+
+def import_progress(db, rows, remap_ids=True, chunk_size=1000, progress=None):
+    """
+    批量导入进度记录，同一事件同一天已有记录时覆盖其数值
+    :param remap_ids: True 时通过 import_id_map 把 event_id 换成新 ID，找不到映射的行被跳过
+    :return: 实际写入的行数
+    """
+    if remap_ids:
+        insert_sql = '''
+            INSERT INTO progress (event_id, date, value, completed)
+            SELECT new_id, ?, ?, ? FROM temp.import_id_map WHERE old_id = ?
+            ON CONFLICT(event_id, date) DO UPDATE SET value = excluded.value, completed = excluded.completed
+        '''
+    else:
+        insert_sql = '''
+            INSERT INTO progress (date, value, completed, event_id) VALUES (?, ?, ?, ?)
+            ON CONFLICT(event_id, date) DO UPDATE SET value = excluded.value, completed = excluded.completed
+        '''
+    columns = ('event_id', 'date', 'value', 'completed')
+
+    count = 0
+    for chunk in _chunks(rows, chunk_size):
+        params = []
+        for row in chunk:
+            values = _convert(row, columns)
+            if values['event_id'] is None or values['date'] is None:
+                raise ValueError(f"缺少必要字段 event_id/date: {row}")
+            params.append((values['date'], values['value'], values['completed'] or 0, values['event_id']))
+        with db.conn:
+            count += db.conn.executemany(insert_sql, params).rowcount
+        if progress:
+            progress(count)
+    return count
+
+
+def _print_progress(label):
+    def report(count):
+        print(f"\r{label}: {count} 行", end='', file=sys.stderr, flush=True)
+    return report
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="待办事项数据导出/导入")
+    parser.add_argument('--db', default='todo.db', help="数据库文件路径")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_exp = sub.add_parser('export', help="导出 events 或 progress")
+    p_exp.add_argument('table', choices=('events', 'progress'))
+    p_exp.add_argument('path', help="输出文件，- 表示标准输出；.csv 为 CSV，否则为 JSON Lines")
+
+    p_imp = sub.add_parser('import', help="导入事件及其进度（事件 ID 会重新分配）")
+    p_imp.add_argument('events', help="事件文件")
+    p_imp.add_argument('progress', nargs='?', help="进度文件（可选）")
+    p_imp.add_argument('--keep-ids', action='store_true', help="保留原事件 ID，不重新分配")
+
+    args = parser.parse_args(argv)
+    with Database(args.db) as db:
+        if args.command == 'export':
+            fmt = guess_format(args.path)
+            if args.path == '-':
+                export_table(db, args.table, sys.stdout, 'json')
+            else:
+                with open(args.path, 'w', encoding='utf-8', newline='') as fp:
+                    export_table(db, args.table, fp, fmt, progress=_print_progress(args.table))
+                print(file=sys.stderr)
+        else:
+            remap = not args.keep_ids
+            with open(args.events, encoding='utf-8', newline='') as fp:
+                import_events(db, read_rows(fp, guess_format(args.events)), remap,
+                              progress=_print_progress('events'))
+            print(file=sys.stderr)
+            if args.progress:
+                with open(args.progress, encoding='utf-8', newline='') as fp:
+                    import_progress(db, read_rows(fp, guess_format(args.progress)), remap,
+                                    progress=_print_progress('progress'))
+                print(file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,24 +1,91 @@
+import os
+import re
+import socket
 import sqlite3
+import uuid
 import calendar
-from datetime import datetime, date
+import heapq
+from functools import lru_cache
+from datetime import datetime, date, timedelta
+
+_DIGITS = re.compile(r'(\d+)')
+_WORKSPACE_NAME = re.compile(r'\w+')
+
+
+def natural_nocase(a, b):
+    """
+    SQLite 排序规则 NATURAL_NOCASE：忽略大小写，连续的数字按数值比较（“第2课”排在“第10课”之前）
+    按这个规则相等的文字（如 "a01" 与 "a1"）再按原文比较，保证顺序确定
+    """
+    key_a = [int(part) if i % 2 else part.casefold() for i, part in enumerate(_DIGITS.split(a))]
+    key_b = [int(part) if i % 2 else part.casefold() for i, part in enumerate(_DIGITS.split(b))]
+    if key_a != key_b:
+        return -1 if key_a < key_b else 1
+    return (a > b) - (a < b)
+
 
 class Database:
     """待办事项管理器的数据库操作类"""
 
-    def __init__(self, db_path='todo.db'):
+    # 可以通过 add_* / update_* 写入的列，同时也是生成的 SQL 中列的固定顺序
+    WRITABLE_COLUMNS = {
+        'events': ('title', 'description', 'start_date', 'end_date', 'start_time', 'end_time',
+                   'completed', 'is_recurring', 'recurring_rule'),
+        'progress': ('event_id', 'date', 'value', 'completed'),
+    }
+    # 每个连接缓存的预编译语句数（写入语句按列组合只有有限几种，读取语句也是固定的）
+    STATEMENT_CACHE_SIZE = 256
+    # 表结构与触发器的版本，记录在 meta.schema_version；修改 create_* 中的表、索引或触发器定义时加一，
+    # 旧数据库下次打开时才会重建。版本一致时打开数据库不执行任何写入，命令行的只读命令不会占用写锁
+    SCHEMA_VERSION = 1
+
+    def __init__(self, db_path='todo.db', init_schema=True):
         """
         初始化数据库连接，创建表结构
         :param db_path: 数据库文件路径，默认为 'todo.db'
+        :param init_schema: 表结构版本不是 SCHEMA_VERSION 时是否建表并重建触发器；表结构已由其他连接初始化时
+                            （如 API 服务的只读连接）传 False，避免多个连接同时执行 DDL 互相锁住
         """
         self.db_path = db_path
+        # 归档库与主库同目录，如 todo.db -> todo_archive.db（内存数据库不使用归档）
+        if db_path == ':memory:':
+            self.archive_path = None
+        else:
+            root, ext = os.path.splitext(db_path)
+            self.archive_path = f"{root}_archive{ext or '.db'}"
+        self.archive_attached = False
+        self.workspaces = {}    # 已附加的工作区：名称 -> 文件路径
         self.conn = None
         self.connect()
-        self.create_tables()
+        if init_schema and not self._schema_is_current():
+            self.create_tables()
+        else:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'node_id'").fetchone()
+            self.node_id = row[0] if row else None
+
+    @staticmethod
+    def _host_key():
+        # 节点 ID 按主机名区分：数据库复制到另一台机器后自动成为新节点
+        return f"node_id:{socket.gethostname()}"
+
+    def _schema_is_current(self):
+        """表结构版本是最新的，且本机的节点 ID 已经生效（数据库刚复制到另一台机器时需要重新初始化）"""
+        host_key = self._host_key()
+        try:
+            values = dict(self.conn.execute(
+                "SELECT key, value FROM meta WHERE key IN ('schema_version', 'node_id', ?)", (host_key,)).fetchall())
+        except sqlite3.OperationalError:
+            return False        # 新数据库或很旧的数据库，还没有 meta 表
+        return (values.get('schema_version') == str(self.SCHEMA_VERSION)
+                and values.get('node_id') is not None and values.get(host_key) == values['node_id'])
 
     def connect(self):
-        """建立数据库连接，设置行工厂为Row以支持列名访问"""
-        self.conn = sqlite3.connect(self.db_path)
+        """建立数据库连接，设置行工厂为Row以支持列名访问；归档库和已登记的工作区一并附加"""
+        self.conn = sqlite3.connect(self.db_path, cached_statements=self.STATEMENT_CACHE_SIZE)
         self.conn.row_factory = sqlite3.Row
+        self.conn.create_collation('NATURAL_NOCASE', natural_nocase)
+        self.attach_archive()
+        self.attach_workspaces()
 
     def close(self):
         """关闭数据库连接"""
@@ -42,6 +109,11 @@ class Database:
                     recurring_rule TEXT           -- 重复规则，如 "daily", "weekly mon,wed,fri"
                 )
             ''')
+            # 按日期查事件（今日视图、进度视图）：单日事件走 end_date IS NULL AND start_date=?，
+            # 多天项目走 end_date>=?，与归档库的 idx_archive_events_dates 相同
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_events_dates ON events(end_date, start_date)")
+            # 按开始日期顺序遍历、分页（iter_events / page_events 的键集分页）
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_events_start ON events(start_date, id)")
 
             self.conn.execute('''
                 CREATE TABLE IF NOT EXISTS progress (
@@ -55,13 +127,630 @@ class Database:
                 )
             ''')
 
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS event_sounds (
+                    event_id INTEGER PRIMARY KEY,   -- 事件 ID
+                    path TEXT NOT NULL              -- 自定义提醒声音文件路径
+                )
+            ''')
+
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS workspaces (
+                    name TEXT PRIMARY KEY,          -- 工作区名称（字母、数字、汉字、下划线）
+                    path TEXT NOT NULL              -- 工作区数据库文件路径
+                )
+            ''')
+
+        self.create_summary_tables()
+        self.create_sync_tables()
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)",
+                              (str(self.SCHEMA_VERSION),))
+
+    def create_summary_tables(self):
+        """
+        创建每日汇总表 daily_summary 及维护它的触发器
+        events / progress 的增删改由触发器增量更新汇总，多天项目按覆盖的每一天展开
+        （展开依赖日期表 calendar_days，覆盖 1970-01-01 至 2100-12-31）
+        """
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='daily_summary'"
+        ).fetchone()
+        with self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS calendar_days (
+                    date TEXT PRIMARY KEY           -- 日期，格式 YYYY-MM-DD
+                ) WITHOUT ROWID
+            ''')
+            if not self.conn.execute("SELECT 1 FROM calendar_days LIMIT 1").fetchone():
+                self.conn.execute('''
+                    WITH RECURSIVE d(date) AS (
+                        SELECT '1970-01-01'
+                        UNION ALL
+                        SELECT date(date, '+1 day') FROM d WHERE date < '2100-12-31'
+                    )
+                    INSERT INTO calendar_days (date) SELECT date FROM d
+                ''')
+
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS daily_summary (
+                    date TEXT PRIMARY KEY,               -- 日期，格式 YYYY-MM-DD
+                    total INTEGER NOT NULL DEFAULT 0,    -- 覆盖该日的事件数
+                    completed INTEGER NOT NULL DEFAULT 0,  -- 其中已完成的事件数
+                    progress_submitted INTEGER NOT NULL DEFAULT 0  -- 该日提交的进度记录数
+                ) WITHOUT ROWID
+            ''')
+
+            # 键值表，用于保存内部状态；summary_frozen 存在时触发器不更新汇总
+            # （归档在主库与归档库之间搬移数据时使用，汇总保持不变）
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            ''')
+
+            # 事件：按 start_date ~ COALESCE(end_date, start_date) 覆盖的每一天计数
+            # 表结构版本变化时重建触发器（见 SCHEMA_VERSION），保证旧数据库使用最新的触发器定义
+            self.conn.executescript('''
+                DROP TRIGGER IF EXISTS trg_events_summary_insert;
+                CREATE TRIGGER trg_events_summary_insert AFTER INSERT ON events
+                WHEN NOT EXISTS (SELECT 1 FROM meta WHERE key = 'summary_frozen')
+                BEGIN
+                    INSERT OR IGNORE INTO daily_summary (date)
+                        SELECT date FROM calendar_days
+                        WHERE date BETWEEN NEW.start_date AND COALESCE(NEW.end_date, NEW.start_date);
+                    UPDATE daily_summary
+                        SET total = total + 1,
+                            completed = completed + (COALESCE(NEW.completed, 0) != 0)
+                        WHERE date BETWEEN NEW.start_date AND COALESCE(NEW.end_date, NEW.start_date);
+                END;
+
+                DROP TRIGGER IF EXISTS trg_events_summary_delete;
+                CREATE TRIGGER trg_events_summary_delete AFTER DELETE ON events
+                WHEN NOT EXISTS (SELECT 1 FROM meta WHERE key = 'summary_frozen')
+                BEGIN
+                    UPDATE daily_summary
+                        SET total = total - 1,
+                            completed = completed - (COALESCE(OLD.completed, 0) != 0)
+                        WHERE date BETWEEN OLD.start_date AND COALESCE(OLD.end_date, OLD.start_date);
+                END;
+
+                DROP TRIGGER IF EXISTS trg_events_summary_update;
+                CREATE TRIGGER trg_events_summary_update
+                AFTER UPDATE OF start_date, end_date, completed ON events
+                WHEN NOT EXISTS (SELECT 1 FROM meta WHERE key = 'summary_frozen')
+                BEGIN
+                    UPDATE daily_summary
+                        SET total = total - 1,
+                            completed = completed - (COALESCE(OLD.completed, 0) != 0)
+                        WHERE date BETWEEN OLD.start_date AND COALESCE(OLD.end_date, OLD.start_date);
+                    INSERT OR IGNORE INTO daily_summary (date)
+                        SELECT date FROM calendar_days
+                        WHERE date BETWEEN NEW.start_date AND COALESCE(NEW.end_date, NEW.start_date);
+                    UPDATE daily_summary
+                        SET total = total + 1,
+                            completed = completed + (COALESCE(NEW.completed, 0) != 0)
+                        WHERE date BETWEEN NEW.start_date AND COALESCE(NEW.end_date, NEW.start_date);
+                END;
+
+                DROP TRIGGER IF EXISTS trg_progress_summary_insert;
+                CREATE TRIGGER trg_progress_summary_insert AFTER INSERT ON progress
+                WHEN NOT EXISTS (SELECT 1 FROM meta WHERE key = 'summary_frozen')
+                BEGIN
+                    INSERT OR IGNORE INTO daily_summary (date) VALUES (NEW.date);
+                    UPDATE daily_summary SET progress_submitted = progress_submitted + 1
+                        WHERE date = NEW.date;
+                END;
+
+                DROP TRIGGER IF EXISTS trg_progress_summary_delete;
+                CREATE TRIGGER trg_progress_summary_delete AFTER DELETE ON progress
+                WHEN NOT EXISTS (SELECT 1 FROM meta WHERE key = 'summary_frozen')
+                BEGIN
+                    UPDATE daily_summary SET progress_submitted = progress_submitted - 1
+                        WHERE date = OLD.date;
+                END;
+
+                DROP TRIGGER IF EXISTS trg_progress_summary_update;
+                CREATE TRIGGER trg_progress_summary_update AFTER UPDATE OF date ON progress
+                WHEN NOT EXISTS (SELECT 1 FROM meta WHERE key = 'summary_frozen')
+                BEGIN
+                    UPDATE daily_summary SET progress_submitted = progress_submitted - 1
+                        WHERE date = OLD.date;
+                    INSERT OR IGNORE INTO daily_summary (date) VALUES (NEW.date);
+                    UPDATE daily_summary SET progress_submitted = progress_submitted + 1
+                        WHERE date = NEW.date;
+                END;
+            ''')
+
+        if not exists:
+            # 旧数据库首次升级：根据已有数据生成汇总
+            self.rebuild_daily_summary()
+
+    def create_sync_tables(self):
+        """
+        创建同步所需的变更日志
+        - events.uid：跨机器唯一的事件标识（进度以 事件uid|日期 标识）
+        - changes：本机每次写入 events / progress 时由触发器追加一条，带 Lamport 时钟
+        - row_versions：每行最后一次生效的 (时钟, 节点)，用于冲突时按“最后写入者胜”合并
+        同步引擎写入远端变更时设置 meta.sync_applying，触发器不再记录（避免回传）
+        """
+        columns = {row[1] for row in self.conn.execute("PRAGMA main.table_info(events)")}
+        is_new_log = not self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='changes'").fetchone()
+        with self.conn:
+            if 'uid' not in columns:
+                self.conn.execute("ALTER TABLE events ADD COLUMN uid TEXT")
+                # 旧数据使用可重现的 uid，同一份数据库复制到两台机器后升级得到相同的标识
+                self.conn.execute('''
+                    UPDATE events SET uid = 'legacy-' || id || '-' ||
+                        substr(lower(hex(COALESCE(title, '') || start_date)), 1, 16)
+                ''')
+            self.conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_events_uid ON events(uid)")
+
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS changes (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,  -- 本地递增序号，删除旧记录后也不回退
+                    tbl TEXT NOT NULL,          -- 'events' 或 'progress'
+                    row_key TEXT NOT NULL,      -- 事件 uid，或 "事件uid|日期"
+                    op TEXT NOT NULL,           -- 'upsert' 或 'delete'
+                    clock INTEGER NOT NULL,     -- Lamport 时钟
+                    node TEXT NOT NULL,         -- 产生变更的节点
+                    payload TEXT                -- 行内容（JSON），删除时为空
+                )
+            ''')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS row_versions (
+                    tbl TEXT NOT NULL,
+                    row_key TEXT NOT NULL,
+                    clock INTEGER NOT NULL,
+                    node TEXT NOT NULL,
+                    PRIMARY KEY (tbl, row_key)
+                ) WITHOUT ROWID
+            ''')
+
+            host_key = self._host_key()
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (host_key,)).fetchone()
+            self.node_id = row[0] if row else uuid.uuid4().hex
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (host_key, self.node_id))
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('node_id', ?)", (self.node_id,))
+            self.conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('lamport', 0)")
+
+            event_payload = '''json_object('title', e.title, 'description', e.description,
+                'start_date', e.start_date, 'end_date', e.end_date, 'start_time', e.start_time,
+                'end_time', e.end_time, 'completed', e.completed, 'is_recurring', e.is_recurring,
+                'recurring_rule', e.recurring_rule)'''
+            progress_payload = '''json_object('event_uid', e.uid, 'date', p.date,
+                'value', p.value, 'completed', p.completed)'''
+            # 记录一条变更：时钟加一，写入 changes 和 row_versions
+            def log(tbl, row_key, op, payload, source):
+                return f'''
+                    UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'lamport';
+                    INSERT INTO changes (tbl, row_key, op, clock, node, payload)
+                        SELECT '{tbl}', {row_key}, '{op}',
+                               (SELECT CAST(value AS INTEGER) FROM meta WHERE key = 'lamport'),
+                               (SELECT value FROM meta WHERE key = 'node_id'),
+                               {payload}
+                        {source};
+                    INSERT OR REPLACE INTO row_versions (tbl, row_key, clock, node)
+                        SELECT '{tbl}', {row_key},
+                               (SELECT CAST(value AS INTEGER) FROM meta WHERE key = 'lamport'),
+                               (SELECT value FROM meta WHERE key = 'node_id')
+                        {source};
+                '''
+            guard = "WHEN NOT EXISTS (SELECT 1 FROM meta WHERE key IN ('sync_applying', 'summary_frozen'))"
+            event_cols = "title, description, start_date, end_date, start_time, end_time, " \
+                         "completed, is_recurring, recurring_rule"
+            progress_key = "e.uid || '|' || p.date"
+            self.conn.executescript(f'''
+                DROP TRIGGER IF EXISTS trg_events_changes_insert;
+                CREATE TRIGGER trg_events_changes_insert AFTER INSERT ON events {guard}
+                BEGIN
+                    UPDATE events SET uid = lower(hex(randomblob(16))) WHERE id = NEW.id AND uid IS NULL;
+                    {log('events', 'e.uid', 'upsert', event_payload, 'FROM events e WHERE e.id = NEW.id')}
+                END;
+
+                DROP TRIGGER IF EXISTS trg_events_changes_update;
+                CREATE TRIGGER trg_events_changes_update AFTER UPDATE OF {event_cols} ON events {guard}
+                BEGIN
+                    {log('events', 'e.uid', 'upsert', event_payload, 'FROM events e WHERE e.id = NEW.id')}
+                END;
+
+                DROP TRIGGER IF EXISTS trg_events_changes_delete;
+                CREATE TRIGGER trg_events_changes_delete AFTER DELETE ON events {guard}
+                BEGIN
+                    {log('events', 'OLD.uid', 'delete', 'NULL', '')}
+                END;
+
+                DROP TRIGGER IF EXISTS trg_progress_changes_insert;
+                CREATE TRIGGER trg_progress_changes_insert AFTER INSERT ON progress {guard}
+                BEGIN
+                    {log('progress', progress_key, 'upsert', progress_payload,
+                         'FROM progress p JOIN events e ON e.id = p.event_id WHERE p.id = NEW.id')}
+                END;
+
+                DROP TRIGGER IF EXISTS trg_progress_changes_update;
+                CREATE TRIGGER trg_progress_changes_update AFTER UPDATE ON progress {guard}
+                BEGIN
+                    {log('progress', progress_key, 'upsert', progress_payload,
+                         'FROM progress p JOIN events e ON e.id = p.event_id WHERE p.id = NEW.id')}
+                END;
+
+                DROP TRIGGER IF EXISTS trg_progress_changes_move;
+                CREATE TRIGGER trg_progress_changes_move AFTER UPDATE OF event_id, date ON progress
+                WHEN (OLD.event_id != NEW.event_id OR OLD.date != NEW.date)
+                     AND NOT EXISTS (SELECT 1 FROM meta WHERE key IN ('sync_applying', 'summary_frozen'))
+                BEGIN
+                    {log('progress', "e.uid || '|' || OLD.date", 'delete', 'NULL',
+                         'FROM events e WHERE e.id = OLD.event_id')}
+                END;
+
+                DROP TRIGGER IF EXISTS trg_progress_changes_delete;
+                CREATE TRIGGER trg_progress_changes_delete AFTER DELETE ON progress {guard}
+                BEGIN
+                    {log('progress', "e.uid || '|' || OLD.date", 'delete', 'NULL',
+                         'FROM events e WHERE e.id = OLD.event_id')}
+                END;
+            ''')
+
+            if is_new_log:
+                # 首次启用：把已有数据作为基线写入变更日志，其他机器同步时能拿到全部数据
+                self.conn.execute(f'''
+                    INSERT INTO changes (tbl, row_key, op, clock, node, payload)
+                    SELECT 'events', e.uid, 'upsert', 0, ?, {event_payload} FROM events e ORDER BY e.id
+                ''', (self.node_id,))
+                self.conn.execute(f'''
+                    INSERT INTO changes (tbl, row_key, op, clock, node, payload)
+                    SELECT 'progress', {progress_key}, 'upsert', 0, ?, {progress_payload}
+                    FROM progress p JOIN events e ON e.id = p.event_id ORDER BY p.id
+                ''', (self.node_id,))
+                self.conn.execute('''
+                    INSERT OR REPLACE INTO row_versions (tbl, row_key, clock, node)
+                    SELECT tbl, row_key, clock, node FROM changes
+                ''')
+
+    def get_change_seq(self):
+        """
+        数据版本号：变更日志的最新序号加上同步应用的远端变更数和工作区的写入次数
+        events / progress 有任何写入（包括同步拉取的、工作区中的）都会增加，可用于缓存失效
+        """
+        row = self.conn.execute('''
+            SELECT COALESCE((SELECT seq FROM main.sqlite_sequence WHERE name = 'changes'), 0)
+                 + COALESCE((SELECT CAST(value AS INTEGER) FROM main.meta WHERE key = 'sync_applied'), 0)
+                 + COALESCE((SELECT CAST(value AS INTEGER) FROM main.meta WHERE key = 'workspace_writes'), 0)
+        ''').fetchone()
+        return row[0]
+
+    def rebuild_daily_summary(self, start=None, end=None):
+        """
+        从 events / progress 重新计算每日汇总（用于数据恢复或修复）
+        :param start: 起始日期 YYYY-MM-DD，为空表示不限
+        :param end: 结束日期 YYYY-MM-DD，为空表示不限
+        """
+        start = start or '0000-00-00'
+        end = end or '9999-99-99'
+        # 已归档的事件仍计入汇总
+        cols = "start_date, end_date, completed"
+        events = f"SELECT {cols} FROM main.events"
+        progress = "SELECT date FROM main.progress"
+        if self._archive_until() is not None:
+            events += f" UNION ALL SELECT {cols} FROM archive.events"
+            progress += " UNION ALL SELECT date FROM archive.progress"
+        with self.conn:
+            self.conn.execute("DELETE FROM daily_summary WHERE date BETWEEN ? AND ?", (start, end))
+            self.conn.execute(f'''
+                INSERT INTO daily_summary (date, total, completed, progress_submitted)
+                SELECT date, SUM(total), SUM(completed), SUM(submitted) FROM (
+                    SELECT d.date AS date, COUNT(*) AS total,
+                           SUM(COALESCE(e.completed, 0) != 0) AS completed, 0 AS submitted
+                    FROM ({events}) e
+                    CROSS JOIN calendar_days d  -- 固定以事件为外层，按主键范围查找日期
+                      ON d.date BETWEEN e.start_date AND COALESCE(e.end_date, e.start_date)
+                    WHERE d.date BETWEEN :start AND :end
+                      AND e.start_date <= :end AND COALESCE(e.end_date, e.start_date) >= :start
+                    GROUP BY d.date
+                    UNION ALL
+                    SELECT date, 0, 0, COUNT(*) FROM ({progress})
+                    WHERE date BETWEEN :start AND :end
+                    GROUP BY date
+                )
+                GROUP BY date
+            ''', {'start': start, 'end': end})
+
+    # ---------- 归档库 ----------
+    def attach_archive(self, create=False):
+        """
+        以 archive 为名附加归档库（保存已归档的历史事件及其进度）
+        :param create: 归档库不存在时是否创建
+        :return: 是否已附加
+        """
+        if self.archive_attached:
+            return True
+        if not self.archive_path or (not create and not os.path.exists(self.archive_path)):
+            return False
+        is_new = not os.path.exists(self.archive_path)
+        self.conn.execute("ATTACH DATABASE ? AS archive", (self.archive_path,))
+        if is_new:
+            # 必须在建表前设置，之后才能用 incremental_vacuum 回收空间
+            self.conn.execute("PRAGMA archive.auto_vacuum = INCREMENTAL")
+        with self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS archive.events (
+                    id INTEGER PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    description TEXT,
+                    start_date TEXT NOT NULL,
+                    end_date TEXT,
+                    start_time TEXT,
+                    end_time TEXT,
+                    completed INTEGER DEFAULT 0,
+                    is_recurring INTEGER DEFAULT 0,
+                    recurring_rule TEXT,
+                    uid TEXT
+                )
+            ''')
+            columns = {row[1] for row in self.conn.execute("PRAGMA archive.table_info(events)")}
+            if 'uid' not in columns:
+                self.conn.execute("ALTER TABLE archive.events ADD COLUMN uid TEXT")
+            self.conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS archive.idx_archive_events_uid ON events(uid)")
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS archive.progress (
+                    id INTEGER PRIMARY KEY,
+                    event_id INTEGER NOT NULL,
+                    date TEXT NOT NULL,
+                    value REAL,
+                    completed INTEGER DEFAULT 0,
+                    UNIQUE(event_id, date)
+                )
+            ''')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS archive.meta (
+                    key TEXT PRIMARY KEY,      -- archived_until: 已归档事件的最晚日期
+                    value TEXT
+                )
+            ''')
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS archive.idx_archive_events_dates ON events(end_date, start_date)")
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS archive.idx_archive_events_start ON events(start_date, id)")
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS archive.idx_archive_progress_date ON progress(date)")
+        self.archive_attached = True
+        return True
+
+    def _archive_until(self):
+        """
+        归档数据覆盖到的最晚日期；没有归档数据时返回 None
+        每次读取，以便看到其他连接（如归档命令）刚写入的归档
+        """
+        if not self.attach_archive():
+            return None
+        row = self.conn.execute(
+            "SELECT value FROM archive.meta WHERE key = 'archived_until'").fetchone()
+        return row[0] if row else None
+
+    def move_events(self, event_ids, to_archive=True):
+        """
+        在主库与归档库之间搬移事件及其全部进度（同一事务内完成）
+        搬移期间设置 summary_frozen，每日汇总保持不变（已归档事件仍计入汇总）
+        :param event_ids: 事件 ID 列表
+        :param to_archive: True 为主库 -> 归档库，False 为归档库 -> 主库
+        :return: 搬移的事件数
+        """
+        if not event_ids:
+            return 0
+        self.attach_archive(create=to_archive)
+        src, dst = ('main', 'archive') if to_archive else ('archive', 'main')
+        ids = ','.join(str(int(i)) for i in event_ids)
+        event_cols = ','.join(self.TABLE_COLUMNS['events'])
+        progress_cols = ','.join(self.TABLE_COLUMNS['progress'])
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO main.meta (key, value) VALUES ('summary_frozen', '1')")
+            moved = self.conn.execute(f'''
+                INSERT INTO {dst}.events ({event_cols})
+                SELECT {event_cols} FROM {src}.events WHERE id IN ({ids})
+            ''').rowcount
+            self.conn.execute(f'''
+                INSERT INTO {dst}.progress ({progress_cols})
+                SELECT {progress_cols} FROM {src}.progress WHERE event_id IN ({ids})
+            ''')
+            self.conn.execute(f"DELETE FROM {src}.progress WHERE event_id IN ({ids})")
+            self.conn.execute(f"DELETE FROM {src}.events WHERE id IN ({ids})")
+            if to_archive:
+                self.conn.execute(f'''
+                    INSERT INTO archive.meta (key, value)
+                    SELECT 'archived_until', MAX(COALESCE(end_date, start_date))
+                    FROM archive.events WHERE id IN ({ids})
+                    ON CONFLICT(key) DO UPDATE SET value = MAX(value, excluded.value)
+                ''')
+            self.conn.execute("DELETE FROM main.meta WHERE key = 'summary_frozen'")
+        return moved
+
+    def _unarchive_event(self, event_id):
+        """若事件在归档库中，将其移回主库以便修改；返回是否移动过"""
+        if self._archive_until() is None:
+            return False
+        if not self.conn.execute("SELECT 1 FROM archive.events WHERE id=?", (event_id,)).fetchone():
+            return False
+        return self.move_events([event_id], to_archive=False) > 0
+
+    # ---------- 工作区 ----------
+    # 其他待办数据库文件（如“工作”“个人”各一个）以 ws_<名称> 为名附加到同一个连接，
+    # 主库即默认工作区。各库有自己的索引，合并查询把同一条查询在每个库上执行后 UNION ALL，
+    # 每一段仍按该库的索引读取。SQLite 默认最多附加 10 个库（归档库占一个）。
+    ALL_WORKSPACES = '*'
+
+    def attach_workspaces(self):
+        """附加 workspaces 表中登记的所有工作区（文件不存在或附加失败时跳过并提示）"""
+        if not self.conn.execute(
+                "SELECT 1 FROM main.sqlite_master WHERE type='table' AND name='workspaces'").fetchone():
+            return
+        for name, path in self.conn.execute("SELECT name, path FROM main.workspaces ORDER BY name").fetchall():
+            try:
+                self._attach_workspace(name, path, create=False)
+            except (sqlite3.Error, ValueError, FileNotFoundError) as e:
+                print(f"无法附加工作区 {name}（{path}）: {e}")
+
+    def add_workspace(self, name, path):
+        """
+        登记并附加一个工作区，之后每个连接都会自动附加
+        :param name: 工作区名称（字母、数字、汉字、下划线）
+        :param path: 数据库文件路径，不存在时创建；也可以是另一份 todo.db
+        """
+        path = os.path.abspath(path)
+        if name in self.workspaces and self.workspaces[name] != path:
+            raise ValueError(f"工作区 {name} 已存在")
+        self._attach_workspace(name, path, create=True)
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO main.workspaces (name, path) VALUES (?, ?)", (name, path))
+
+    def remove_workspace(self, name):
+        """取消登记并分离工作区（数据库文件保留）"""
+        with self.conn:
+            self.conn.execute("DELETE FROM main.workspaces WHERE name = ?", (name,))
+        if self.workspaces.pop(name, None) is not None:
+            self.conn.execute(f"DETACH DATABASE {self._workspace_schema(name)}")
+
+    def list_workspaces(self):
+        """已附加的工作区：{名称: 文件路径}"""
+        return dict(self.workspaces)
+
+    @staticmethod
+    def _workspace_schema(name):
+        if not _WORKSPACE_NAME.fullmatch(name or ''):
+            raise ValueError(f"工作区名称只能包含字母、数字、汉字和下划线: {name!r}")
+        return f"ws_{name}"
+
+    def _attach_workspace(self, name, path, create=False):
+        if name in self.workspaces:
+            return
+        schema = self._workspace_schema(name)
+        if not create and not os.path.exists(path):
+            raise FileNotFoundError(path)
+        self.conn.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+        # 新文件只建事件和进度表；已有的 todo.db 保留原有的表和触发器
+        with self.conn:
+            self.conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS {schema}.events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    title TEXT NOT NULL,
+                    description TEXT,
+                    start_date TEXT NOT NULL,
+                    end_date TEXT,
+                    start_time TEXT,
+                    end_time TEXT,
+                    completed INTEGER DEFAULT 0,
+                    is_recurring INTEGER DEFAULT 0,
+                    recurring_rule TEXT,
+                    uid TEXT
+                )
+            ''')
+            columns = {row[1] for row in self.conn.execute(f"PRAGMA {schema}.table_info(events)")}
+            if 'uid' not in columns:
+                # 合并查询按 e.* 的列顺序 UNION ALL，各库的 events 列必须一致
+                self.conn.execute(f"ALTER TABLE {schema}.events ADD COLUMN uid TEXT")
+            self.conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS {schema}.progress (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    event_id INTEGER NOT NULL,
+                    date TEXT NOT NULL,
+                    value REAL,
+                    completed INTEGER DEFAULT 0,
+                    UNIQUE(event_id, date)
+                )
+            ''')
+            # 与主库相同的索引，合并查询的每一段都能按索引读取
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_events_dates ON events(end_date, start_date)")
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_events_start ON events(start_date, id)")
+        self.workspaces[name] = path
+
+    def _schema(self, workspace):
+        """单个工作区对应的库名：None 为主库"""
+        if workspace is None:
+            return 'main'
+        if workspace not in self.workspaces:
+            raise ValueError(f"未知的工作区: {workspace}")
+        return self._workspace_schema(workspace)
+
+    def _federate(self, sql, workspace, date_from):
+        """
+        把针对单个库的查询展开为各库的 UNION ALL（参数需使用命名参数，各段共用）
+        :param sql: 表写作 {0}.events / {0}.progress，工作区名称列写作 {1}（主库为 NULL）
+        :param workspace: None 为默认工作区（主库），工作区名称，或 ALL_WORKSPACES 表示全部
+        :param date_from: 查询涉及的最早日期，不晚于归档截止日期时合并归档库；None 表示不限
+        """
+        if workspace == self.ALL_WORKSPACES:
+            schemas = [None] + sorted(self.workspaces)
+        else:
+            schemas = [workspace]
+        parts = []
+        for name in schemas:
+            schema = self._schema(name)
+            parts.append(sql.format(schema, 'NULL' if name is None else f"'{name}'"))
+            if schema == 'main':
+                until = self._archive_until()
+                if until is not None and (date_from is None or date_from <= until):
+                    parts.append(sql.format('archive', 'NULL'))
+        return " UNION ALL ".join(parts)
+
+    def _note_workspace_write(self, schema):
+        """工作区不在主库的变更日志中：写入后单独计数，使 get_change_seq 照样增加（在写事务内调用）"""
+        if schema != 'main':
+            self.conn.execute('''
+                INSERT INTO main.meta (key, value) VALUES ('workspace_writes', 1)
+                ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+            ''')
+
+    def _select_events(self, where, params, order_by, date_from, workspace=None):
+        """
+        查询事件，date_from 不晚于归档截止日期时合并归档库中的结果
+        :param params: 命名参数字典
+        :param date_from: 查询涉及的最早日期；None 表示不限（有归档就合并）
+        :param workspace: 见 _federate
+        :return: 事件字典列表，额外包含 workspace 字段（默认工作区为 None）
+        """
+        sql = self._federate(f"SELECT *, {{1}} AS workspace FROM {{0}}.events WHERE {where}", workspace, date_from)
+        cursor = self.conn.execute(f"{sql} ORDER BY {order_by}", params)
+        return [dict(row) for row in cursor.fetchall()]
+
+    # ---------- 写入语句 ----------
+    def _write_columns(self, table, data):
+        """
+        按白名单校验字段，返回按固定顺序排列的列名元组
+        同一组字段无论字典中的顺序如何都得到同一个元组，从而得到同一条 SQL
+        """
+        allowed = self.WRITABLE_COLUMNS[table]
+        unknown = set(data) - set(allowed)
+        if unknown:
+            raise ValueError(f"未知字段: {', '.join(sorted(unknown))}")
+        return tuple(col for col in allowed if col in data)
+
+    @staticmethod
+    def _table(schema, table):
+        """主库的表不加库名（与原有语句保持一致），工作区的表写作 ws_名称.表名"""
+        return table if schema == 'main' else f"{schema}.{table}"
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _insert_sql(table, columns):
+        """INSERT 语句（按表和列组合缓存，列名只来自白名单）"""
+        return f"INSERT INTO {table} ({','.join(columns)}) VALUES ({','.join(['?'] * len(columns))})"
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _update_sql(table, columns):
+        """UPDATE ... WHERE id=? 语句（按表和列组合缓存，列名只来自白名单）"""
+        return f"UPDATE {table} SET {','.join(col + '=?' for col in columns)} WHERE id=?"
+
     # ---------- 事件操作 ----------
-    def add_event(self, event_data):
+    def add_event(self, event_data, workspace=None):
         """
         添加新事件
         :param event_data: 字典，包含字段：title, description, start_date, end_date,
                            start_time, end_time, completed, is_recurring, recurring_rule
                            (其中 title, start_date 为必填，其余可选)
+        :param workspace: 工作区名称，默认写入主库
         :return: 新插入事件的 id
         """
         required = ('title', 'start_date')
@@ -69,86 +758,365 @@ class Database:
             if key not in event_data:
                 raise ValueError(f"缺少必要字段: {key}")
 
-        columns = []
-        values = []
-        for key, value in event_data.items():
-            if value is not None:  # 忽略 None 值，使用数据库默认值
-                columns.append(key)
-                values.append(value)
-
-        placeholders = ','.join(['?'] * len(columns))
-        col_str = ','.join(columns)
-        sql = f"INSERT INTO events ({col_str}) VALUES ({placeholders})"
+        # 忽略 None 值，使用数据库默认值
+        columns = self._write_columns('events', {k: v for k, v in event_data.items() if v is not None})
+        values = [event_data[col] for col in columns]
+        schema = self._schema(workspace)
 
         with self.conn:
-            cursor = self.conn.execute(sql, values)
+            cursor = self.conn.execute(self._insert_sql(self._table(schema, 'events'), columns), values)
+            self._note_workspace_write(schema)
             return cursor.lastrowid
 
-    def update_event(self, event_id, event_data):
+    def add_events(self, events, workspace=None):
+        """
+        在一个事务中批量添加事件，任一事件出错时全部回滚
+        :param events: 可迭代对象，逐个产出与 add_event 相同的字典（可以是生成器，不必先读入内存）；
+                       只取可写字段，其余键（如 list --json 输出的 id、workspace）忽略
+        :param workspace: 工作区名称，默认写入主库
+        :return: 添加的事件数
+        """
+        columns = self.WRITABLE_COLUMNS['events']
+        flags = ('completed', 'is_recurring')
+
+        def rows():
+            for event_data in events:
+                for key in ('title', 'start_date'):
+                    if not event_data.get(key):
+                        raise ValueError(f"缺少必要字段: {key}")
+                yield [event_data.get(col) or 0 if col in flags else event_data.get(col) for col in columns]
+
+        schema = self._schema(workspace)
+        with self.conn:
+            cursor = self.conn.executemany(self._insert_sql(self._table(schema, 'events'), columns), rows())
+            self._note_workspace_write(schema)
+            return cursor.rowcount
+
+    def next_event_id(self):
+        """
+        下一个可用的事件 ID，供批量导入时预先分配 ID
+        兼顾 AUTOINCREMENT 的 sqlite_sequence，不会复用已删除事件的 ID
+        """
+        row = self.conn.execute('''
+            SELECT MAX(
+                COALESCE((SELECT MAX(id) FROM events), 0),
+                COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'events'), 0)
+            )
+        ''').fetchone()
+        return row[0] + 1
+
+    def update_event(self, event_id, event_data, workspace=None):
         """
         更新事件
         :param event_id: 事件 ID
         :param event_data: 字典，包含要更新的字段（字段名与表列一致）
+        :param workspace: 事件所在的工作区，默认为主库
         :return: 受影响的行数
         """
         if not event_data:
             return 0
 
-        set_clause = ','.join([f"{key}=?" for key in event_data])
-        values = list(event_data.values()) + [event_id]
-        sql = f"UPDATE events SET {set_clause} WHERE id=?"
+        columns = self._write_columns('events', event_data)
+        values = [event_data[col] for col in columns] + [event_id]
+        schema = self._schema(workspace)
+        sql = self._update_sql(self._table(schema, 'events'), columns)
 
         with self.conn:
             cursor = self.conn.execute(sql, values)
+            self._note_workspace_write(schema)
+        if schema != 'main':
             return cursor.rowcount
+        if cursor.rowcount == 0 and self._unarchive_event(event_id):
+            # 修改已归档的事件：先移回主库再更新
+            with self.conn:
+                cursor = self.conn.execute(sql, values)
+        return cursor.rowcount
 
-    def delete_event(self, event_id):
+    def delete_event(self, event_id, workspace=None):
         """
-        删除事件（关联的进度记录因外键 ON DELETE CASCADE 自动删除）
+        删除事件及其全部进度记录（连接没有开启 PRAGMA foreign_keys，表定义中的 ON DELETE CASCADE 不生效，
+        进度在同一事务中显式删除，每日汇总和同步变更日志的触发器才能看到这些删除）
         :param event_id: 事件 ID
+        :param workspace: 事件所在的工作区，默认为主库
         :return: 受影响的行数
         """
+        schema = self._schema(workspace)
+        if schema != 'main':
+            # 工作区文件可能没有主库的触发器，进度一并删除
+            with self.conn:
+                self.conn.execute(f"DELETE FROM {schema}.progress WHERE event_id=?", (event_id,))
+                cursor = self.conn.execute(f"DELETE FROM {schema}.events WHERE id=?", (event_id,))
+                self._note_workspace_write(schema)
+                return cursor.rowcount
+        self._unarchive_event(event_id)  # 已归档的事件先移回主库，保证汇总同步扣减
         with self.conn:
+            # 先删进度：同步触发器按事件 uid 记录进度的删除，事件删除后就取不到 uid 了
+            self.conn.execute("DELETE FROM progress WHERE event_id=?", (event_id,))
             cursor = self.conn.execute("DELETE FROM events WHERE id=?", (event_id,))
+            self.conn.execute("DELETE FROM event_sounds WHERE event_id=?", (event_id,))
             return cursor.rowcount
 
-    def get_event(self, event_id):
+    def get_event(self, event_id, workspace=None):
         """
         根据 ID 获取单个事件
         :param event_id: 事件 ID
+        :param workspace: 事件所在的工作区，默认为主库
         :return: 字典形式的事件数据，若不存在返回 None
         """
-        cursor = self.conn.execute("SELECT * FROM events WHERE id=?", (event_id,))
+        schema = self._schema(workspace)
+        cursor = self.conn.execute(f"SELECT * FROM {schema}.events WHERE id=?", (event_id,))
         row = cursor.fetchone()
+        if row is None and schema == 'main' and self._archive_until() is not None:
+            row = self.conn.execute("SELECT * FROM archive.events WHERE id=?", (event_id,)).fetchone()
         return dict(row) if row else None
 
     def get_all_events(self):
         """
-        获取所有事件
+        获取所有事件（按开始日期排序）；数据量大时请用 iter_events 逐条处理
         :return: 字典列表
         """
-        cursor = self.conn.execute("SELECT * FROM events ORDER BY start_date")
-        return [dict(row) for row in cursor.fetchall()]
+        return list(self.iter_events())
 
-    def get_events_by_date(self, date):
+    def get_events_by_date(self, date, workspace=None):
         """
         获取指定日期相关的所有事件
         :param date: 字符串，格式 YYYY-MM-DD
-        :return: 字典列表，包括单日事件和多天项目中覆盖该日期的事件
+        :param workspace: 工作区名称或 ALL_WORKSPACES（合并全部），默认为主库
+        :return: 字典列表，包括单日事件和多天项目中覆盖该日期的事件，额外包含 workspace 字段
+        """
+        # 多天项目按 end_date 走 idx_events_dates；+start_date 使其不去按 idx_events_start
+        # 扫描 start_date <= ?（那是全部历史）
+        return self._select_events('''
+            (end_date IS NULL AND start_date = :date)   -- 单日事件
+            OR (end_date IS NOT NULL AND +start_date <= :date AND end_date >= :date)  -- 多天覆盖
+        ''', {'date': date}, "start_time, start_date", date, workspace)
+
+    EVENT_FILTERS = ('start', 'end', 'completed', 'title')
+
+    def _event_filter(self, filters):
+        """
+        把筛选条件转换为 WHERE 条件
+        :param filters: 字典，可包含 start / end（与该日期范围有交集，含多天项目）、
+                        completed（0 或 1）、title（标题中包含的文字）
+        :return: (条件列表, 参数列表)
+        """
+        filters = filters or {}
+        unknown = set(filters) - set(self.EVENT_FILTERS)
+        if unknown:
+            raise ValueError(f"未知的筛选条件: {', '.join(sorted(unknown))}")
+        where, params = [], []
+        if filters.get('end') is not None:
+            where.append("start_date <= ?")
+            params.append(filters['end'])
+        if filters.get('start') is not None:
+            where.append("COALESCE(end_date, start_date) >= ?")
+            params.append(filters['start'])
+        if filters.get('completed') is not None:
+            where.append("completed = ?")
+            params.append(int(filters['completed']))
+        if filters.get('title'):
+            where.append("instr(title, ?) > 0")
+            params.append(filters['title'])
+        return where, params
+
+    def page_events(self, after_key=None, limit=100, filters=None):
+        """
+        按 (start_date, id) 顺序分页获取事件
+        键集分页：下一页从上一页最后一条的键之后开始，沿索引 idx_events_start 读取，翻到多深都只读本页的行
+        :param after_key: 上一页返回的 next_key，为空表示第一页
+        :param limit: 每页条数
+        :param filters: 筛选条件，见 _event_filter
+        :return: (事件字典列表, next_key)，没有更多数据时 next_key 为 None
+        """
+        where, params = self._event_filter(filters)
+        if after_key is not None:
+            where.append("(start_date, id) > (?, ?)")
+            params += list(after_key)
+        clause = ' AND '.join(where) or '1'
+        sql = f"SELECT * FROM main.events WHERE {clause}"
+        until = self._archive_until()
+        date_from = (filters or {}).get('start')
+        if (until is not None and (date_from is None or date_from <= until)
+                and (after_key is None or after_key[0] <= until)):
+            sql += f" UNION ALL SELECT * FROM archive.events WHERE {clause}"
+            params *= 2
+        cursor = self.conn.execute(f"{sql} ORDER BY start_date, id LIMIT ?", params + [limit])
+        events = [dict(row) for row in cursor.fetchall()]
+        next_key = (events[-1]['start_date'], events[-1]['id']) if len(events) == limit else None
+        return events, next_key
+
+    def iter_events(self, filters=None, batch_size=500):
+        """
+        流式获取事件，按 (start_date, id) 排序，内存占用只与 batch_size 有关
+        逐页读取（page_events），页与页之间不持有读事务，遍历期间同一连接或其他连接可以照常写入
+        :param filters: 筛选条件，见 _event_filter
+        :return: 生成器，逐个产出事件字典
+        """
+        key = None
+        while True:
+            events, key = self.page_events(key, batch_size, filters)
+            yield from events
+            if key is None:
+                break
+
+    def iter_events_between(self, start, end, batch_size=500):
+        """
+        流式获取与日期范围有交集的所有事件（含多天项目），按开始日期排序
+        :param start: 起始日期 YYYY-MM-DD（含）
+        :param end: 结束日期 YYYY-MM-DD（含）
+        :return: 生成器，逐个产出事件字典
+        """
+        return self.iter_events({'start': start, 'end': end}, batch_size)
+
+    def get_daily_summary(self, start, end):
+        """
+        获取日期范围内的每日汇总（只返回有数据的日期）
+        :param start: 起始日期 YYYY-MM-DD（含）
+        :param end: 结束日期 YYYY-MM-DD（含）
+        :return: 字典列表，每条包含 date, total, completed, progress_submitted
         """
         cursor = self.conn.execute('''
-            SELECT * FROM events
-            WHERE (end_date IS NULL AND start_date = ?)   -- 单日事件
-               OR (end_date IS NOT NULL AND start_date <= ? AND end_date >= ?)  -- 多天覆盖
-            ORDER BY start_time, start_date
-        ''', (date, date, date))
+            SELECT date, total, completed, progress_submitted FROM daily_summary
+            WHERE date BETWEEN ? AND ? AND (total > 0 OR progress_submitted > 0)
+            ORDER BY date
+        ''', (start, end))
         return [dict(row) for row in cursor.fetchall()]
 
+    def get_event_dates_in_range(self, start, end):
+        """
+        获取日期范围内有事件的所有日期（包括多天项目覆盖的每一天）
+        :return: 日期字符串集合
+        """
+        cursor = self.conn.execute(
+            "SELECT date FROM daily_summary WHERE date BETWEEN ? AND ? AND total > 0",
+            (start, end)
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+    def get_events_by_day(self, start, end, workspace=None):
+        """
+        一次范围查询获取日期范围内每一天的事件（周视图、日程视图用），在 Python 中按天分组
+        多天项目出现在它覆盖的每一天，当天的完成状态为当天是否提交了进度
+        :param start: 起始日期 YYYY-MM-DD（含）
+        :param end: 结束日期 YYYY-MM-DD（含）
+        :param workspace: 工作区名称或 ALL_WORKSPACES（合并全部），默认为主库
+        :return: [(日期, 事件字典列表), ...]，包含范围内的每一天（没有事件时列表为空），
+                 每天的事件按开始时间排序，额外包含 workspace 和 day_completed 字段
+        """
+        # 多天项目连带范围内已提交进度的日期一起取出（每条进度一行），条件同 get_events_by_date
+        sql = '''
+            SELECT e.*, {1} AS workspace, p.date AS progress_date
+            FROM {0}.events e
+            LEFT JOIN {0}.progress p
+                   ON p.event_id = e.id AND e.end_date IS NOT NULL AND p.date BETWEEN :start AND :end
+            WHERE (e.end_date IS NULL AND e.start_date BETWEEN :start AND :end)
+               OR (e.end_date IS NOT NULL AND +e.start_date <= :end AND e.end_date >= :start)
+        '''
+        query = self._federate(sql, workspace, start)
+        cursor = self.conn.execute(query + " ORDER BY start_time, start_date, id", {'start': start, 'end': end})
+
+        events = {}         # (工作区, id) -> 事件字典（保持查询顺序）
+        submitted = {}      # (工作区, id) -> 范围内已提交进度的日期集合
+        for row in cursor:
+            event = dict(row)
+            progress_date = event.pop('progress_date')
+            key = (event['workspace'], event['id'])
+            events.setdefault(key, event)
+            if progress_date is not None:
+                submitted.setdefault(key, set()).add(progress_date)
+
+        first = date.fromisoformat(start)
+        days = [(first + timedelta(days=i)).strftime("%Y-%m-%d")
+                for i in range((date.fromisoformat(end) - first).days + 1)]
+        by_day = {day: [] for day in days}
+        for event in events.values():
+            if event['end_date'] is None or event['end_date'] == event['start_date']:
+                if event['start_date'] in by_day:
+                    by_day[event['start_date']].append(dict(event, day_completed=event['completed']))
+                continue
+            done = submitted.get((event['workspace'], event['id']), ())
+            offset = max(0, (date.fromisoformat(event['start_date']) - first).days)
+            for day in days[offset:]:
+                if day > event['end_date']:
+                    break
+                by_day[day].append(dict(event, day_completed=int(day in done)))
+        return [(day, by_day[day]) for day in days]
+
+    # 今日视图的排序列 -> ORDER BY 各项（倒序时每项都加 DESC）
+    DAY_VIEW_SORTS = {
+        None: ('start_time', 'start_date'),
+        'title': ('title COLLATE NATURAL_NOCASE', 'id'),
+        'start_time': ('start_time IS NULL', 'start_time COLLATE NATURAL_NOCASE', 'id'),  # 空值在后
+        'status': ('day_completed', 'id'),
+    }
+
+    def get_day_view(self, date, sort=None, reverse=False, workspace=None):
+        """
+        获取指定日期的事件，状态列在同一条查询中计算并排序（今日视图、API 共用）
+        多天项目当天有进度为“已提交”，否则取之前最近一次进度“自动延续”，都没有为“未提交”；
+        其他事件按 completed 为“已完成 / 未完成”
+        :param date: 日期字符串 YYYY-MM-DD
+        :param sort: 排序列 'title'（自然顺序、忽略大小写）、'start_time' 或 'status'（当天是否完成），
+                     为空时按开始时间
+        :param reverse: 是否倒序
+        :param workspace: 工作区名称或 ALL_WORKSPACES（合并全部），默认为主库
+        :return: 事件字典列表，额外包含 workspace、status 和 day_completed 字段
+        """
+        if sort not in self.DAY_VIEW_SORTS:
+            raise ValueError(f"未知的排序列: {sort}")
+        sql = '''
+            SELECT e.*, {1} AS workspace,
+                   CASE WHEN e.end_date IS NULL OR e.end_date = e.start_date THEN e.completed
+                        ELSE p.id IS NOT NULL END AS day_completed,
+                   CASE WHEN e.end_date IS NULL OR e.end_date = e.start_date
+                            THEN CASE WHEN e.completed THEN '已完成' ELSE '未完成' END
+                        WHEN p.id IS NOT NULL THEN '已提交 (' || COALESCE(p.value, '') || '%)'
+                        ELSE COALESCE('自动延续 (' || (
+                            SELECT lp.value FROM {0}.progress lp
+                            WHERE lp.event_id = e.id AND lp.date < :date
+                            ORDER BY lp.date DESC LIMIT 1) || ')', '未提交')
+                   END AS status
+            FROM {0}.events e
+            LEFT JOIN {0}.progress p ON p.event_id = e.id AND p.date = :date
+            WHERE (e.end_date IS NULL AND e.start_date = :date)
+               OR (e.end_date IS NOT NULL AND +e.start_date <= :date AND e.end_date >= :date)  -- 同 get_events_by_date
+        '''
+        # 事件连同进度整体归档（或属于同一工作区），进度只需在事件所在的库中查找
+        query = self._federate(sql, workspace, date)
+        order_by = ', '.join(term + (' DESC' if reverse else '') for term in self.DAY_VIEW_SORTS[sort])
+        cursor = self.conn.execute(f"SELECT * FROM ({query}) ORDER BY {order_by}", {'date': date})
+        return [dict(row) for row in cursor.fetchall()]
+
+    # ---------- 提醒声音 ----------
+    def get_event_sounds(self, event_ids):
+        """
+        获取事件的自定义提醒声音
+        :param event_ids: 事件 ID 列表
+        :return: 字典 事件ID -> 声音文件路径（未设置的事件不在其中）
+        """
+        event_ids = list(event_ids)
+        if not event_ids:
+            return {}
+        cursor = self.conn.execute(
+            f"SELECT event_id, path FROM event_sounds WHERE event_id IN ({','.join(['?'] * len(event_ids))})",
+            event_ids)
+        return {row[0]: row[1] for row in cursor.fetchall()}
+
+    def set_event_sound(self, event_id, path):
+        """设置事件的自定义提醒声音，path 为空表示恢复默认声音"""
+        with self.conn:
+            if path:
+                self.conn.execute("INSERT OR REPLACE INTO event_sounds (event_id, path) VALUES (?, ?)",
+                                  (event_id, path))
+            else:
+                self.conn.execute("DELETE FROM event_sounds WHERE event_id=?", (event_id,))
+
     # ---------- 进度操作 ----------
-    def add_progress(self, progress_data):
+    def add_progress(self, progress_data, workspace=None):
         """
         添加进度记录
         :param progress_data: 字典，包含 event_id, date, value, completed
+        :param workspace: 事件所在的工作区，默认为主库
         :return: 新插入进度的 id
         """
         required = ('event_id', 'date')
@@ -156,82 +1124,193 @@ class Database:
             if key not in progress_data:
                 raise ValueError(f"缺少必要字段: {key}")
 
-        columns = []
-        values = []
-        for key in ('event_id', 'date', 'value', 'completed'):
-            if key in progress_data and progress_data[key] is not None:
-                columns.append(key)
-                values.append(progress_data[key])
-
-        placeholders = ','.join(['?'] * len(columns))
-        col_str = ','.join(columns)
-        sql = f"INSERT INTO progress ({col_str}) VALUES ({placeholders})"
+        columns = self._write_columns('progress', {k: v for k, v in progress_data.items() if v is not None})
+        values = [progress_data[col] for col in columns]
+        schema = self._schema(workspace)
+        if schema == 'main':
+            self._unarchive_event(progress_data['event_id'])  # 进度与事件保持在同一个库
 
         with self.conn:
-            cursor = self.conn.execute(sql, values)
+            cursor = self.conn.execute(self._insert_sql(self._table(schema, 'progress'), columns), values)
+            self._note_workspace_write(schema)
             return cursor.lastrowid
 
-    def update_progress(self, progress_id, progress_data):
+    def update_progress(self, progress_id, progress_data, workspace=None):
         """
         更新进度记录
         :param progress_id: 进度 ID
         :param progress_data: 字典，包含要更新的字段
+        :param workspace: 进度所在的工作区，默认为主库
         :return: 受影响的行数
         """
         if not progress_data:
             return 0
 
-        set_clause = ','.join([f"{key}=?" for key in progress_data])
-        values = list(progress_data.values()) + [progress_id]
-        sql = f"UPDATE progress SET {set_clause} WHERE id=?"
+        columns = self._write_columns('progress', progress_data)
+        values = [progress_data[col] for col in columns] + [progress_id]
+        schema = self._schema(workspace)
+        sql = self._update_sql(self._table(schema, 'progress'), columns)
 
         with self.conn:
             cursor = self.conn.execute(sql, values)
+            self._note_workspace_write(schema)
+        if schema != 'main':
             return cursor.rowcount
+        if cursor.rowcount == 0 and self._archive_until() is not None:
+            # 进度属于已归档的事件：连同事件移回主库再更新
+            row = self.conn.execute(
+                "SELECT event_id FROM archive.progress WHERE id=?", (progress_id,)).fetchone()
+            if row and self._unarchive_event(row[0]):
+                with self.conn:
+                    cursor = self.conn.execute(sql, values)
+        return cursor.rowcount
 
-    def get_progress_for_event_and_date(self, event_id, date):
+    def get_progress_for_event_and_date(self, event_id, date, workspace=None):
         """
         获取某事件在指定日期的进度
         :param event_id: 事件 ID
         :param date: 日期字符串 YYYY-MM-DD
+        :param workspace: 事件所在的工作区，默认为主库
         :return: 字典形式的进度数据，若不存在返回 None
         """
+        schema = self._schema(workspace)
         cursor = self.conn.execute(
-            "SELECT * FROM progress WHERE event_id=? AND date=?",
+            f"SELECT * FROM {schema}.progress WHERE event_id=? AND date=?",
             (event_id, date)
         )
         row = cursor.fetchone()
+        if row is None and schema == 'main':
+            until = self._archive_until()
+            if until is not None and date <= until:
+                row = self.conn.execute(
+                    "SELECT * FROM archive.progress WHERE event_id=? AND date=?", (event_id, date)
+                ).fetchone()
         return dict(row) if row else None
 
 
     def get_latest_progress_before_date(self, event_id, date):
         """获取指定事件在指定日期之前最近一次的手动提交进度记录（按日期降序）"""
-        cursor = self.conn.execute('''
-            SELECT * FROM progress 
-            WHERE event_id = ? AND date < ? 
+        sql = '''
+            SELECT * FROM {}.progress
+            WHERE event_id = ? AND date < ?
             ORDER BY date DESC LIMIT 1
-        ''', (event_id, date))
-        row = cursor.fetchone()
+        '''
+        row = self.conn.execute(sql.format('main'), (event_id, date)).fetchone()
+        # 事件连同进度整体归档，主库中没有时才需要查归档库
+        if row is None and self._archive_until() is not None:
+            row = self.conn.execute(sql.format('archive'), (event_id, date)).fetchone()
         return dict(row) if row else None
 
 
+    def get_progress_by_event(self, event_id, workspace=None):
+        """
+        获取某事件的全部进度记录，按日期升序
+        :param event_id: 事件 ID
+        :param workspace: 事件所在的工作区，默认为主库
+        :return: 字典列表
+        """
+        schema = self._schema(workspace)
+        sql = "SELECT * FROM {}.progress WHERE event_id = ? ORDER BY date"
+        rows = self.conn.execute(sql.format(schema), (event_id,)).fetchall()
+        # 事件连同进度整体归档，主库中没有时才需要查归档库
+        if not rows and schema == 'main' and self._archive_until() is not None:
+            rows = self.conn.execute(sql.format('archive'), (event_id,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_progress_series(self, event_id, until=None, workspace=None):
+        """
+        多天项目的逐日进度序列（进度图用）：一次按索引 (event_id, date) 读取全部进度，
+        再顺序扫描一遍补齐未提交的日期（延续之前最近一次的值，与今日视图的“自动延续”一致）
+        :param event_id: 事件 ID
+        :param until: 序列截止日期，默认为项目结束日期与今天中较早的一个（已有更晚的进度时延伸到该日）；
+                      不早于序列的第一天，尚未开始的项目也至少返回第一天
+        :param workspace: 事件所在的工作区，默认为主库
+        :return: (事件字典, [(日期, 数值, 当天是否提交), ...])，第一次提交之前数值为 None；
+                 事件不存在时返回 (None, [])
+        """
+        event = self.get_event(event_id, workspace)
+        if event is None:
+            return None, []
+        rows = self.get_progress_by_event(event_id, workspace)
+        first = min([event['start_date']] + [row['date'] for row in rows[:1]])
+        if until is None:
+            until = min(event['end_date'] or event['start_date'], date.today().strftime("%Y-%m-%d"))
+            if rows:
+                until = max(until, rows[-1]['date'])
+        until = max(until, first)
+
+        series = []
+        day = datetime.strptime(first, "%Y-%m-%d").date()
+        last = datetime.strptime(until, "%Y-%m-%d").date()
+        i, value = 0, None
+        while day <= last:
+            day_str = day.strftime("%Y-%m-%d")
+            submitted = i < len(rows) and rows[i]['date'] == day_str
+            if submitted:
+                value = rows[i]['value']
+                i += 1
+            series.append((day_str, value, submitted))
+            day += timedelta(days=1)
+        return event, series
+
     def get_progress_for_date(self, date):
         """
         获取指定日期所有事件的进度（附带事件标题等信息）
         :param date: 日期字符串 YYYY-MM-DD
         :return: 字典列表，每条包含事件信息和进度信息
         """
-        cursor = self.conn.execute('''
-            SELECT e.id, e.title, e.description, e.start_time, e.end_time,
+        sql = '''
+            SELECT e.id, e.title, e.description, e.start_time, e.end_time, e.start_date,
                    p.id as progress_id, p.value, p.completed as day_completed
-            FROM events e
-            LEFT JOIN progress p ON e.id = p.event_id AND p.date = ?
+            FROM {0}.events e
+            LEFT JOIN {0}.progress p ON e.id = p.event_id AND p.date = ?
             WHERE (e.end_date IS NULL AND e.start_date = ?)
-               OR (e.end_date IS NOT NULL AND e.start_date <= ? AND e.end_date >= ?)
-            ORDER BY e.start_time, e.start_date
-        ''', (date, date, date, date))
+               OR (e.end_date IS NOT NULL AND +e.start_date <= ? AND e.end_date >= ?)  -- 同 get_events_by_date
+        '''
+        params = (date, date, date, date)
+        query = sql.format('main')
+        until = self._archive_until()
+        if until is not None and date <= until:
+            query += " UNION ALL " + sql.format('archive')
+            params *= 2
+        cursor = self.conn.execute(query + " ORDER BY start_time, start_date", params)
         return [dict(row) for row in cursor.fetchall()]
 
+    # ---------- 批量读取 ----------
+    TABLE_COLUMNS = {
+        'events': ('id', 'title', 'description', 'start_date', 'end_date', 'start_time',
+                   'end_time', 'completed', 'is_recurring', 'recurring_rule', 'uid'),
+        'progress': ('id', 'event_id', 'date', 'value', 'completed'),
+    }
+
+    def iter_table(self, table, batch_size=1000):
+        """
+        按主键顺序流式读取整张表（包括已归档的行），每次从游标取 batch_size 行，内存占用与表大小无关
+        :param table: 'events' 或 'progress'
+        :return: 生成器，逐行产出字典
+        """
+        if table not in self.TABLE_COLUMNS:
+            raise ValueError(f"未知的表: {table}")
+        schemas = ['main'] + (['archive'] if self._archive_until() is not None else [])
+        # 归档时保留原 ID，主库和归档库各自按主键读取后归并，不需要对整张表排序
+        return heapq.merge(*(self._iter_schema_table(schema, table, batch_size) for schema in schemas),
+                           key=lambda row: row['id'])
+
+    def _iter_schema_table(self, schema, table, batch_size):
+        cols = ','.join(self.TABLE_COLUMNS[table])
+        # 使用独立游标，迭代期间不影响同一连接上的其他查询
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT {cols} FROM {schema}.{table} ORDER BY id")
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(row)
+        finally:
+            cursor.close()
+
     def __enter__(self):
         """支持上下文管理器"""
         return self
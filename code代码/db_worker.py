@@ -0,0 +1,123 @@
+import queue
+import threading
+from concurrent.futures import Future
+
+from database import Database
+
+# 界面线程的命令队列（dispatch.UiDispatcher），由 use_dispatcher 设置
+_dispatcher = None
+
+
+class DBWorker:
+    """后台数据库工作线程
+
+    所有请求在同一个线程中按顺序执行，该线程持有自己的 SQLite 连接
+    （sqlite3 连接不能跨线程使用）。submit 返回 concurrent.futures.Future，
+    界面线程通过 deliver 在 Tk 事件循环中拿到结果，不会阻塞绘制。
+    """
+
+    def __init__(self, db_path='todo.db', name="db-worker", init_schema=True):
+        self.db_path = db_path
+        self.init_schema = init_schema
+        self._requests = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            db = Database(self.db_path, init_schema=self.init_schema)
+        except Exception as e:
+            # 数据库打不开：之后的请求都以该错误结束，而不是一直等待
+            db, init_error = None, e
+        try:
+            while True:
+                item = self._requests.get()
+                if item is None:  # 停止信号
+                    break
+                future, func, args, kwargs = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if db is None:
+                    future.set_exception(init_error)
+                    continue
+                try:
+                    result = func(db, *args, **kwargs)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+        finally:
+            if db is not None:
+                db.close()
+
+    def submit(self, func, *args, **kwargs):
+        """
+        提交一个请求
+        :param func: 可调用对象，第一个参数为工作线程的 Database 实例
+        :return: Future
+        """
+        future = Future()
+        self._requests.put((future, func, args, kwargs))
+        return future
+
+    def call(self, method_name, *args, **kwargs):
+        """按方法名调用 Database 的方法，如 call('get_events_by_date', '2026-02-18')"""
+        return self.submit(lambda db: getattr(db, method_name)(*args, **kwargs))
+
+    def stop(self, wait=True):
+        """停止工作线程（已提交的请求会先执行完）"""
+        self._requests.put(None)
+        if wait:
+            self._thread.join()
+
+
+def use_dispatcher(dispatcher):
+    """
+    之后的 deliver 不再逐个轮询 future，而是在 future 完成时由工作线程把回调 post 给 dispatcher，
+    在界面线程中执行；传 None 恢复轮询
+    """
+    global _dispatcher
+    _dispatcher = dispatcher
+
+
+def deliver(root, future, callback, errback=None, interval=15):
+    """
+    在 Tk 线程中等待 future 完成后调用 callback(result)
+    设置了 use_dispatcher 时经由命令队列回到 Tk 线程，否则通过 root.after 轮询；都不在工作线程里碰 Tk 对象
+    :param errback: 出错时调用 errback(exception)，为空则打印错误
+    """
+    if _dispatcher is not None:
+        dispatcher = _dispatcher
+        name = f"deliver:{getattr(callback, '__qualname__', '')}"
+        expected = dispatcher.expect()      # 结果到达前命令队列保持快速轮询
+        future.add_done_callback(
+            lambda f: dispatcher.post(_finish, root, f, callback, errback, True, name=name, expected=expected))
+        return
+
+    def check():
+        if not future.done():
+            root.after(interval, check)
+            return
+        _finish(root, future, callback, errback)
+
+    check()
+
+
+def _finish(root, future, callback, errback, check_alive=False):
+    """future 已完成：在 Tk 线程中调用 callback 或 errback"""
+    if check_alive:
+        try:
+            if not root.winfo_exists():
+                return          # 发起查询的窗口已关闭
+        except Exception:
+            return
+    if future.cancelled():
+        return
+    exc = future.exception()
+    if exc is not None:
+        if errback:
+            errback(exc)
+        else:
+            print(f"数据库查询失败: {exc}")
+        return
+    callback(future.result())
@@ -0,0 +1,131 @@
+"""
+跨线程命令分发：托盘、单实例监听、数据库工作线程等把要在界面线程中执行的函数 post 进队列，
+由 Tk 主循环定时取出执行（Tk 对象只能在创建它的线程中使用，其他线程直接调用可能卡死）
+
+Windows 上的 Tk 不支持 createfilehandler，无法用管道唤醒主循环，因此用 after 轮询，
+其他线程也不能调用 after 提前唤醒。为了不在空闲时每 15 毫秒唤醒一次：
+- 有命令时按 interval_ms 轮询，空闲时间隔逐次加倍，最长 idle_ms；
+- 界面线程提交命令，或通过 expect 预告稍后会有结果（如 deliver 等待数据库查询）时，立即恢复快速轮询，
+  预告的结果到达前不放慢。托盘、单实例转发等其他线程主动提交的命令空闲时最多额外等待 idle_ms。
+每条命令记录从 post 到开始执行的等待时长，stats() 按命令名汇总。
+"""
+import queue
+import threading
+import traceback
+from collections import defaultdict, deque
+
+from clock import SystemClock
+
+
+class UiDispatcher:
+    """跨线程命令队列，在界面线程中按提交顺序执行"""
+    def __init__(self, root=None, clock=None, interval_ms=15, idle_ms=200, max_per_tick=200, window=1000):
+        """
+        :param root: Tk 根窗口（使用默认时钟时用于 after）
+        :param clock: 时钟，默认 SystemClock(root)
+        :param interval_ms: 有命令时的轮询间隔（毫秒）
+        :param idle_ms: 空闲时轮询间隔的上限（毫秒）
+        :param max_per_tick: 每次最多执行的命令数，其余留到下一次，避免长时间占住界面
+        :param window: 每个命令名保留最近多少次等待时长用于统计
+        """
+        self.clock = clock or SystemClock(root)
+        self.interval_ms = interval_ms
+        self.idle_ms = idle_ms
+        self.max_per_tick = max_per_tick
+        self._queue = queue.SimpleQueue()
+        self._waits = defaultdict(lambda: deque(maxlen=window))  # 命令名 -> 最近的等待时长（秒）
+        self._counts = defaultdict(int)
+        self._lock = threading.Lock()   # stats() 可能在其他线程（如 API 服务）中调用
+        self._after_id = None
+        self._delay = interval_ms       # 当前轮询间隔
+        self._expected = 0              # 已预告、尚未到达的命令数（只在界面线程中读写）
+        self._ui_thread = None
+        self._running = False
+
+    def post(self, func, *args, name=None, expected=False):
+        """
+        任意线程调用：把 func(*args) 放入队列，稍后在界面线程中执行
+        :param name: 统计用的命令名，默认为函数名
+        :param expected: 这条命令是否已由 expect 预告（预告返回 True 时才传 True）
+        """
+        self._queue.put((self.clock.monotonic(), name or getattr(func, '__qualname__', repr(func)), func, args,
+                         expected))
+        self.wake()
+
+    def expect(self):
+        """
+        预告稍后会有其他线程提交一条命令，在它到达前保持快速轮询
+        只在界面线程中生效，返回是否已计入；提交那条命令时把返回值作为 post 的 expected 参数
+        """
+        if threading.get_ident() != self._ui_thread:
+            return False
+        self._expected += 1
+        self.wake()
+        return True
+
+    def wake(self):
+        """空闲放慢了轮询时立即恢复快速轮询；在其他线程中调用时什么也不做（after 只能在界面线程中调用）"""
+        if (threading.get_ident() == self._ui_thread and self._after_id is not None
+                and self._delay > self.interval_ms):
+            self.clock.after_cancel(self._after_id)
+            self._delay = self.interval_ms
+            self._after_id = self.clock.after(self._delay, self._pump)
+
+    def start(self):
+        """开始轮询（在界面线程中调用）"""
+        if not self._running:
+            self._running = True
+            self._ui_thread = threading.get_ident()
+            self._pump()
+        return self
+
+    def stop(self):
+        self._running = False       # 在命令中调用（如托盘“退出”）时，本次执行完不再安排下一次
+        if self._after_id is not None:
+            self.clock.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _pump(self):
+        self._after_id = None       # 执行命令期间 wake 不重复安排
+        if self.run_pending() or self._expected:
+            self._delay = self.interval_ms
+        else:
+            self._delay = min(self._delay * 2, self.idle_ms)
+        if self._running:
+            self._after_id = self.clock.after(self._delay, self._pump)
+
+    def run_pending(self):
+        """立即执行队列中的命令（最多 max_per_tick 条），返回执行的条数"""
+        count = 0
+        while count < self.max_per_tick:
+            try:
+                posted, name, func, args, expected = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if expected:
+                self._expected -= 1
+            wait = self.clock.monotonic() - posted
+            with self._lock:
+                self._waits[name].append(wait)
+                self._counts[name] += 1
+            count += 1
+            try:
+                func(*args)
+            except Exception:
+                # 与 Tk 回调一样只打印，不影响后面的命令
+                traceback.print_exc()
+        return count
+
+    def stats(self):
+        """
+        各命令的等待时长（毫秒）
+        :return: {命令名: {'count': 总次数, 'p50', 'p95', 'max': 最近 window 次的分位数和最大值}}
+        """
+        with self._lock:
+            snapshot = {name: (self._counts[name], sorted(waits)) for name, waits in self._waits.items()}
+        result = {}
+        for name, (count, waits) in snapshot.items():
+            def pct(p):
+                return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 2)
+            result[name] = {'count': count, 'p50': pct(0.5), 'p95': pct(0.95), 'max': round(waits[-1] * 1000, 2)}
+        return result
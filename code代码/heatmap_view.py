@@ -0,0 +1,140 @@
+import tkinter as tk
+from tkinter import ttk
+from datetime import date, timedelta
+
+from db_worker import deliver
+
+# 完成比例对应的颜色：无事件、0、(0,25%)、[25%,50%)、[50%,75%)、[75%,100%)、100%
+EMPTY_COLOR = "#ebedf0"
+RATIO_COLORS = ["#fde2e1", "#d6f0d0", "#a8dba0", "#6cc06a", "#3b9a45", "#1f6b2c"]
+
+CELL = 13   # 单元格边长（像素）
+GAP = 3     # 单元格间距
+LEFT = 30   # 左侧星期标签宽度
+TOP = 20    # 顶部月份标签高度
+
+
+def ratio_color(total, completed):
+    """根据当天事件总数和完成数返回颜色"""
+    if not total:
+        return EMPTY_COLOR
+    if completed >= total:
+        return RATIO_COLORS[-1]
+    if completed <= 0:
+        return RATIO_COLORS[0]
+    return RATIO_COLORS[1 + int(completed / total * 4)]
+
+
+class HeatmapView:
+    """全年热力图视图：一个 Canvas 绘制全年每一天，颜色表示完成比例"""
+    def __init__(self, parent, db, app_callback, worker):
+        self.parent = parent
+        self.db = db
+        self.app_callback = app_callback  # 双击日期时跳转到今日视图
+        self.worker = worker
+        self.year = date.today().year
+        self.cells = {}        # 日期字符串 -> 矩形 item id
+        self.colors = {}       # 日期字符串 -> 当前颜色，用于只重绘变化的单元格
+        self.summary = {}      # 日期字符串 -> (total, completed)
+        self._load_seq = 0
+
+        self.frame = ttk.Frame(parent)
+        self.frame.pack(fill=tk.BOTH, expand=True)
+
+        nav_frame = ttk.Frame(self.frame)
+        nav_frame.pack(fill=tk.X, padx=5, pady=5)
+        ttk.Button(nav_frame, text="< 上一年", command=lambda: self.set_year(self.year - 1)).pack(side=tk.LEFT, padx=2)
+        self.year_label = ttk.Label(nav_frame, text="", font=("Arial", 12, "bold"))
+        self.year_label.pack(side=tk.LEFT, expand=True)
+        self.loading_label = ttk.Label(nav_frame, text="", foreground="gray")
+        self.loading_label.pack(side=tk.LEFT, padx=5)
+        ttk.Button(nav_frame, text="下一年 >", command=lambda: self.set_year(self.year + 1)).pack(side=tk.RIGHT, padx=2)
+
+        width = LEFT + 54 * (CELL + GAP)
+        height = TOP + 7 * (CELL + GAP)
+        self.canvas = tk.Canvas(self.frame, width=width, height=height, bg="white", highlightthickness=0)
+        self.canvas.pack(padx=5, pady=5)
+
+        self.info_label = ttk.Label(self.frame, text="")
+        self.info_label.pack(pady=5)
+
+        self.draw_grid()
+
+    def set_year(self, year):
+        self.year = year
+        self.draw_grid()
+
+    def draw_grid(self):
+        """创建全年的单元格（仅在切换年份时执行），随后加载数据着色"""
+        self.canvas.delete("all")
+        self.cells.clear()
+        self.colors.clear()
+        self.summary.clear()
+        self.year_label.config(text=f"{self.year}年")
+
+        for row, name in ((0, "一"), (2, "三"), (4, "五")):
+            self.canvas.create_text(LEFT - 6, TOP + row * (CELL + GAP) + CELL // 2,
+                                    text=name, anchor="e", font=("Arial", 8))
+
+        first = date(self.year, 1, 1)
+        day = first
+        while day.year == self.year:
+            # 列为第几周（以 1 月 1 日所在周的周一为起点），行为星期几
+            col = (day.toordinal() - (first.toordinal() - first.weekday())) // 7
+            row = day.weekday()
+            x = LEFT + col * (CELL + GAP)
+            y = TOP + row * (CELL + GAP)
+            date_str = day.strftime("%Y-%m-%d")
+            item = self.canvas.create_rectangle(x, y, x + CELL, y + CELL, fill=EMPTY_COLOR,
+                                                outline="", tags=("cell", date_str))
+            self.cells[date_str] = item
+            self.colors[date_str] = EMPTY_COLOR
+            if day.day == 1:
+                self.canvas.create_text(x, TOP - 6, text=f"{day.month}月", anchor="w", font=("Arial", 8))
+            day += timedelta(days=1)
+
+        self.canvas.tag_bind("cell", "<Enter>", self._on_hover)
+        self.canvas.tag_bind("cell", "<Double-Button-1>", self._on_double_click)
+        self.refresh()
+
+    def refresh(self):
+        """一次范围查询获取全年每日汇总，完成后只重绘颜色有变化的单元格"""
+        self._load_seq += 1
+        seq = self._load_seq
+        year = self.year
+        self.loading_label.config(text="加载中…")
+        future = self.worker.call('get_daily_summary', f"{year:04d}-01-01", f"{year:04d}-12-31")
+        deliver(self.frame, future, lambda rows: self._on_loaded(seq, year, rows))
+
+    def _on_loaded(self, seq, year, rows):
+        if seq != self._load_seq or year != self.year:
+            return
+        self.loading_label.config(text="")
+        summary = {row['date']: (row['total'], row['completed']) for row in rows}
+        # 之前有数据、现在没有的日期也需要恢复为空白
+        for date_str in set(self.summary) | set(summary):
+            total, completed = summary.get(date_str, (0, 0))
+            color = ratio_color(total, completed)
+            if self.colors.get(date_str) != color and date_str in self.cells:
+                self.canvas.itemconfig(self.cells[date_str], fill=color)
+                self.colors[date_str] = color
+        self.summary = summary
+
+    def _date_at_pointer(self):
+        items = self.canvas.find_withtag("current")
+        if not items:
+            return None
+        tags = [t for t in self.canvas.gettags(items[0]) if t not in ("cell", "current")]
+        return tags[0] if tags else None
+
+    def _on_hover(self, event):
+        date_str = self._date_at_pointer()
+        if not date_str:
+            return
+        total, completed = self.summary.get(date_str, (0, 0))
+        self.info_label.config(text=f"{date_str}：共 {total} 项，已完成 {completed} 项")
+
+    def _on_double_click(self, event):
+        date_str = self._date_at_pointer()
+        if date_str and self.app_callback:
+            self.app_callback(date_str)
@@ -0,0 +1,426 @@
+"""
+iCalendar (.ics) 导入 / 导出
+
+- 解析器逐行读取（处理折行），每遇到一个 VEVENT 产出一个字典，不把整个文件读进内存
+- DTSTART/DTEND/SUMMARY/DESCRIPTION 映射到 events 表的日期、时间、标题、描述
+- 简单的 RRULE（每天 / 每周几 / 每月 / 每年）映射为 recurring_rule，
+  例如 "daily"、"weekly mon,wed,fri"；无法映射的规则原样保存为 "RRULE:..."
+- ical_map 表记录 UID -> 事件ID 及内容摘要，重复导入同一日历时只写入有变化的 UID
+
+命令行用法：
+    python ical.py import team.ics [--source 名称] [--prune]
+    python ical.py export out.ics
+"""
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+
+from database import Database
+
+WEEKDAYS = {'MO': 'mon', 'TU': 'tue', 'WE': 'wed', 'TH': 'thu', 'FR': 'fri', 'SA': 'sat', 'SU': 'sun'}
+WEEKDAYS_REVERSE = {v: k for k, v in WEEKDAYS.items()}
+
+# 参与摘要比较的字段；completed 是本地状态，重新导入时不覆盖
+SYNC_FIELDS = ('title', 'description', 'start_date', 'end_date', 'start_time', 'end_time',
+               'is_recurring', 'recurring_rule')
+
+
+def ensure_schema(db):
+    """创建 UID 映射表（如果不存在）"""
+    with db.conn:
+        db.conn.execute('''
+            CREATE TABLE IF NOT EXISTS ical_map (
+                uid TEXT PRIMARY KEY,
+                event_id INTEGER NOT NULL,
+                source TEXT NOT NULL,        -- 来源日历，用于 --prune 只清理同一来源
+                digest TEXT NOT NULL,        -- 映射字段的摘要，未变化则跳过
+                seen INTEGER DEFAULT 1,      -- 本次导入是否出现过
+                FOREIGN KEY (event_id) REFERENCES events (id) ON DELETE CASCADE
+            )
+        ''')
+        db.conn.execute("CREATE INDEX IF NOT EXISTS idx_ical_map_event ON ical_map(event_id)")
+        db.conn.execute("CREATE INDEX IF NOT EXISTS idx_ical_map_source ON ical_map(source, seen)")
+
+
+# ---------- 解析 ----------
+def _unfold(fp):
+    """合并折行（以空格或制表符开头的行是上一行的延续）"""
+    current = None
+    for raw in fp:
+        line = raw.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def _parse_line(line):
+    """解析 "NAME;PARAM=V:VALUE"，返回 (name, params, value)"""
+    head, _, value = line.partition(':')
+    parts = head.split(';')
+    params = {}
+    for part in parts[1:]:
+        key, _, val = part.partition('=')
+        params[key.upper()] = val.strip('"')
+    return parts[0].upper(), params, value
+
+
+def _unescape(text):
+    out = []
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if ch == '\\' and i + 1 < len(text):
+            nxt = text[i + 1]
+            out.append('\n' if nxt in 'nN' else nxt)
+            i += 2
+        else:
+            out.append(ch)
+            i += 1
+    return ''.join(out)
+
+
+def iter_vevents(fp):
+    """
+    流式解析 .ics 文件对象
+    :return: 生成器，每个 VEVENT 产出 {属性名: (params, value)}
+    """
+    current = None
+    for line in _unfold(fp):
+        if not line:
+            continue
+        name, params, value = _parse_line(line)
+        if name == 'BEGIN' and value.upper() == 'VEVENT':
+            current = {}
+        elif name == 'END' and value.upper() == 'VEVENT':
+            if current is not None:
+                yield current
+            current = None
+        elif current is not None and name not in current:
+            current[name] = (params, value)
+
+
+def _parse_datetime(params, value):
+    """
+    解析 DTSTART/DTEND 的值
+    :return: (date, 'HH:MM' 或 None)；全天事件时间为 None，UTC 时间转换为本地时间
+    """
+    value = value.strip()
+    if params.get('VALUE') == 'DATE' or len(value) == 8:
+        return datetime.strptime(value[:8], "%Y%m%d").date(), None
+    dt = datetime.strptime(value[:15], "%Y%m%dT%H%M%S")
+    if value.endswith('Z'):
+        dt = dt.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    return dt.date(), dt.strftime("%H:%M")
+
+
+def rrule_to_rule(rrule, start_date):
+    """把 RRULE 映射为 recurring_rule；非简单规则原样保留"""
+    parts = dict(p.split('=', 1) for p in rrule.upper().split(';') if '=' in p)
+    freq = parts.pop('FREQ', None)
+    byday = parts.pop('BYDAY', None)
+    if parts.pop('INTERVAL', '1') != '1' or parts:
+        return f"RRULE:{rrule}"
+    if freq == 'DAILY' and not byday:
+        return "daily"
+    if freq == 'WEEKLY':
+        if byday:
+            days = [WEEKDAYS.get(d) for d in byday.split(',')]
+            if None in days:
+                return f"RRULE:{rrule}"
+        else:
+            days = [list(WEEKDAYS.values())[start_date.weekday()]]
+        return "weekly " + ','.join(days)
+    if freq in ('MONTHLY', 'YEARLY') and not byday:
+        return freq.lower()
+    return f"RRULE:{rrule}"
+
+
+def rule_to_rrule(rule):
+    """recurring_rule -> RRULE 值（不含 "RRULE:" 前缀），无法表示时返回 None"""
+    if not rule:
+        return None
+    if rule.startswith("RRULE:"):
+        return rule[len("RRULE:"):]
+    if rule in ('daily', 'monthly', 'yearly'):
+        return f"FREQ={rule.upper()}"
+    if rule.startswith('weekly'):
+        days = rule[len('weekly'):].strip()
+        if not days:
+            return "FREQ=WEEKLY"
+        codes = [WEEKDAYS_REVERSE.get(d.strip()) for d in days.split(',')]
+        if None in codes:
+            return None
+        return "FREQ=WEEKLY;BYDAY=" + ','.join(codes)
+    return None
+
+
+def vevent_to_event(vevent):
+    """
+    把 VEVENT 映射为 events 行
+    :return: (uid, 事件字典)；缺少 DTSTART 时返回 (uid, None)
+    """
+    uid = vevent.get('UID', ({}, ''))[1].strip()
+    if 'DTSTART' not in vevent:
+        return uid, None
+    start, start_time = _parse_datetime(*vevent['DTSTART'])
+    end, end_time = None, None
+    if 'DTEND' in vevent:
+        end, end_time = _parse_datetime(*vevent['DTEND'])
+        if start_time is None:
+            end -= timedelta(days=1)  # 全天事件的 DTEND 不包含当天
+
+    event = {
+        'title': _unescape(vevent.get('SUMMARY', ({}, ''))[1]) or "(无标题)",
+        'description': _unescape(vevent['DESCRIPTION'][1]) if 'DESCRIPTION' in vevent else None,
+        'start_date': start.strftime("%Y-%m-%d"),
+        'end_date': end.strftime("%Y-%m-%d") if end and end > start else None,
+        'start_time': start_time,
+        'end_time': end_time,
+        'is_recurring': 0,
+        'recurring_rule': None,
+        'completed': 1 if vevent.get('X-TODO-COMPLETED', ({}, '0'))[1].strip() == '1' else 0,
+    }
+    if 'RRULE' in vevent:
+        event['is_recurring'] = 1
+        event['recurring_rule'] = rrule_to_rule(vevent['RRULE'][1].strip(), start)
+    return uid, event
+
+
+def _digest(event):
+    payload = json.dumps([event[f] for f in SYNC_FIELDS], ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+# ---------- 导入 ----------
+def import_ics(db, fp, source, prune=False, chunk_size=1000, progress=None):
+    """
+    导入 .ics 文件对象，按 UID 增量同步
+    :param source: 来源名称（一般为文件名），同一来源重复导入时更新而不是重复插入
+    :param prune: 为 True 时删除该来源中本次文件里已不存在的 UID 对应的事件
+    :param progress: 回调 progress(已处理的 VEVENT 数)
+    :return: 统计字典 {'inserted', 'updated', 'unchanged', 'deleted', 'skipped'}
+    """
+    ensure_schema(db)
+    stats = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0, 'skipped': 0}
+
+    with db.conn:
+        db.conn.execute("UPDATE ical_map SET seen = 0 WHERE source = ?", (source,))
+
+    vevents = iter_vevents(fp)
+    processed = 0
+    while True:
+        chunk = list(islice(vevents, chunk_size))
+        if not chunk:
+            break
+        parsed = {}
+        for vevent in chunk:
+            uid, event = vevent_to_event(vevent)
+            if event is None or not uid:
+                stats['skipped'] += 1
+                continue
+            parsed[uid] = event  # 同一文件中重复的 UID 以最后一个为准
+
+        # 查询已有映射、分配新 ID 和写入都在同一个写锁内：其他导入、程序、API 或同步可能同时在插入事件
+        db.conn.execute("BEGIN IMMEDIATE")
+        with db.conn:
+            archived = _import_chunk(db, parsed, source, stats)
+        # 映射到已归档事件的 UID 由 update_event 先移回主库再更新
+        for event_id, fields in archived:
+            db.update_event(event_id, fields)
+
+        processed += len(chunk)
+        if progress:
+            progress(processed)
+
+    if prune:
+        stale = [row['event_id'] for row in db.conn.execute(
+            "SELECT event_id FROM ical_map WHERE source = ? AND seen = 0", (source,)).fetchall()]
+        # 逐个经 delete_event 删除：已归档的事件和进度也一并删除
+        for event_id in stale:
+            stats['deleted'] += db.delete_event(event_id)
+        with db.conn:
+            db.conn.execute("DELETE FROM ical_map WHERE source = ? AND seen = 0", (source,))
+    return stats
+
+
+def _import_chunk(db, parsed, source, stats):
+    """
+    在调用方的事务中写入一块 VEVENT：{uid: 事件字典}
+    :return: 映射到已归档事件、不在主库中的更新 [(事件ID, 字段字典)]，由调用方在事务外处理
+    """
+    event_cols = ('id',) + SYNC_FIELDS + ('completed',)
+    insert_sql = (f"INSERT INTO events ({','.join(event_cols)}) "
+                  f"VALUES ({','.join(['?'] * len(event_cols))})")
+    update_sql = f"UPDATE events SET {','.join(f + '=?' for f in SYNC_FIELDS)} WHERE id=?"
+
+    # 只查询本块涉及的 UID
+    existing = {}
+    if parsed:
+        cursor = db.conn.execute(
+            f"SELECT uid, event_id, digest FROM ical_map WHERE uid IN ({','.join(['?'] * len(parsed))})",
+            list(parsed))
+        existing = {row['uid']: (row['event_id'], row['digest']) for row in cursor}
+    in_main = set()
+    if existing:
+        ids = [event_id for event_id, _ in existing.values()]
+        cursor = db.conn.execute(f"SELECT id FROM main.events WHERE id IN ({','.join(['?'] * len(ids))})", ids)
+        in_main = {row['id'] for row in cursor}
+
+    inserts, updates, archived, map_rows, seen = [], [], [], [], []
+    next_id = db.next_event_id()
+    for uid, event in parsed.items():
+        digest = _digest(event)
+        if uid in existing:
+            event_id, old_digest = existing[uid]
+            if old_digest == digest:
+                stats['unchanged'] += 1
+                seen.append((uid,))
+                continue
+            if event_id in in_main:
+                updates.append([event[f] for f in SYNC_FIELDS] + [event_id])
+            else:
+                archived.append((event_id, {f: event[f] for f in SYNC_FIELDS}))
+            stats['updated'] += 1
+        else:
+            event_id = next_id
+            next_id += 1
+            inserts.append([event_id] + [event[f] for f in SYNC_FIELDS] + [event['completed']])
+            stats['inserted'] += 1
+        map_rows.append((uid, event_id, source, digest))
+
+    if inserts:
+        db.conn.executemany(insert_sql, inserts)
+    if updates:
+        db.conn.executemany(update_sql, updates)
+    if map_rows:
+        db.conn.executemany(
+            "INSERT OR REPLACE INTO ical_map (uid, event_id, source, digest, seen) "
+            "VALUES (?, ?, ?, ?, 1)", map_rows)
+    if seen:
+        db.conn.executemany("UPDATE ical_map SET seen = 1 WHERE uid = ?", seen)
+    return archived
+
+
+# ---------- 导出 ----------
+def _escape(text):
+    return (text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _fold(line):
+    """按 RFC 5545 折行：每行不超过 75 个字节"""
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line + '\r\n'
+    out = []
+    limit = 75
+    while data:
+        cut = min(limit, len(data))
+        # 不在多字节字符中间截断
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        out.append(data[:cut].decode('utf-8'))
+        data = data[cut:]
+        limit = 74  # 续行开头有一个空格
+    return '\r\n '.join(out) + '\r\n'
+
+
+def _format_dt(date_str, time_str):
+    day = date_str.replace('-', '')
+    if time_str:
+        return f":{day}T{time_str.replace(':', '')[:4]}00"
+    return f";VALUE=DATE:{day}"
+
+
+def event_to_vevent(event, uid, stamp):
+    """把 events 行转换为 VEVENT 文本"""
+    lines = ["BEGIN:VEVENT", f"UID:{uid}", f"DTSTAMP:{stamp}",
+             "DTSTART" + _format_dt(event['start_date'], event['start_time'])]
+    end_date = event['end_date'] or event['start_date']
+    if event['start_time']:
+        if event['end_time']:
+            lines.append("DTEND" + _format_dt(end_date, event['end_time']))
+    else:
+        # 全天事件的 DTEND 为结束日期的下一天
+        after = datetime.strptime(end_date, "%Y-%m-%d").date() + timedelta(days=1)
+        lines.append("DTEND" + _format_dt(after.strftime("%Y-%m-%d"), None))
+    lines.append(f"SUMMARY:{_escape(event['title'])}")
+    if event['description']:
+        lines.append(f"DESCRIPTION:{_escape(event['description'])}")
+    rrule = rule_to_rrule(event['recurring_rule']) if event['is_recurring'] else None
+    if rrule:
+        lines.append(f"RRULE:{rrule}")
+    if event['completed']:
+        lines.append("X-TODO-COMPLETED:1")
+    lines.append("END:VEVENT")
+    return ''.join(_fold(line) for line in lines)
+
+
+def export_ics(db, fp, batch_size=1000, progress=None):
+    """
+    导出所有事件（包括已归档的）为 .ics，经 Database.iter_table 分批读取
+    导入过的事件沿用原 UID，其余生成 "todo-<id>@todo.local"
+    :return: 导出的事件数
+    """
+    ensure_schema(db)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    fp.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//todo//待办事项管理器//CN\r\n")
+    events = db.iter_table('events', batch_size)
+    count = 0
+    while True:
+        rows = list(islice(events, batch_size))
+        if not rows:
+            break
+        # 每批只查询本批事件的日历 UID（events.uid 是同步用的，不是日历 UID）
+        ids = [row['id'] for row in rows]
+        cursor = db.conn.execute(
+            f"SELECT event_id, uid FROM ical_map WHERE event_id IN ({','.join(['?'] * len(ids))})", ids)
+        ical_uids = {row['event_id']: row['uid'] for row in cursor}
+        for row in rows:
+            uid = ical_uids.get(row['id']) or f"todo-{row['id']}@todo.local"
+            fp.write(event_to_vevent(row, uid, stamp))
+            count += 1
+        if progress:
+            progress(count)
+    fp.write("END:VCALENDAR\r\n")
+    return count
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="iCalendar 导入/导出")
+    parser.add_argument('--db', default='todo.db', help="数据库文件路径")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_imp = sub.add_parser('import', help="导入 .ics（按 UID 增量更新）")
+    p_imp.add_argument('path')
+    p_imp.add_argument('--source', help="来源名称，默认为文件名")
+    p_imp.add_argument('--prune', action='store_true', help="删除该来源中已不存在的事件")
+
+    p_exp = sub.add_parser('export', help="导出所有事件为 .ics")
+    p_exp.add_argument('path')
+
+    args = parser.parse_args(argv)
+    with Database(args.db) as db:
+        if args.command == 'import':
+            source = args.source or os.path.basename(args.path)
+            with open(args.path, encoding='utf-8', newline='') as fp:
+                stats = import_ics(db, fp, source, prune=args.prune)
+            print(f"新增 {stats['inserted']}，更新 {stats['updated']}，未变化 {stats['unchanged']}，"
+                  f"删除 {stats['deleted']}，跳过 {stats['skipped']}")
+        else:
+            with open(args.path, 'w', encoding='utf-8', newline='') as fp:
+                count = export_ics(db, fp)
+            print(f"已导出 {count} 个事件", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
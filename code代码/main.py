@@ -1,27 +1,37 @@
-import os
-import warnings
-
-# 1. 隐藏 pygame 欢迎信息
-os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+import multiprocessing
+import sys
 
-# 忽略 pygame.pkgdata 模块中的 UserWarning（弃用警告）
-warnings.filterwarnings("ignore", category=UserWarning, module="pygame.pkgdata")
+from single_instance import SingleInstance, parse_command
 
+# 单实例检查放在导入 tkinter / pygame 之前：已有实例在运行时，转发命令后立即退出
+if __name__ == "__main__":
+    multiprocessing.freeze_support()    # 打包后统计报表的进程池需要
+    startup_command = parse_command(sys.argv[1:])
+    instance = SingleInstance()
+    if not instance.acquire():
+        if not instance.send(startup_command):
+            print("程序已在运行，但无法与其通信")
+        sys.exit(0)
 
 import tkinter as tk
-from tkinter import ttk , messagebox
+from tkinter import ttk
 import pystray
 from PIL import Image
 import threading
-from datetime import datetime
-import pygame
 from database import Database  # 导入数据库类
+from db_worker import DBWorker, deliver, use_dispatcher
+from dispatch import UiDispatcher
+from backup import BackupService
 from daily_view import DailyView
 from calendar_view import CalendarView
-from timer_view import TimerWindow,TimerView,TimerManager
+from agenda_view import AgendaView
+from heatmap_view import HeatmapView
+from stats_view import StatsView
+from timer_view import TimerWindow,TimerView,TimerManager,RenderClock
+from reminder import ReminderDispatcher, ReminderScheduler
+from audio import AudioService
 
 import ctypes
-import sys
 
 # 在Windows上启用DPI感知
 if sys.platform == 'win32':
@@ -46,11 +56,23 @@ class TodoApp:
         # ---- 美化设置 ----
         self.apply_styling()
 
+        # 界面线程的命令队列：托盘、单实例监听、数据库线程都经由它回到 Tk 线程
+        self.dispatcher = UiDispatcher(root).start()
+        use_dispatcher(self.dispatcher)
+
         # 初始化数据库
         self.db = Database()
+        # 后台数据库线程：界面上的查询都交给它执行，避免卡住窗口
+        self.db_worker = DBWorker(self.db.db_path)
+        # 定时在线备份（后台线程，每天一次，保留最近 7 份）
+        self.backup_service = BackupService(self.db.db_path)
+        self.backup_service.start()
 
         # 初始化计时管理器（单例）
         self.manager = TimerManager()
+        self.manager.db_path = self.db.db_path
+        # 本地 JSON API 服务（通过 --api 端口 启动）
+        self.api_server = None
 
         # 创建主标签页
         self.notebook = ttk.Notebook(root)
@@ -60,11 +82,20 @@ class TodoApp:
         self.create_tab_today()
         # 创建日历标签页
         self.create_tab_calendar()
+        # 创建周 / 日程标签页
+        self.create_tab_agenda()
+        # 创建年度热力图标签页
+        self.create_tab_heatmap()
+        # 创建统计标签页
+        self.create_tab_stats()
         # 创建计时器标签页
         self.create_tab_timer()
 
         # 设置窗口关闭协议（隐藏到托盘）
         self.root.protocol("WM_DELETE_WINDOW", self.hide_window)
+        # 最小化时暂停计时显示的刷新（<Map>/<Unmap> 对所有子部件都会触发，只处理根窗口）
+        self.root.bind("<Unmap>", lambda e: e.widget is self.root and RenderClock().suspend())
+        self.root.bind("<Map>", lambda e: e.widget is self.root and RenderClock().resume())
 
         # 创建系统托盘图标
         self.tray_icon = None
@@ -73,29 +104,15 @@ class TodoApp:
         # 设置计时管理器刷新今日视图的回调
         self.manager.refresh_daily_callback = self.daily_view.load_events
 
-        # 添加提醒相关属性
-        self.reminder_sound = "resources/reminder.mp3"  # 您的声音文件路径，请根据实际位置修改
-        if os.path.exists("resources/reminder.mp3") == True:
-            self.reminder_sound = "resources/reminder.mp3"
-        elif os.path.exists("resources/reminder.wav") == True:
-            self.reminder_sound = "resources/reminder.wav"
-        elif os.path.exists(r"C:\Windows\Media\Alarm01.wav") == True:
-            print("音频文件错误，请配置音频文件reminder.mp3到resources")
-            self.reminder_sound = r"C:\Windows\Media\Alarm01.wav"
-        else :
-            print("音频文件错误，请配置音频文件reminder.mp3到resources")
-
-        self.notified_events_today = set()  # 记录今天已经提醒过的事件ID，避免重复弹窗
-        self.last_check_date = datetime.now().strftime("%Y-%m-%d")  # 记录检查的日期，用于每日重置
-
-        # 初始化 pygame 混音器
-        try:
-            pygame.mixer.init()
-        except Exception as e:
-            print(f"初始化音频失败: {e}")
+        # 提醒声音服务：后台线程初始化混音器并预先解码默认声音（resources/reminder.mp3 等）
+        self.audio = AudioService().start()
+
+        # 提醒队列：同时到期的事项合并到一个窗口，声音只播放一次
+        self.reminders = ReminderDispatcher(self.root, self.play_reminder_sound, self.stop_reminder_sound)
 
-        # 启动提醒检查（每30秒检查一次）
-        self.start_reminder_check()
+        # 启动提醒检查（每30秒检查一次），今天的事件在后台查询
+        self.reminder_scheduler = ReminderScheduler(self.fetch_events_for_reminder, self.reminders.add)
+        self.reminder_scheduler.start()
 
     def apply_styling(self):
         """应用ttk样式和字体"""
@@ -129,18 +146,33 @@ class TodoApp:
     def create_tab_today(self):
         frame = ttk.Frame(self.notebook)
         self.notebook.add(frame, text="今日")
-        self.daily_view = DailyView(frame, self.db, self)  # 传入主应用实例
+        self.daily_view = DailyView(frame, self.db, self, self.db_worker)  # 传入主应用实例
 
     def create_tab_calendar(self):
         frame = ttk.Frame(self.notebook)
         self.notebook.add(frame, text="日历")
-        self.calendar_view = CalendarView(frame, self.db, self.set_daily_date)
+        self.calendar_view = CalendarView(frame, self.db, self.set_daily_date, self.db_worker)
+
+    def create_tab_agenda(self):
+        frame = ttk.Frame(self.notebook)
+        self.notebook.add(frame, text="周 / 日程")
+        self.agenda_view = AgendaView(frame, self.db, self.set_daily_date, self.db_worker)
+
+    def create_tab_heatmap(self):
+        frame = ttk.Frame(self.notebook)
+        self.notebook.add(frame, text="年度")
+        self.heatmap_view = HeatmapView(frame, self.db, self.set_daily_date, self.db_worker)
+
+    def create_tab_stats(self):
+        frame = ttk.Frame(self.notebook)
+        self.notebook.add(frame, text="统计")
+        self.stats_view = StatsView(frame, self.db, self.set_daily_date, self.db_worker)
 
     def create_tab_timer(self):
         frame = ttk.Frame(self.notebook)
         self.notebook.add(frame, text="计时器")
         # 传入 self.open_timer_for_event 作为回调，用于双击打开计时窗口
-        self.timer_view = TimerView(frame, self.db, self.open_timer_for_event)
+        self.timer_view = TimerView(frame, self.db, self.open_timer_for_event, self.db_worker)
 
     def open_timer_for_event(self, event_id):
         """根据事件ID打开计时窗口"""
@@ -149,9 +181,11 @@ class TodoApp:
     def create_tray_icon(self):
         """创建系统托盘图标"""
         image = Image.open("resources/icon.png")
+        # 菜单回调在托盘线程中执行，不能直接操作 Tk，交给命令队列
         menu = (
-            pystray.MenuItem("显示窗口", self.show_window, default=True),  # 设为默认项
-            pystray.MenuItem("退出", self.quit_app)
+            pystray.MenuItem("显示窗口", lambda: self.dispatcher.post(self.show_window, name="tray.show"),
+                             default=True),  # 设为默认项
+            pystray.MenuItem("退出", lambda: self.dispatcher.post(self.quit_app, name="tray.quit"))
         )
         self.tray_icon = pystray.Icon(
             "todo_manager",
@@ -163,14 +197,24 @@ class TodoApp:
 
     def hide_window(self):
         self.root.withdraw()
+        RenderClock().suspend()  # 隐藏到托盘后不再刷新计时显示（计时本身不受影响）
 
     def show_window(self):
         self.root.deiconify()
         self.root.lift()
+        RenderClock().resume()
 
     def quit_app(self):
         if self.tray_icon:
             self.tray_icon.stop()
+        self.db_worker.stop(wait=False)
+        self.stats_view.close()
+        self.backup_service.stop()
+        self.audio.close()
+        if self.api_server:
+            self.api_server.stop()
+        self.dispatcher.stop()
+        use_dispatcher(None)
         self.root.quit()
         self.root.destroy()
 
@@ -183,86 +227,75 @@ class TodoApp:
 
 
     def refresh_calendar(self):
-        """刷新日历视图"""
+        """刷新日历视图、周 / 日程视图、年度热力图和统计"""
         if hasattr(self, 'calendar_view'):
             self.calendar_view.draw_calendar()
+        if hasattr(self, 'agenda_view'):
+            self.agenda_view.refresh()
+        if hasattr(self, 'heatmap_view'):
+            self.heatmap_view.refresh()
+        if hasattr(self, 'stats_view'):
+            self.stats_view.refresh()
 
 
-    def start_reminder_check(self):
-        """启动定时检查提醒"""
-        self.check_reminders()
-        self.root.after(30000, self.start_reminder_check)
-
-    def check_reminders(self):
-        """检查是否有事件开始时间到达"""
-        today = datetime.now().strftime("%Y-%m-%d")
-        current_time = datetime.now().strftime("%H:%M")
-
-        # 如果日期变更，清空已提醒集合
-        if today != self.last_check_date:
-            self.notified_events_today.clear()
-            self.last_check_date = today
-
-        # 获取今天的所有事件
-        events = self.db.get_events_by_date(today)
-        for ev in events:
-            # 只检查未完成的事件，并且有开始时间
-            if ev['completed'] == 0 and ev['start_time']:
-                if ev['start_time'] == current_time:
-                    event_id = ev['id']
-                    if event_id not in self.notified_events_today:
-                        self.notified_events_today.add(event_id)
-                        self.show_reminder(ev['title'])
+    def fetch_events_for_reminder(self, date, callback):
+        """后台获取指定日期的所有事件，查询完成后在主线程中交给提醒检查"""
+        # 所有工作区的事项都在这一个进程里提醒
+        future = self.db_worker.call('get_events_by_date', date, Database.ALL_WORKSPACES)
+        deliver(self.root, future, callback)
 
     def show_reminder(self, title):
-        """显示提醒窗口并播放声音"""
-        # 先停止当前可能正在播放的音乐（避免重叠）
-        pygame.mixer.music.stop()
-
-        # 播放声音（异步）
-        if os.path.exists(self.reminder_sound):
-            try:
-                pygame.mixer.music.load(self.reminder_sound)
-                pygame.mixer.music.play()
-            except Exception as e:
-                print(f"播放声音失败: {e}")
-        else:
-            print(f"提醒声音文件不存在: {self.reminder_sound}")
-
-        # 创建提醒窗口
-        reminder = tk.Toplevel(self.root)
-        reminder.title("事项提醒")
-        reminder.geometry("300x150")
-        reminder.transient(self.root)
-        reminder.grab_set()
-
-        # 居中显示
-        reminder.update_idletasks()
-        x = self.root.winfo_rootx() + (self.root.winfo_width() - reminder.winfo_width()) // 2
-        y = self.root.winfo_rooty() + (self.root.winfo_height() - reminder.winfo_height()) // 2
-        reminder.geometry(f"+{x}+{y}")
-
-        ttk.Label(reminder, text="⏰ 时间到！", font=("微软雅黑", 12, "bold")).pack(pady=10)
-        ttk.Label(reminder, text=f"事项：{title}", wraplength=250).pack(pady=5)
-
-        def close_reminder():
-            """关闭窗口并停止音乐"""
-            pygame.mixer.music.stop()
-            reminder.destroy()
-
-        # “知道了”按钮停止音乐并关闭窗口
-        ttk.Button(reminder, text="知道了", command=close_reminder).pack(pady=10)
-
-        # 同时处理窗口的“X”关闭按钮
-        reminder.protocol("WM_DELETE_WINDOW", close_reminder)
-
-    def mark_event_as_notified(self, event_id):
-        """将事件ID加入已提醒集合，避免当天再次提醒"""
-        self.notified_events_today.add(event_id)
+        """显示一条临时提醒（与同时到期的其他提醒合并显示）"""
+        self.reminders.add(None, title)
+
+    def play_reminder_sound(self, event_ids=()):
+        """播放提醒声音（不阻塞界面）；本批中有事项设置了自定义声音时播放第一个"""
+        ids = [key for key in event_ids if isinstance(key, int)]
+        if not ids:
+            self.audio.play()
+            return
+        future = self.db_worker.call('get_event_sounds', ids)
+        deliver(self.root, future,
+                lambda sounds: self.audio.play(next((sounds[i] for i in ids if i in sounds), None)),
+                lambda e: self.audio.play())
+
+    def stop_reminder_sound(self):
+        """停止提醒声音"""
+        self.audio.stop()
+
+    def start_api(self, port):
+        """在后台线程中启动 JSON API 服务（已启动则忽略）"""
+        if self.api_server:
+            return
+        from api_server import ApiServer
+        try:
+            self.api_server = ApiServer(self.db.db_path, port=port, timer_provider=self.manager.snapshot,
+                                        metrics_provider=self.dispatcher.stats).start()
+        except OSError as e:
+            self.api_server = None
+            print(f"API 服务启动失败: {e}")
+
+    def handle_command(self, command):
+        """处理再次启动时转发过来的命令"""
+        if command.get('api_port'):
+            self.start_api(command['api_port'])
+        self.show_window()
+        action = command.get('action')
+        if action == 'open_date' and command.get('date'):
+            self.set_daily_date(command['date'])
+        elif action == 'start_timer' and command.get('event_id') is not None:
+            self.open_timer_for_event(int(command['event_id']))
+
+    def mark_event_as_notified(self, key):
+        """将事项（reminder.event_key）加入已提醒集合，避免当天再次提醒"""
+        self.reminder_scheduler.mark_notified(key)
 
 
 if __name__ == "__main__":
     root = tk.Tk()
     app = TodoApp(root)
+    instance.forward(lambda command: app.dispatcher.post(app.handle_command, command, name="instance.command"))
+    if startup_command['action'] != 'show' or startup_command.get('api_port'):
+        app.handle_command(startup_command)
 
     root.mainloop()
@@ -0,0 +1,28 @@
+"""
+数据库维护命令
+
+命令行用法：
+    python maintenance.py rebuild-summary [--from 2026-01-01] [--to 2026-12-31]
+"""
+from database import Database
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="待办事项数据库维护")
+    parser.add_argument('--db', default='todo.db', help="数据库文件路径")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_sum = sub.add_parser('rebuild-summary', help="根据事件和进度重新计算每日汇总表")
+    p_sum.add_argument('--from', dest='start', help="起始日期 YYYY-MM-DD，默认不限")
+    p_sum.add_argument('--to', dest='end', help="结束日期 YYYY-MM-DD，默认不限")
+
+    args = parser.parse_args(argv)
+    with Database(args.db) as db:
+        if args.command == 'rebuild-summary':
+            db.rebuild_daily_summary(args.start, args.end)
+            print("每日汇总已重建")
+
+
+if __name__ == '__main__':
+    main()
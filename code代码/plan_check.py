@@ -0,0 +1,254 @@
+"""
+查询计划回归检查：在生成的大数据量测试库上，对 Database 的每个公开查询方法执行 EXPLAIN QUERY PLAN
+
+每个方法实际执行的 SQL 通过 sqlite3 的 trace 回调收集（包括合并归档库时的 UNION ALL），
+再逐条取查询计划。以下情况判为失败，退出码为 1：
+- 热点查询（今日视图、日历月视图用到的）对 events / progress / daily_summary 全表扫描（SCAN）；
+- 任一查询的中位耗时超过预算；
+- Database 新增了 get_* / iter_* 查询方法但没有登记到 CASES 中。
+
+测试库覆盖今天前后约十一年、默认 5 万个事件（两成是多天项目，带进度），
+并把半年前已完成的事件归档，今天和两年前两个日期分别代表只查主库和合并归档库；
+另有两个工作区（各为主库事件数的五分之一），用于检查合并全部工作区的查询。
+耗时预算按默认规模在普通电脑上设定。
+
+命令行用法：
+    python plan_check.py [--events 50000] [--db plan_check.db] [--rebuild] [-v]
+测试库不存在或指定 --rebuild 时重新生成；不会在 todo.db 上运行。
+"""
+import inspect
+import os
+import random
+import re
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+from archive import archive_completed
+from database import Database
+
+# 热点查询不允许全表扫描的表
+WATCHED_TABLES = ('events', 'progress', 'daily_summary')
+
+# (方法名, 调用, 是否热点, 耗时预算毫秒)；调用参数取自场景 s（见 _scenarios）
+CASES = [
+    ('get_events_by_date', lambda db, s: db.get_events_by_date(s['date']), True, 3),
+    ('get_progress_for_date', lambda db, s: db.get_progress_for_date(s['date']), True, 3),
+    ('get_latest_progress_before_date',
+     lambda db, s: db.get_latest_progress_before_date(s['event_id'], s['date']), True, 0.5),
+    ('get_progress_for_event_and_date',
+     lambda db, s: db.get_progress_for_event_and_date(s['event_id'], s['date']), True, 0.5),
+    ('get_event_dates_in_range',  # 日历月视图
+     lambda db, s: db.get_event_dates_in_range(s['month_start'], s['month_end']), True, 1),
+    ('get_day_view', lambda db, s: db.get_day_view(s['date']), True, 10),
+    ('get_day_view', lambda db, s: db.get_day_view(s['date'], 'title', True), True, 10),
+    ('get_day_view', lambda db, s: db.get_day_view(s['date'], workspace=db.ALL_WORKSPACES), True, 15),
+    ('get_events_by_date', lambda db, s: db.get_events_by_date(s['date'], db.ALL_WORKSPACES), True, 5),
+    ('get_events_by_day',  # 周视图、日程视图
+     lambda db, s: db.get_events_by_day(s['month_start'], s['month_end']), True, 20),
+    ('get_events_by_day',
+     lambda db, s: db.get_events_by_day(s['month_start'], s['month_end'], db.ALL_WORKSPACES), True, 30),
+    ('get_event', lambda db, s: db.get_event(s['event_id']), False, 1),
+    ('get_progress_by_event', lambda db, s: db.get_progress_by_event(s['event_id']), False, 2),
+    ('get_progress_series', lambda db, s: db.get_progress_series(s['event_id']), False, 5),
+    ('get_event_sounds', lambda db, s: db.get_event_sounds([s['event_id']]), False, 1),
+    ('get_daily_summary', lambda db, s: db.get_daily_summary(s['year_start'], s['year_end']), False, 5),
+    ('iter_events_between',
+     lambda db, s: list(db.iter_events_between(s['month_start'], s['month_end'])), False, 50),
+    ('page_events', lambda db, s: db.page_events((s['month_start'], 0), 100), False, 5),
+    ('iter_events', lambda db, s: sum(1 for _ in db.iter_events({'start': s['month_start'], 'completed': 0})),
+     False, 200),
+    ('get_change_seq', lambda db, s: db.get_change_seq(), False, 1),
+    ('next_event_id', lambda db, s: db.next_event_id(), False, 1),
+    # 以下两个按设计读取整张表，只检查耗时
+    ('get_all_events', lambda db, s: db.get_all_events(), False, 1000),
+    ('iter_table', lambda db, s: sum(1 for _ in db.iter_table('events')), False, 500),
+]
+
+_SCAN = re.compile(r'^SCAN (?:\w+\.)?(\w+)')
+_TABLE_REF = re.compile(r'\b(?:FROM|JOIN)\s+(?:\w+\.)?(\w+)(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+_NOT_ALIAS = {'WHERE', 'LEFT', 'INNER', 'CROSS', 'JOIN', 'ON', 'USING', 'ORDER', 'GROUP', 'UNION', 'LIMIT'}
+
+
+WORKSPACES = ('ws1', 'ws2')
+
+
+def _workspace_path(path, name):
+    return path.replace('.db', f'_{name}.db')
+
+
+def build_fixture(path, n_events=50000, seed=1):
+    """生成测试库：事件分布在今天前十年到后一年，两成是 1~30 天的多天项目并带进度"""
+    files = [path, path + '-wal', path + '-shm', path.replace('.db', '_archive.db')]
+    files += [_workspace_path(path, name) for name in WORKSPACES]
+    for f in files:
+        if os.path.exists(f):
+            os.remove(f)
+    rng = random.Random(seed)
+    with Database(path) as db:
+        db.conn.execute("PRAGMA synchronous = OFF")
+        _fill(db, 'main', n_events, rng)
+        archive_completed(db, horizon_days=180)
+        for name in WORKSPACES:
+            db.add_workspace(name, _workspace_path(path, name))
+            _fill(db, f'ws_{name}', n_events // 5, rng)
+
+
+def _fill(db, schema, n_events, rng):
+    """向 schema 库写入随机事件和进度"""
+    today = date.today()
+    first = today - timedelta(days=3650)
+    old = today - timedelta(days=180)
+    events = []
+    for i in range(n_events):
+        start = first + timedelta(days=rng.randrange(3650 + 365))
+        end = start + timedelta(days=rng.randint(1, 30)) if rng.random() < 0.2 else None
+        completed = 1 if (end or start) < old and rng.random() < 0.8 else 0
+        events.append((f"事项{i}", start.isoformat(), end and end.isoformat(),
+                       f"{rng.randrange(24):02d}:{rng.choice((0, 15, 30, 45)):02d}", completed))
+    with db.conn:
+        db.conn.executemany(
+            f"INSERT INTO {schema}.events (title, start_date, end_date, start_time, completed) "
+            "VALUES (?, ?, ?, ?, ?)", events)
+    progress = []
+    for event_id, start, end in db.conn.execute(
+            f"SELECT id, start_date, end_date FROM {schema}.events WHERE end_date IS NOT NULL").fetchall():
+        days = (date.fromisoformat(end) - date.fromisoformat(start)).days + 1
+        for offset in sorted(rng.sample(range(days), days // 2)):
+            day = date.fromisoformat(start) + timedelta(days=offset)
+            progress.append((event_id, day.isoformat(), rng.randrange(101), 1))
+    with db.conn:
+        db.conn.executemany(
+            f"INSERT INTO {schema}.progress (event_id, date, value, completed) VALUES (?, ?, ?, ?)", progress)
+
+
+def _scenarios(db):
+    """两个查询场景：今天（只查主库）和两年前（合并归档库），各取一个覆盖该日的多天项目"""
+    today = date.today()
+    result = []
+    for name, day, schema in (("今天", today, 'main'), ("两年前", today - timedelta(days=730), 'archive')):
+        if schema == 'archive' and db._archive_until() is None:
+            continue
+        d = day.isoformat()
+        row = db.conn.execute(f'''
+            SELECT id FROM {schema}.events
+            WHERE end_date IS NOT NULL AND start_date <= ? AND end_date >= ? LIMIT 1
+        ''', (d, d)).fetchone()
+        month_end = (day.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+        result.append((name, {
+            'date': d,
+            'event_id': row[0] if row else 1,
+            'month_start': day.replace(day=1).isoformat(),
+            'month_end': month_end.isoformat(),
+            'year_start': f"{day.year}-01-01",
+            'year_end': f"{day.year}-12-31",
+        }))
+    return result
+
+
+def _trace(db, call):
+    """执行一次调用，返回其间执行的查询语句（已代入参数）"""
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        db.conn.set_trace_callback(None)
+    return [sql for sql in statements if sql.lstrip().upper().startswith(('SELECT', 'WITH'))]
+
+
+def _plan(db, sql):
+    # Python 3.11 之前 trace 回调收到的是未代入参数的 SQL，参数按 NULL 取计划
+    params = [None] * sql.count('?') if sys.version_info < (3, 11) else []
+    return [row[3] for row in db.conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def _scanned_tables(sql, plan):
+    """查询计划中被全表扫描的表（别名还原为表名）"""
+    names = {}
+    for table, alias in _TABLE_REF.findall(sql):
+        names[table] = table
+        if alias and alias.upper() not in _NOT_ALIAS:
+            names[alias] = table
+    tables = set()
+    for detail in plan:
+        match = _SCAN.match(detail)
+        if match:
+            tables.add(names.get(match.group(1), match.group(1)))
+    return tables
+
+
+def _median_ms(call, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
+
+
+def _uncovered_methods():
+    """Database 中没有登记到 CASES 的公开查询方法"""
+    covered = {name for name, *_ in CASES}
+    return sorted(name for name, _ in inspect.getmembers(Database, inspect.isfunction)
+                  if name.startswith(('get_', 'iter_')) and name not in covered)
+
+
+def check(db, repeat=5, verbose=False):
+    """
+    检查所有查询的计划和耗时
+    :return: 失败信息列表，为空表示全部通过
+    """
+    failures = [f"{name}: 未登记到 plan_check.CASES" for name in _uncovered_methods()]
+    for scenario, s in _scenarios(db):
+        print(f"\n== {scenario}（{s['date']}）==")
+        for name, func, hot, budget in CASES:
+            def call():
+                return func(db, s)
+            problems = []
+            for sql in _trace(db, call):
+                plan = _plan(db, sql)
+                scanned = _scanned_tables(sql, plan) & set(WATCHED_TABLES)
+                if hot and scanned:
+                    problems.append(f"全表扫描 {', '.join(sorted(scanned))}")
+                if verbose or (hot and scanned):
+                    print(f"  {' '.join(sql.split())[:160]}")
+                    for detail in plan:
+                        print(f"    {detail}")
+            elapsed = _median_ms(call, repeat)
+            if elapsed > budget:
+                problems.append(f"耗时 {elapsed:.2f} ms 超过预算 {budget} ms")
+            status = "失败" if problems else "通过"
+            print(f"{status}  {name:<34}{elapsed:9.2f} ms / {budget} ms{'  [热点]' if hot else ''}")
+            failures += [f"{scenario} {name}: {problem}" for problem in problems]
+    return failures
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="查询计划与耗时回归检查")
+    parser.add_argument('--db', default='plan_check.db', help="测试库文件路径")
+    parser.add_argument('--events', type=int, default=50000, help="生成测试库时的事件数")
+    parser.add_argument('--rebuild', action='store_true', help="重新生成测试库")
+    parser.add_argument('--repeat', type=int, default=5, help="每个查询计时的次数（取中位数）")
+    parser.add_argument('-v', '--verbose', action='store_true', help="打印所有查询的计划")
+    args = parser.parse_args(argv)
+    if os.path.abspath(args.db) == os.path.abspath('todo.db'):
+        sys.exit("请不要在 todo.db 上运行查询计划检查")
+
+    if args.rebuild or not os.path.exists(args.db):
+        print(f"生成测试库 {args.db}（{args.events} 个事件）…")
+        build_fixture(args.db, args.events)
+    with Database(args.db) as db:
+        failures = check(db, args.repeat, args.verbose)
+    if failures:
+        print(f"\n{len(failures)} 项检查失败：")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("\n全部通过")
+
+
+if __name__ == '__main__':
+    main()
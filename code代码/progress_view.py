@@ -0,0 +1,190 @@
+import tkinter as tk
+from tkinter import ttk
+from bisect import bisect_left
+from datetime import date
+
+from db_worker import deliver
+
+LEFT = 45     # 左侧纵轴标签宽度
+RIGHT = 15
+TOP = 15
+BOTTOM = 30   # 底部日期标签高度
+
+LINE_COLOR = "#3b7dd8"
+IDEAL_COLOR = "#bbbbbb"
+SUBMIT_COLOR = "#3b7dd8"
+TODAY_COLOR = "#e07b39"
+GRID_COLOR = "#eeeeee"
+
+
+def downsample(points, buckets):
+    """
+    把折线按横坐标分成 buckets 段，每段只保留首、尾和最小、最大值点（保持先后顺序）
+    跨越数年的项目也只绘制约 4 * buckets 个点，峰谷和阶梯形状不丢失
+    :param points: [(x, y), ...]，按 x 递增
+    :return: 新的点列表
+    """
+    if buckets <= 0 or len(points) <= 4 * buckets:
+        return points
+    result = []
+    size = len(points) / buckets
+    for b in range(buckets):
+        chunk = points[int(b * size):int((b + 1) * size)]
+        if not chunk:
+            continue
+        low = min(chunk, key=lambda p: p[1])
+        high = max(chunk, key=lambda p: p[1])
+        keep = {id(chunk[0]): chunk[0], id(low): low, id(high): high, id(chunk[-1]): chunk[-1]}
+        result.extend(sorted(keep.values(), key=lambda p: p[0]))
+    return result
+
+
+class ProgressWindow:
+    """多天项目的进度图：逐日进度折线（或剩余量燃尽图）与理想进度对比，悬停显示当天数值"""
+    def __init__(self, parent, worker, event_id, workspace=None):
+        self.worker = worker
+        self.event_id = event_id
+        self.workspace = workspace      # 事件所在的工作区，None 为默认
+        self.event = None
+        self.series = []        # [(日期, 数值, 当天是否提交), ...]
+        self.xs = []            # 每一天对应的横坐标（像素），用于悬停查找
+
+        self.window = tk.Toplevel(parent)
+        self.window.title("进度图")
+        self.window.geometry("720x420")
+
+        top_frame = ttk.Frame(self.window)
+        top_frame.pack(fill=tk.X, padx=5, pady=5)
+        self.title_label = ttk.Label(top_frame, text="", font=("Arial", 12, "bold"))
+        self.title_label.pack(side=tk.LEFT, padx=5)
+        self.loading_label = ttk.Label(top_frame, text="加载中…", foreground="gray")
+        self.loading_label.pack(side=tk.LEFT, padx=5)
+        self.mode_var = tk.StringVar(value="progress")
+        ttk.Radiobutton(top_frame, text="燃尽图", variable=self.mode_var, value="burndown",
+                        command=self.draw).pack(side=tk.RIGHT, padx=2)
+        ttk.Radiobutton(top_frame, text="进度", variable=self.mode_var, value="progress",
+                        command=self.draw).pack(side=tk.RIGHT, padx=2)
+        ttk.Button(top_frame, text="刷新", command=self.load).pack(side=tk.RIGHT, padx=5)
+
+        self.canvas = tk.Canvas(self.window, bg="white", highlightthickness=0)
+        self.canvas.pack(fill=tk.BOTH, expand=True, padx=5)
+        self.info_label = ttk.Label(self.window, text="")
+        self.info_label.pack(pady=5)
+
+        # 窗口大小变化时重绘（只重新计算坐标，不重新查询）
+        self.canvas.bind("<Configure>", lambda e: self.draw())
+        self.canvas.bind("<Motion>", self._on_motion)
+        self.load()
+
+    def load(self):
+        """后台读取进度序列（一次查询），完成后绘制"""
+        self.loading_label.config(text="加载中…")
+        future = self.worker.call('get_progress_series', self.event_id, workspace=self.workspace)
+        deliver(self.window, future, self._on_loaded)
+
+    def _on_loaded(self, result):
+        self.event, self.series = result
+        self.loading_label.config(text="")
+        if self.event is None:
+            self.title_label.config(text="事项不存在")
+            return
+        end = self.event['end_date'] or self.event['start_date']
+        self.title_label.config(text=f"{self.event['title']}（{self.event['start_date']} ~ {end}）")
+        if self.event['start_date'] > date.today().strftime("%Y-%m-%d"):
+            self.info_label.config(text=f"项目尚未开始（{self.event['start_date']} 开始）")
+        self.draw()
+
+    def _value(self, value):
+        """按当前模式换算纵坐标数值：进度为原值，燃尽图为剩余量 100 - 进度"""
+        if value is None:
+            return None
+        return 100 - value if self.mode_var.get() == "burndown" else value
+
+    def draw(self):
+        self.canvas.delete("all")
+        self.xs = []
+        if not self.event or not self.series:
+            return
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        if width < LEFT + RIGHT + 10 or height < TOP + BOTTOM + 10:
+            return
+        plot_w = width - LEFT - RIGHT
+        plot_h = height - TOP - BOTTOM
+
+        # 横轴覆盖整个项目期间（包括尚未到来的日期），便于与理想进度比较
+        n_days = len(self.series)
+        end_date = self.event['end_date'] or self.event['start_date']
+        start_date = self.series[0][0]
+        span = max(n_days - 1, self._days_between(start_date, end_date), 1)
+
+        values = [v for _, v, _ in self.series if v is not None]
+        top_value = max([100.0] + values)
+
+        def x_of(i):
+            return LEFT + plot_w * i / span
+
+        def y_of(v):
+            return TOP + plot_h * (1 - v / top_value)
+
+        # 网格与纵轴刻度
+        for pct in (0, 25, 50, 75, 100):
+            y = y_of(pct)
+            self.canvas.create_line(LEFT, y, LEFT + plot_w, y, fill=GRID_COLOR)
+            self.canvas.create_text(LEFT - 5, y, text=str(pct), anchor="e", font=("Arial", 8))
+        self.canvas.create_line(LEFT, TOP, LEFT, TOP + plot_h, LEFT + plot_w, TOP + plot_h, fill="#999999")
+
+        # 横轴日期刻度（最多约 6 个）
+        step = max(1, span // 6)
+        label_format = "%Y-%m" if span > 365 else "%m-%d"
+        for i in range(0, span + 1, step):
+            self.canvas.create_text(x_of(i), TOP + plot_h + 12,
+                                    text=self._date_after(start_date, i).strftime(label_format), font=("Arial", 8))
+
+        # 理想进度：项目期间从 0 均匀增长到 100（燃尽图为从 100 降到 0）
+        ideal_start, ideal_end = (100, 0) if self.mode_var.get() == "burndown" else (0, 100)
+        offset = self._days_between(start_date, self.event['start_date'])
+        self.canvas.create_line(x_of(offset), y_of(ideal_start), x_of(span), y_of(ideal_end),
+                                fill=IDEAL_COLOR, dash=(4, 3))
+
+        # 实际进度：降采样到每两个像素一段，整条折线只创建一个 Canvas 对象
+        self.xs = [x_of(i) for i in range(n_days)]
+        points = [(self.xs[i], y_of(self._value(v))) for i, (_, v, _) in enumerate(self.series) if v is not None]
+        points = downsample(points, plot_w // 2)
+        if len(points) >= 2:
+            self.canvas.create_line(*[c for p in points for c in p], fill=LINE_COLOR, width=2)
+        # 提交点较少时逐个标出
+        submits = [(self.xs[i], y_of(self._value(v))) for i, (_, v, s) in enumerate(self.series) if s]
+        if len(submits) <= plot_w // 6:
+            for x, y in submits:
+                self.canvas.create_oval(x - 2, y - 2, x + 2, y + 2, fill=SUBMIT_COLOR, outline="")
+
+        # 今天
+        today_index = self._days_between(start_date, date.today().strftime("%Y-%m-%d"))
+        if 0 <= today_index <= span:
+            x = x_of(today_index)
+            self.canvas.create_line(x, TOP, x, TOP + plot_h, fill=TODAY_COLOR, dash=(2, 2))
+
+    def _on_motion(self, event):
+        if not self.xs:
+            return
+        i = min(bisect_left(self.xs, event.x), len(self.xs) - 1)
+        if i > 0 and event.x - self.xs[i - 1] < self.xs[i] - event.x:
+            i -= 1
+        day, value, submitted = self.series[i]
+        if value is None:
+            text = f"{day}：尚未提交进度"
+        elif submitted:
+            text = f"{day}：已提交 {value}%"
+        else:
+            text = f"{day}：自动延续 {value}%"
+        self.info_label.config(text=text)
+
+    @staticmethod
+    def _days_between(a, b):
+        """两个 YYYY-MM-DD 日期相差的天数"""
+        return date.fromisoformat(b).toordinal() - date.fromisoformat(a).toordinal()
+
+    @staticmethod
+    def _date_after(start, days):
+        return date.fromordinal(date.fromisoformat(start).toordinal() + days)
@@ -0,0 +1,217 @@
+"""
+提醒：定时检查到点的事项（ReminderScheduler），并把同一时间（合并窗口内）到期的提醒放进同一个窗口
+
+很多事项同时到期时只弹出一个提醒窗口、只播放一次声音；窗口不抢占焦点（不使用 grab_set），
+可以逐项“稍后提醒”或“知道了”，全部处理完后窗口自动关闭并停止声音。
+"""
+import tkinter as tk
+from tkinter import ttk
+from datetime import datetime
+
+from clock import SystemClock
+
+
+def event_key(event_id, workspace=None):
+    """
+    提醒用的事项标识：默认工作区为事件 ID，其他工作区为 "工作区/ID"（各库的 ID 会重复）
+    """
+    return event_id if workspace is None else f"{workspace}/{event_id}"
+
+
+class ReminderScheduler:
+    """
+    每隔 interval_ms 检查一次开始时间等于当前分钟的未完成事项，交给 on_due
+    同一事项每天只提醒一次，日期变更（跨过零点）时重置
+    """
+    def __init__(self, fetch_events, on_due, clock=None, interval_ms=30000):
+        """
+        :param fetch_events: fetch_events(date, callback)，查询该日期的事件后以事件列表调用 callback（可以异步）
+        :param on_due: on_due(key, title, start_time)，事项到点时调用，key 见 event_key
+        :param clock: 时钟，默认 SystemClock
+        :param interval_ms: 检查间隔（毫秒），须小于一分钟才不会漏掉某一分钟
+        """
+        self.fetch_events = fetch_events
+        self.on_due = on_due
+        self.clock = clock or SystemClock()
+        self.interval_ms = interval_ms
+        self.notified_today = set()  # 今天已经提醒过的事项（event_key），避免重复弹窗
+        self.last_check_date = self.clock.now().strftime("%Y-%m-%d")  # 用于每日重置
+        self.after_id = None
+
+    def start(self):
+        """立即检查一次，之后定时检查"""
+        self.check()
+        self.after_id = self.clock.after(self.interval_ms, self.start)
+
+    def stop(self):
+        if self.after_id is not None:
+            self.clock.after_cancel(self.after_id)
+            self.after_id = None
+
+    def mark_notified(self, key):
+        """将事项（event_key）加入已提醒集合，当天不再提醒（如刚添加的、开始时间就是现在的事项）"""
+        self.notified_today.add(key)
+
+    def check(self):
+        """检查是否有事件开始时间到达"""
+        now = self.clock.now()
+        today = now.strftime("%Y-%m-%d")
+        current_time = now.strftime("%H:%M")
+
+        # 如果日期变更，清空已提醒集合
+        if today != self.last_check_date:
+            self.notified_today.clear()
+            self.last_check_date = today
+
+        self.fetch_events(today, lambda events: self._fire_due(events, current_time))
+
+    def _fire_due(self, events, current_time):
+        """对到达开始时间且未提醒过的事件调用 on_due"""
+        for ev in events:
+            # 只检查未完成的事件，并且有开始时间
+            if ev['completed'] == 0 and ev['start_time'] == current_time:
+                key = event_key(ev['id'], ev.get('workspace'))
+                if key not in self.notified_today:
+                    self.notified_today.add(key)
+                    self.on_due(key, ev['title'], ev['start_time'])
+
+
+class ReminderDispatcher:
+    def __init__(self, root, play_sound=None, stop_sound=None, coalesce_ms=1500, snooze_minutes=5):
+        """
+        :param root: Tk 根窗口
+        :param play_sound: 播放提醒声音的函数 play_sound(keys)，每批提醒调用一次，keys 为本批提醒的事件 ID
+        :param stop_sound: 停止声音的函数
+        :param coalesce_ms: 合并窗口（毫秒），此时间内到期的提醒合并显示
+        :param snooze_minutes: “稍后提醒”的分钟数
+        """
+        self.root = root
+        self.play_sound = play_sound
+        self.stop_sound = stop_sound
+        self.coalesce_ms = coalesce_ms
+        self.snooze_minutes = snooze_minutes
+        self.pending = []       # 等待合并显示的提醒 (key, 标题, 时间文字)
+        self.shown = {}         # 窗口中显示的提醒 key -> 列表项 ID
+        self.snoozed = {}       # 稍后提醒 key -> after ID
+        self._flush_id = None
+        self.window = None
+        self.header = None
+        self.tree = None
+        self._next_key = 0
+
+    def add(self, event_id, title, time_text=None):
+        """
+        加入一个到期的提醒
+        :param event_id: 事项标识 event_key（同一事项已在队列或窗口中时忽略），为空表示临时提醒
+        """
+        key = event_id if event_id is not None else self._new_key()
+        if key in self.shown or key in self.snoozed or any(item[0] == key for item in self.pending):
+            return
+        self.pending.append((key, title, time_text or datetime.now().strftime("%H:%M")))
+        if self._flush_id is None:
+            self._flush_id = self.root.after(self.coalesce_ms, self._flush)
+
+    def _new_key(self):
+        self._next_key += 1
+        return f"temp-{self._next_key}"
+
+    def _flush(self):
+        """合并窗口结束：把这一批提醒一起显示，声音只播放一次"""
+        self._flush_id = None
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+        if self.window is None:
+            self._create_window()
+        for key, title, time_text in batch:
+            self.shown[key] = self.tree.insert("", tk.END, values=(time_text, title))
+        self.tree.selection_set(self.shown[batch[0][0]])
+        self._update_header()
+        self.window.deiconify()
+        self.window.lift()
+        if self.play_sound:
+            self.play_sound([key for key, _, _ in batch])
+
+    def _create_window(self):
+        window = tk.Toplevel(self.root)
+        window.title("事项提醒")
+        window.geometry("360x260")
+        # 主窗口隐藏在托盘时不设置 transient，否则提醒窗口会跟着隐藏
+        if self.root.winfo_viewable():
+            window.transient(self.root)
+        window.attributes('-topmost', True)
+
+        self.header = ttk.Label(window, font=("微软雅黑", 12, "bold"))
+        self.header.pack(pady=(10, 5))
+
+        frame = ttk.Frame(window)
+        frame.pack(fill=tk.BOTH, expand=True, padx=10)
+        self.tree = ttk.Treeview(frame, columns=("time", "title"), show="headings", height=6)
+        self.tree.heading("time", text="时间")
+        self.tree.heading("title", text="事项")
+        self.tree.column("time", width=60, anchor=tk.CENTER)
+        self.tree.column("title", width=250)
+        scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        btn_frame = ttk.Frame(window)
+        btn_frame.pack(pady=10)
+        ttk.Button(btn_frame, text=f"稍后提醒（{self.snooze_minutes}分钟）",
+                   command=lambda: self.snooze(self._selected_keys())).pack(side=tk.LEFT, padx=2)
+        ttk.Button(btn_frame, text="知道了",
+                   command=lambda: self.dismiss(self._selected_keys())).pack(side=tk.LEFT, padx=2)
+        ttk.Button(btn_frame, text="全部知道了",
+                   command=lambda: self.dismiss(list(self.shown))).pack(side=tk.LEFT, padx=2)
+
+        # 窗口的“X”等同于全部知道了
+        window.protocol("WM_DELETE_WINDOW", lambda: self.dismiss(list(self.shown)))
+        self.window = window
+
+    def _selected_keys(self):
+        selected = set(self.tree.selection())
+        return [key for key, item in self.shown.items() if item in selected]
+
+    def _update_header(self):
+        self.header.config(text=f"⏰ 时间到！共 {len(self.shown)} 个事项")
+
+    def _remove(self, keys):
+        for key in keys:
+            item = self.shown.pop(key, None)
+            if item is not None:
+                self.tree.delete(item)
+        if self.shown:
+            self._update_header()
+            if not self.tree.selection():
+                self.tree.selection_set(next(iter(self.shown.values())))
+        else:
+            self.close()
+
+    def dismiss(self, keys):
+        """关闭指定提醒"""
+        self._remove(keys)
+
+    def snooze(self, keys):
+        """指定提醒在 snooze_minutes 分钟后重新加入队列"""
+        for key in keys:
+            if key not in self.shown:
+                continue
+            time_text, title = self.tree.item(self.shown[key], 'values')
+            self.snoozed[key] = self.root.after(
+                self.snooze_minutes * 60 * 1000, lambda k=key, t=title, tt=time_text: self._wake(k, t, tt))
+        self._remove(keys)
+
+    def _wake(self, key, title, time_text):
+        self.snoozed.pop(key, None)
+        self.add(key, title, time_text)
+
+    def close(self):
+        """关闭提醒窗口并停止声音（稍后提醒的项目不受影响）"""
+        if self.stop_sound:
+            self.stop_sound()
+        if self.window is not None:
+            self.window.destroy()
+        self.window = None
+        self.tree = None
+        self.shown.clear()
@@ -0,0 +1,166 @@
+"""
+单实例保护：同一用户只运行一个程序实例
+
+第一个实例持有锁文件，并在 127.0.0.1 的随机端口上监听；端口和随机口令写在
+端口文件中（仅当前用户可读）。再次启动时拿不到锁，就把命令（显示窗口、打开日期、
+开始计时）发送给正在运行的实例后立即退出。运行中的实例通过 forward 把收到的命令交给
+界面线程的命令队列（dispatch.UiDispatcher）。
+
+本模块只依赖标准库，main.py 在导入 tkinter / pygame 之前就可以完成转发。
+"""
+import json
+import os
+import queue
+import secrets
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+if sys.platform == 'win32':
+    import msvcrt
+else:
+    import fcntl
+
+
+def _default_dir():
+    return os.path.join(tempfile.gettempdir(), f"todo_manager_{os.environ.get('USERNAME') or os.environ.get('USER', '')}")
+
+
+class SingleInstance:
+    def __init__(self, name='todo_manager', lock_dir=None):
+        self.lock_dir = lock_dir or _default_dir()
+        self.lock_path = os.path.join(self.lock_dir, f"{name}.lock")
+        self.port_path = os.path.join(self.lock_dir, f"{name}.port")
+        self.commands = queue.Queue()   # 调用 forward 之前收到的命令
+        self._handler = None
+        self._handler_lock = threading.Lock()
+        self._lock_file = None
+        self._server = None
+        self._token = None
+
+    # ---------- 运行中的实例 ----------
+    def acquire(self):
+        """尝试成为唯一实例，成功后开始监听命令；已有实例在运行时返回 False"""
+        os.makedirs(self.lock_dir, exist_ok=True)
+        lock_file = open(self.lock_path, 'a+')
+        try:
+            if sys.platform == 'win32':
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file  # 保持打开，进程退出时系统自动释放锁
+
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.bind(('127.0.0.1', 0))
+        self._server.listen(5)
+        self._token = secrets.token_hex(16)
+        port = self._server.getsockname()[1]
+
+        tmp = self.port_path + '.tmp'
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as fp:
+            fp.write(f"{port} {self._token}")
+        os.replace(tmp, self.port_path)
+
+        threading.Thread(target=self._serve, name="single-instance", daemon=True).start()
+        return True
+
+    def _serve(self):
+        while True:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                return
+            with client:
+                client.settimeout(2)
+                try:
+                    data = client.makefile('rb').readline(64 * 1024)
+                    message = json.loads(data.decode('utf-8'))
+                except (OSError, ValueError):
+                    continue
+                # 本机任何进程都能连上端口：不是对象的 JSON 也要忽略，否则监听线程会异常退出
+                if not isinstance(message, dict) or message.get('token') != self._token:
+                    continue
+                command = message.get('command') or {'action': 'show'}
+                if not isinstance(command, dict):
+                    continue
+                with self._handler_lock:
+                    if self._handler:
+                        self._handler(command)
+                    else:
+                        self.commands.put(command)
+                try:
+                    client.sendall(b'ok\n')
+                except OSError:
+                    pass
+
+    def forward(self, handler):
+        """
+        之后收到的命令直接交给 handler(command)，此前已收到的一并转交
+        handler 在监听线程中调用，必须是线程安全的，如
+        lambda command: dispatcher.post(app.handle_command, command)
+        """
+        with self._handler_lock:
+            self._handler = handler
+            while True:
+                try:
+                    command = self.commands.get_nowait()
+                except queue.Empty:
+                    break
+                handler(command)
+
+    def close(self):
+        if self._server:
+            self._server.close()
+            self._server = None
+
+    # ---------- 再次启动的实例 ----------
+    def send(self, command, timeout=2.0):
+        """
+        把命令发送给正在运行的实例
+        对方可能刚启动还没写好端口文件，因此在 timeout 内重试
+        :return: 是否发送成功
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                with open(self.port_path) as fp:
+                    port, token = fp.read().split()
+                with socket.create_connection(('127.0.0.1', int(port)), timeout=1) as conn:
+                    payload = json.dumps({'token': token, 'command': command}) + '\n'
+                    conn.sendall(payload.encode('utf-8'))
+                    return conn.makefile('rb').readline().strip() == b'ok'
+            except (OSError, ValueError):
+                if time.monotonic() >= deadline:
+                    return False
+                time.sleep(0.05)
+
+
+def parse_command(argv):
+    """
+    把命令行参数转换为命令字典
+        main.py                 -> {'action': 'show'}
+        main.py --date 2026-02-18 -> {'action': 'open_date', 'date': '2026-02-18'}
+        main.py --timer 12      -> {'action': 'start_timer', 'event_id': 12}
+    指定 --api 端口时额外带上 'api_port'，运行中的实例据此启动 API 服务
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description="待办事项管理器")
+    parser.add_argument('--date', help="打开指定日期 (YYYY-MM-DD)")
+    parser.add_argument('--timer', type=int, metavar='EVENT_ID', help="为指定事件打开计时器")
+    parser.add_argument('--api', type=int, metavar='PORT', help="在本机指定端口启动 JSON API 服务")
+    args = parser.parse_args(argv)
+    if args.timer is not None:
+        command = {'action': 'start_timer', 'event_id': args.timer}
+    elif args.date:
+        command = {'action': 'open_date', 'date': args.date}
+    else:
+        command = {'action': 'show'}
+    if args.api:
+        command['api_port'] = args.api
+    return command
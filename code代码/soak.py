@@ -0,0 +1,264 @@
+"""
+长时间运行模拟：用虚拟时钟快进数周，检查提醒和计时器的行为以及内存增长
+
+在真实的数据库文件上运行提醒检查（ReminderScheduler，每 30 秒一次）和计时管理器（TimerManager），
+每天新增事项（包括 00:00 和 23:59 的，用于检查跨零点）、在白天随机修改 / 完成 / 删除事项，
+并启动若干倒计时（部分中途暂停）和正计时。每天结束后核对：
+- 应提醒而未提醒（漏提醒）、同一天重复提醒、不应提醒却提醒了的事项数；
+- 倒计时是否恰好在结束时刻完成（提前或推迟都记为错误），正计时的读数是否准确；
+并用 tracemalloc 报告第一天之后的内存增长。有任何错误时退出码为 1。
+
+命令行用法：
+    python soak.py [--days 14] [--events 30] [--timers 8] [--seed 1] [--db soak.db]
+不指定 --db 时在临时目录中建库，结束后删除。
+"""
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timedelta
+
+from clock import VirtualClock
+from database import Database
+from reminder import ReminderScheduler
+from timer_view import TimerManager
+
+# 模拟从前一天中午开始，第一次安排事项时就能覆盖第二天的零点
+START = datetime(2026, 2, 28, 12, 0, 17)
+# 修改、完成、删除事项时与其开始时间保持的距离，避免与同一分钟内的提醒检查竞争
+EDIT_MARGIN = timedelta(minutes=2)
+
+
+def _hhmm(minute):
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+class SoakRun:
+    def __init__(self, db_path, days=14, events_per_day=30, timers_per_day=8, seed=1):
+        self.days = days
+        self.events_per_day = events_per_day
+        self.timers_per_day = timers_per_day
+        self.rng = random.Random(seed)
+        self.clock = VirtualClock(START)
+        self.db = Database(db_path)
+        self.counts = Counter()
+        self.delivered = Counter()      # (日期, 事件ID) -> 提醒次数
+        self.completed_at = {}          # 事件ID -> 被标记完成的虚拟时间
+
+        self.scheduler = ReminderScheduler(self._fetch_events, self._on_due, self.clock)
+        self.manager = TimerManager()
+        self.manager.clock = self.clock
+        self.manager.db_path = db_path
+        self.manager.refresh_daily_callback = lambda: self.counts.update(['今日视图刷新'])
+        self.manager.register_callback(lambda: self.counts.update(['计时器视图通知']))
+
+    # ---------- 被测对象的回调 ----------
+    def _fetch_events(self, date, callback):
+        self.counts['提醒检查'] += 1
+        callback(self.db.get_events_by_date(date))
+
+    def _on_due(self, event_id, title, start_time):
+        now = self.clock.now()
+        key = (now.strftime("%Y-%m-%d"), event_id)
+        if self.delivered[key]:
+            self.counts['重复提醒'] += 1
+        if now.strftime("%H:%M") != start_time:
+            self.counts['提醒时间不符'] += 1
+        self.delivered[key] += 1
+        self.counts['提醒'] += 1
+
+    # ---------- 调度 ----------
+    def at(self, when, func):
+        """在虚拟时间 when 执行 func"""
+        delay = max(0, round((when - self.clock.now()).total_seconds() * 1000))
+        return self.clock.after(delay, func)
+
+    def plan_day(self, day):
+        """前一天中午安排 day 当天的事项、修改、计时和核对，并预约下一天的安排"""
+        date = day.strftime("%Y-%m-%d")
+        minutes = [0, 24 * 60 - 1] + [self.rng.randrange(24 * 60) for _ in range(self.events_per_day - 2)]
+        for i, minute in enumerate(minutes):
+            self.db.add_event({'title': f"{date} 事项{i}", 'start_date': date, 'start_time': _hhmm(minute)})
+        if day.toordinal() % 3 == 0:
+            # 多天项目：覆盖的每一天都应提醒
+            end = (day + timedelta(days=2)).strftime("%Y-%m-%d")
+            self.db.add_event({'title': f"{date} 多天项目", 'start_date': date, 'end_date': end,
+                               'start_time': _hhmm(self.rng.randrange(24 * 60))})
+
+        for _ in range(self.events_per_day):
+            self.at(day + timedelta(seconds=self.rng.randrange(86400)), lambda d=date: self.random_edit(d))
+        for i in range(self.timers_per_day):
+            event_id = self.db.add_event({'title': f"{date} 计时{i}", 'start_date': date})
+            when = day + timedelta(seconds=self.rng.randrange(80000))
+            if i % 4 == 3:
+                self.at(when, lambda e=event_id: self.start_stopwatch(e, self.rng.randint(1, 7200)))
+            else:
+                # 一部分倒计时时长相同且同时开始，检查同一时刻结束的多个任务
+                duration = 1500 if i % 4 == 2 else self.rng.randint(1, 5400)
+                pause = self.rng.choice([None, self.rng.randrange(duration)])
+                self.at(when, lambda e=event_id, d=duration, p=pause: self.start_countdown(e, d, p))
+
+        self.at(day + timedelta(days=1, minutes=10), lambda: self.audit_day(date))
+        next_day = day + timedelta(days=1)
+        if next_day < START + timedelta(days=self.days):
+            self.at(next_day - timedelta(hours=12), lambda: self.plan_day(next_day))
+
+    # ---------- 白天的随机操作 ----------
+    def random_edit(self, date):
+        now = self.clock.now()
+        if now.strftime("%Y-%m-%d") != date:
+            return
+
+        def editable(ev):
+            start = datetime.strptime(f"{date} {ev['start_time']}", "%Y-%m-%d %H:%M")
+            return start >= now + EDIT_MARGIN
+
+        events = [ev for ev in self.db.get_events_by_date(date)
+                  if ev['end_date'] is None and ev['start_time'] and not ev['completed']]
+        future = [ev for ev in events if editable(ev)]
+        later = (now + EDIT_MARGIN).hour * 60 + (now + EDIT_MARGIN).minute + 1
+        action = self.rng.choice(['move', 'complete', 'delete', 'add', 'retitle'])
+        if action == 'move' and future and later < 24 * 60 and (now + EDIT_MARGIN).date() == now.date():
+            ev = self.rng.choice(future)
+            self.db.update_event(ev['id'], {'start_time': _hhmm(self.rng.randrange(later, 24 * 60))})
+        elif action == 'complete' and events:
+            ev = self.rng.choice(events)
+            start = datetime.strptime(f"{date} {ev['start_time']}", "%Y-%m-%d %H:%M")
+            if not (start - EDIT_MARGIN < now < start + timedelta(minutes=1)):
+                self.db.update_event(ev['id'], {'completed': 1})
+                self.completed_at[ev['id']] = now
+        elif action == 'delete' and future:
+            self.db.delete_event(self.rng.choice(future)['id'])
+        elif action == 'add' and later < 24 * 60 and (now + EDIT_MARGIN).date() == now.date():
+            self.db.add_event({'title': f"{date} 临时事项", 'start_date': date,
+                               'start_time': _hhmm(self.rng.randrange(later, 24 * 60))})
+        elif action == 'retitle' and events:
+            ev = self.rng.choice(events)
+            self.db.update_event(ev['id'], {'title': ev['title'] + "*"})
+        else:
+            return
+        self.counts[f"操作:{action}"] += 1
+
+    def start_countdown(self, event_id, duration, pause_after=None, pause_for=600):
+        task = self.manager.add_task(event_id, 'countdown', duration)
+        task.running = True
+        self.counts['倒计时'] += 1
+        expected = self.clock.now() + timedelta(seconds=duration)
+        if pause_after is not None:
+            expected += timedelta(seconds=pause_for)
+            self.clock.after(pause_after * 1000, lambda: setattr(task, 'running', False))
+            self.clock.after((pause_after + pause_for) * 1000, lambda: setattr(task, 'running', True))
+        self.at(expected - timedelta(milliseconds=500), lambda: self._check_countdown(event_id, False))
+        self.at(expected + timedelta(milliseconds=500), lambda: self._check_countdown(event_id, True))
+
+    def _check_countdown(self, event_id, should_be_done):
+        done = event_id not in self.manager.tasks and self.db.get_event(event_id)['completed'] == 1
+        if done != should_be_done:
+            self.counts['倒计时提前完成' if done else '倒计时未按时完成'] += 1
+
+    def start_stopwatch(self, event_id, run_seconds):
+        task = self.manager.add_task(event_id, 'stopwatch', 0)
+        task.running = True
+        self.counts['正计时'] += 1
+
+        def finish():
+            # 运行 run_seconds 秒又半秒时，显示的整秒数应正好是 run_seconds
+            if task.seconds != run_seconds:
+                self.counts['正计时读数错误'] += 1
+            self.manager.complete_task(event_id)
+            if not self.db.get_event(event_id)['completed']:
+                self.counts['正计时完成失败'] += 1
+        self.clock.after(run_seconds * 1000 + 500, finish)
+
+    # ---------- 核对 ----------
+    def audit_day(self, date):
+        """当天结束后比较应提醒与实际提醒的事项"""
+        expected = set()
+        for ev in self.db.get_events_by_date(date):
+            if not ev['start_time']:
+                continue
+            start = datetime.strptime(f"{date} {ev['start_time']}", "%Y-%m-%d %H:%M")
+            completed_at = self.completed_at.get(ev['id'])
+            if not ev['completed'] or (completed_at and completed_at > start):
+                expected.add(ev['id'])
+        delivered = {event_id for (d, event_id) in self.delivered if d == date}
+        self.counts['漏提醒'] += len(expected - delivered)
+        self.counts['多余提醒'] += len(delivered - expected)
+        for key in [key for key in self.delivered if key[0] == date]:
+            del self.delivered[key]
+        print(f"{date}  应提醒 {len(expected):3d}  已提醒 {len(delivered):3d}  "
+              f"漏 {len(expected - delivered)}  多余 {len(delivered - expected)}  "
+              f"待执行定时 {self.clock.pending}")
+
+    # ---------- 运行 ----------
+    def run(self):
+        tracemalloc.start()
+        started = time.perf_counter()
+        self.scheduler.start()
+        self.plan_day(START.replace(hour=0, minute=0, second=0) + timedelta(days=1))
+
+        # 第一天结束后取内存基线，最后一天核对完后结束
+        self.clock.run_until(START + timedelta(days=2))
+        gc.collect()
+        baseline = tracemalloc.take_snapshot()
+        self.clock.run_until(START + timedelta(days=self.days + 1))
+        gc.collect()
+        final = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        self.report(baseline, final, time.perf_counter() - started)
+        self.db.close()
+        return self.failures()
+
+    def failures(self):
+        keys = ('漏提醒', '多余提醒', '重复提醒', '提醒时间不符', '倒计时提前完成', '倒计时未按时完成',
+                '正计时读数错误', '正计时完成失败')
+        failures = {key: self.counts[key] for key in keys if self.counts[key]}
+        if self.clock.errors:
+            failures['回调异常'] = self.clock.errors
+        return failures
+
+    def report(self, baseline, final, elapsed):
+        print(f"\n模拟 {self.days} 天用时 {elapsed:.1f} s，执行定时回调 {self.clock.calls} 次，"
+              f"回调异常 {self.clock.errors} 次{f'（最后一次: {self.clock.last_error!r}）' if self.clock.errors else ''}")
+        for key, value in sorted(self.counts.items()):
+            print(f"  {key:<12}{value:>8}")
+        print(f"  剩余定时 {self.clock.pending}，计时任务 {len(self.manager.tasks)}，"
+              f"结束时刻堆 {len(self.manager.deadlines)}，今日已提醒集合 {len(self.scheduler.notified_today)}")
+
+        stats = final.compare_to(baseline, 'lineno')
+        growth = sum(stat.size_diff for stat in stats)
+        print(f"\n第一天之后内存增长 {growth / 1024:.1f} KiB，增长最多的位置：")
+        for stat in stats[:5]:
+            print(f"  {stat}")
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="用虚拟时钟模拟长时间运行，检查提醒和计时器")
+    parser.add_argument('--days', type=int, default=14, help="模拟的天数")
+    parser.add_argument('--events', type=int, default=30, help="每天的事项数")
+    parser.add_argument('--timers', type=int, default=8, help="每天的计时数")
+    parser.add_argument('--seed', type=int, default=1, help="随机种子")
+    parser.add_argument('--db', help="数据库文件（会被清空），默认使用临时目录")
+    args = parser.parse_args(argv)
+    if args.db and os.path.abspath(args.db) == os.path.abspath('todo.db'):
+        sys.exit("请不要在 todo.db 上运行模拟")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.db or os.path.join(tmp, 'soak.db')
+        for path in (db_path, db_path + '-wal', db_path + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
+        failures = SoakRun(db_path, args.days, args.events, args.timers, args.seed).run()
+    if failures:
+        print("\n发现问题：" + "，".join(f"{key} {value}" for key, value in failures.items()))
+        sys.exit(1)
+    print("\n未发现问题")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+"""
+用时与完成情况统计：按日 / 周 / 月汇总用时、完成率，以及连续全部完成的天数
+
+全部在 SQL 中聚合（GROUP BY + 窗口函数），不在 Python 中遍历事件：
+- 用时：单天事件的 end_time - start_time（分钟，跨午夜按次日计），只统计已完成的事件，
+  计时器完成事件时会填入 end_time；多天项目的时间是每天的时段，不计入；
+- 完成率：取自每日汇总表 daily_summary（多天项目按覆盖的每一天计数）；
+- 连续天数：有事项的日子按日期排序，用两个 ROW_NUMBER 之差把连续全部完成的日子分成一段（岛屿问题），
+  没有事项的日子跳过，既不中断也不计入。
+已归档的事件仍计入统计；工作区的事件不计入（每日汇总只覆盖主库）。
+
+跨度超过一年的报表在独立进程中计算（见 StatsService），界面和数据库线程都不会被长时间占用；
+结果按日期范围缓存，Database.get_change_seq 变化后才重新计算。
+"""
+import concurrent.futures
+import multiprocessing
+from collections import OrderedDict
+from datetime import date
+
+from database import Database
+from db_worker import deliver
+
+HEAVY_DAYS = 366        # 跨度超过这么多天的报表交给独立进程计算
+
+# HH:MM 转为当天的分钟数
+_MINUTES = "(CAST(substr({0}, 1, 2) AS INTEGER) * 60 + CAST(substr({0}, 4, 2) AS INTEGER))"
+_HHMM = "'[0-2][0-9]:[0-5][0-9]'"
+
+# 各统计粒度的分组键：日为日期本身，周为该周周一，月为 YYYY-MM
+PERIODS = {
+    'day': "day",
+    'week': "date(day, '-' || ((CAST(strftime('%w', day) AS INTEGER) + 6) % 7) || ' days')",
+    'month': "substr(day, 1, 7)",
+}
+
+
+def _timed_events(db):
+    """已完成单天事件的用时（分钟），合并归档库"""
+    source = '''
+        SELECT start_date AS day,
+               ({end} - {start} + 1440) % 1440 AS minutes
+        FROM {schema}.events
+        WHERE start_date BETWEEN :start AND :end
+          AND (end_date IS NULL OR end_date = start_date)
+          AND completed != 0
+          AND start_time GLOB {hhmm} AND end_time GLOB {hhmm}
+    '''
+    schemas = ['main'] + (['archive'] if db._archive_until() is not None else [])
+    return " UNION ALL ".join(
+        source.format(schema=schema, hhmm=_HHMM,
+                      start=_MINUTES.format('start_time'), end=_MINUTES.format('end_time'))
+        for schema in schemas)
+
+
+def period_series(db, start, end, period='day'):
+    """
+    按粒度汇总用时和完成率
+    :param start: 起始日期 YYYY-MM-DD（含）
+    :param end: 结束日期 YYYY-MM-DD（含）
+    :param period: 'day' / 'week' / 'month'
+    :return: 字典列表，按时间段排序，每条包含 period（日期 / 周一日期 / YYYY-MM）, minutes, timed_events,
+             total, completed, rate（无事项时为 None）, cumulative_minutes（累计用时）；
+             按日统计时另有 avg7_minutes（近 7 天日均用时，没有记录的日子按 0 计）
+    """
+    key = PERIODS[period]
+    moving = ('''
+        , SUM(COALESCE(SUM(minutes), 0)) OVER (ORDER BY julianday(period)
+                                  RANGE BETWEEN 6 PRECEDING AND CURRENT ROW) / 7.0 AS avg7_minutes
+    ''' if period == 'day' else "")
+    cursor = db.conn.execute(f'''
+        WITH timed AS ({_timed_events(db)}),
+        facts AS (
+            SELECT day, minutes, 0 AS total, 0 AS completed FROM timed
+            UNION ALL
+            SELECT date, NULL, total, completed FROM daily_summary
+            WHERE date BETWEEN :start AND :end AND total > 0
+        )
+        SELECT period, COALESCE(SUM(minutes), 0) AS minutes, COUNT(minutes) AS timed_events,
+               SUM(total) AS total, SUM(completed) AS completed,
+               CASE WHEN SUM(total) > 0 THEN 1.0 * SUM(completed) / SUM(total) END AS rate,
+               SUM(COALESCE(SUM(minutes), 0)) OVER (ORDER BY period) AS cumulative_minutes
+               {moving}
+        FROM (SELECT {key} AS period, minutes, total, completed FROM facts)
+        GROUP BY period
+        ORDER BY period
+    ''', {'start': start, 'end': end})
+    return [dict(row) for row in cursor.fetchall()]
+
+
+def streaks(db, start, end):
+    """
+    连续全部完成的天数（有事项且全部完成的日子连成一段，没有事项的日子跳过）
+    :return: 字典，包含 longest, longest_start, longest_end（最长的一段，没有时为 0 / None）和
+             current（截至范围内最后一个有事项的日子的连续天数；该日是今天且尚未全部完成时从前一天算起）
+    """
+    rows = db.conn.execute('''
+        WITH days AS (
+            SELECT date, completed >= total AS done,
+                   ROW_NUMBER() OVER (ORDER BY date)
+                 - ROW_NUMBER() OVER (PARTITION BY completed >= total ORDER BY date) AS island
+            FROM daily_summary
+            WHERE date BETWEEN :start AND :end AND total > 0
+        )
+        SELECT done, COUNT(*) AS days, MIN(date) AS first, MAX(date) AS last
+        FROM days
+        GROUP BY done, island
+        ORDER BY last
+    ''', {'start': start, 'end': end}).fetchall()
+    runs = [row for row in rows if row['done']]
+    longest = max(runs, key=lambda row: row['days'], default=None)
+    current = 0
+    if rows:
+        tail = rows[-1]
+        if not tail['done'] and tail['days'] == 1 and tail['last'] == date.today().isoformat() and len(rows) > 1:
+            tail = rows[-2]     # 今天还没做完，不算中断
+        if tail['done']:
+            current = tail['days']
+    return {
+        'longest': longest['days'] if longest else 0,
+        'longest_start': longest['first'] if longest else None,
+        'longest_end': longest['last'] if longest else None,
+        'current': current,
+    }
+
+
+def build_report(db, start, end):
+    """
+    计算完整报表（同一个读事务内完成，各项与版本号一致）
+    :return: 字典，包含 version（数据版本号）, start, end, totals（minutes, timed_events, total, completed, rate）,
+             day / week / month（见 period_series）, streaks（见 streaks）
+    """
+    in_transaction = db.conn.in_transaction
+    if not in_transaction:
+        db.conn.execute("BEGIN")
+    try:
+        report = {'version': db.get_change_seq(), 'start': start, 'end': end}
+        for period in PERIODS:
+            report[period] = period_series(db, start, end, period)
+        report['streaks'] = streaks(db, start, end)
+    finally:
+        if not in_transaction:
+            db.conn.execute("COMMIT")
+    months = report['month']
+    total = sum(row['total'] for row in months)
+    completed = sum(row['completed'] for row in months)
+    report['totals'] = {
+        'minutes': sum(row['minutes'] for row in months),
+        'timed_events': sum(row['timed_events'] for row in months),
+        'total': total,
+        'completed': completed,
+        'rate': completed / total if total else None,
+    }
+    return report
+
+
+def report_in_process(db_path, start, end):
+    """在独立进程中计算报表（进程池的入口，自行打开数据库连接）"""
+    with Database(db_path, init_schema=False) as db:
+        return build_report(db, start, end)
+
+
+def is_heavy(start, end):
+    """跨度较大、需要放到独立进程中计算的报表"""
+    return (date.fromisoformat(end) - date.fromisoformat(start)).days > HEAVY_DAYS
+
+
+class StatsService:
+    """
+    报表计算与缓存
+    短范围在数据库线程中计算；跨度超过 HEAVY_DAYS 的交给进程池（首次使用时创建），
+    避免长时间占用界面依赖的数据库线程。缓存以 get_change_seq 为版本号，版本变化后重新计算。
+    """
+    def __init__(self, db_path, worker, max_reports=8):
+        self.db_path = db_path
+        self.worker = worker
+        self.max_reports = max_reports
+        self._reports = OrderedDict()   # (start, end) -> 报表，按最近使用排序
+        self._pool = None
+
+    def load(self, root, start, end, callback, errback=None):
+        """
+        读取报表，在 Tk 线程中调用 callback(报表)
+        先在数据库线程中取版本号，与缓存一致时直接使用缓存，否则重新计算
+        """
+        key = (start, end)
+
+        def on_version(version):
+            cached = self._reports.get(key)
+            if cached is not None and cached['version'] == version:
+                self._reports.move_to_end(key)
+                callback(cached)
+                return
+            deliver(root, self._compute(start, end), on_report, errback=errback)
+
+        def on_report(report):
+            self._reports[key] = report
+            self._reports.move_to_end(key)
+            while len(self._reports) > self.max_reports:
+                self._reports.popitem(last=False)
+            callback(report)
+
+        deliver(root, self.worker.call('get_change_seq'), on_version, errback=errback)
+
+    def _compute(self, start, end):
+        if not is_heavy(start, end):
+            return self.worker.submit(build_report, start, end)
+        if self._pool is None:
+            # 始终用 spawn：界面进程里有数据库、备份、API 等线程，fork 可能把它们持有的锁带进子进程
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+        return self._pool.submit(report_in_process, self.db_path, start, end)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,207 @@
+import tkinter as tk
+from tkinter import ttk
+from bisect import bisect_left
+from datetime import date, timedelta
+
+from progress_view import downsample
+from stats import StatsService, is_heavy
+
+# 统计范围：名称 -> 截至今天的天数
+RANGES = {"近 30 天": 30, "近 12 周": 84, "近一年": 365, "近三年": 365 * 3, "近十年": 3650}
+PERIOD_NAMES = {'day': "日", 'week': "周", 'month': "月"}
+
+LEFT = 45     # 左侧用时刻度宽度
+RIGHT = 40    # 右侧完成率刻度宽度
+TOP = 15
+BOTTOM = 30   # 底部日期标签高度
+
+BAR_COLOR = "#6cc06a"
+RATE_COLOR = "#3b7dd8"
+GRID_COLOR = "#eeeeee"
+
+
+def format_minutes(minutes):
+    hours, rest = divmod(int(minutes), 60)
+    return f"{hours} 小时 {rest} 分" if hours else f"{rest} 分"
+
+
+class StatsView:
+    """统计标签页：按日 / 周 / 月显示用时（柱状）和完成率（折线），以及连续全部完成的天数"""
+    def __init__(self, parent, db, app_callback, worker):
+        self.parent = parent
+        self.db = db
+        self.app_callback = app_callback  # 双击时间段时跳转到今日视图（该段第一天）
+        self.worker = worker
+        self.service = StatsService(db.db_path, worker)
+        self.report = None
+        self.rows = []            # 当前粒度的统计行
+        self.xs = []              # 每行对应的横坐标（像素），用于悬停查找
+        self._load_seq = 0
+
+        self.frame = ttk.Frame(parent)
+        self.frame.pack(fill=tk.BOTH, expand=True)
+
+        nav_frame = ttk.Frame(self.frame)
+        nav_frame.pack(fill=tk.X, padx=5, pady=5)
+        self.range_var = tk.StringVar(value="近 30 天")
+        range_box = ttk.Combobox(nav_frame, textvariable=self.range_var, values=list(RANGES),
+                                 state="readonly", width=10)
+        range_box.pack(side=tk.LEFT, padx=2)
+        range_box.bind("<<ComboboxSelected>>", lambda e: self.load())
+        self.period_var = tk.StringVar(value="day")
+        for period, name in PERIOD_NAMES.items():
+            ttk.Radiobutton(nav_frame, text=name, variable=self.period_var, value=period,
+                            command=self.draw).pack(side=tk.LEFT, padx=2)
+        self.loading_label = ttk.Label(nav_frame, text="", foreground="gray")
+        self.loading_label.pack(side=tk.LEFT, padx=5)
+        ttk.Button(nav_frame, text="刷新", command=self.load).pack(side=tk.RIGHT, padx=2)
+
+        summary_frame = ttk.Frame(self.frame)
+        summary_frame.pack(fill=tk.X, padx=10)
+        self.time_label = ttk.Label(summary_frame, text="")
+        self.time_label.pack(anchor="w")
+        self.rate_label = ttk.Label(summary_frame, text="")
+        self.rate_label.pack(anchor="w")
+        self.streak_label = ttk.Label(summary_frame, text="")
+        self.streak_label.pack(anchor="w")
+
+        self.canvas = tk.Canvas(self.frame, bg="white", highlightthickness=0)
+        self.canvas.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.info_label = ttk.Label(self.frame, text="")
+        self.info_label.pack(pady=(0, 5))
+
+        self.canvas.bind("<Configure>", lambda e: self.draw())
+        self.canvas.bind("<Motion>", self._on_motion)
+        self.canvas.bind("<Double-1>", self._on_double_click)
+        # 切换到本标签页时检查数据是否变化（版本号未变时直接用缓存）
+        self.frame.bind("<Map>", lambda e: self.load())
+
+    def _range(self):
+        today = date.today()
+        start = today - timedelta(days=RANGES[self.range_var.get()] - 1)
+        return start.strftime("%Y-%m-%d"), today.strftime("%Y-%m-%d")
+
+    def load(self):
+        """读取当前范围的报表：数据未变化时使用缓存，否则在后台（长范围在独立进程中）重新计算"""
+        self._load_seq += 1
+        seq = self._load_seq
+        start, end = self._range()
+        self.loading_label.config(text="计算中（后台进程）…" if is_heavy(start, end) else "计算中…")
+
+        def on_loaded(report):
+            if seq != self._load_seq:
+                return
+            self.loading_label.config(text="")
+            self.report = report
+            self._show_summary()
+            self.draw()
+
+        def on_error(exc):
+            if seq == self._load_seq:
+                self.loading_label.config(text=f"统计失败：{exc}")
+
+        self.service.load(self.frame, start, end, on_loaded, errback=on_error)
+
+    def refresh(self):
+        """数据可能已变化：只在本标签页可见时重新读取，否则等切换过来时再读"""
+        if self.frame.winfo_ismapped():
+            self.load()
+
+    def close(self):
+        self.service.close()
+
+    # ---------- 显示 ----------
+    def _show_summary(self):
+        totals = self.report['totals']
+        streaks = self.report['streaks']
+        self.time_label.config(
+            text=f"用时：{format_minutes(totals['minutes'])}（{totals['timed_events']} 个有起止时间的已完成事项）")
+        if totals['rate'] is None:
+            self.rate_label.config(text="完成率：无事项")
+        else:
+            self.rate_label.config(
+                text=f"完成率：{totals['rate']:.0%}（{totals['completed']}/{totals['total']}，多天项目按天计）")
+        longest = f"最长连续 {streaks['longest']} 天"
+        if streaks['longest']:
+            longest += f"（{streaks['longest_start']} ~ {streaks['longest_end']}）"
+        self.streak_label.config(text=f"当前连续全部完成 {streaks['current']} 天，{longest}")
+
+    def draw(self):
+        self.canvas.delete("all")
+        self.xs = []
+        self.rows = self.report[self.period_var.get()] if self.report else []
+        if not self.rows:
+            return
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        if width < LEFT + RIGHT + 10 or height < TOP + BOTTOM + 10:
+            return
+        plot_w = width - LEFT - RIGHT
+        plot_h = height - TOP - BOTTOM
+        n = len(self.rows)
+        top_minutes = max([60] + [row['minutes'] for row in self.rows])
+        slot = plot_w / n
+
+        def y_minutes(m):
+            return TOP + plot_h * (1 - m / top_minutes)
+
+        def y_rate(r):
+            return TOP + plot_h * (1 - r)
+
+        # 网格、左侧用时（小时）刻度、右侧完成率刻度
+        for i in range(5):
+            y = TOP + plot_h * i / 4
+            self.canvas.create_line(LEFT, y, LEFT + plot_w, y, fill=GRID_COLOR)
+            self.canvas.create_text(LEFT - 5, y, text=f"{top_minutes * (4 - i) / 4 / 60:.1f}h",
+                                    anchor="e", font=("Arial", 8))
+            self.canvas.create_text(LEFT + plot_w + 5, y, text=f"{(4 - i) * 25}%", anchor="w",
+                                    font=("Arial", 8), fill=RATE_COLOR)
+        self.canvas.create_line(LEFT, TOP, LEFT, TOP + plot_h, LEFT + plot_w, TOP + plot_h, fill="#999999")
+
+        self.xs = [LEFT + slot * (i + 0.5) for i in range(n)]
+        # 用时：时间段较少时画柱，太多时（如十年按日）改为降采样的折线
+        if slot >= 2:
+            half = max(slot * 0.35, 0.5)
+            for x, row in zip(self.xs, self.rows):
+                if row['minutes']:
+                    self.canvas.create_rectangle(x - half, y_minutes(row['minutes']), x + half, TOP + plot_h,
+                                                 fill=BAR_COLOR, outline="")
+        else:
+            points = downsample([(x, y_minutes(row['minutes'])) for x, row in zip(self.xs, self.rows)], plot_w // 2)
+            self.canvas.create_line(*[c for p in points for c in p], fill=BAR_COLOR)
+
+        # 完成率折线（没有事项的时间段跳过）
+        points = [(x, y_rate(row['rate'])) for x, row in zip(self.xs, self.rows) if row['rate'] is not None]
+        points = downsample(points, plot_w // 2)
+        if len(points) >= 2:
+            self.canvas.create_line(*[c for p in points for c in p], fill=RATE_COLOR, width=2)
+
+        # 横轴标签（最多约 6 个）
+        step = max(1, n // 6)
+        for i in range(0, n, step):
+            self.canvas.create_text(self.xs[i], TOP + plot_h + 12, text=self.rows[i]['period'], font=("Arial", 8))
+
+    def _row_index_at(self, x):
+        """离横坐标 x 最近的时间段"""
+        i = min(bisect_left(self.xs, x), len(self.xs) - 1)
+        if i > 0 and x - self.xs[i - 1] < self.xs[i] - x:
+            i -= 1
+        return i
+
+    def _on_motion(self, event):
+        if not self.xs:
+            return
+        row = self.rows[self._row_index_at(event.x)]
+        period = f"{row['period']} 起的一周" if self.period_var.get() == 'week' else row['period']
+        text = f"{period}：用时 {format_minutes(row['minutes'])}"
+        if row['rate'] is not None:
+            text += f"，完成 {row['completed']}/{row['total']}（{row['rate']:.0%}）"
+        if row.get('avg7_minutes') is not None:
+            text += f"，近 7 天日均 {format_minutes(row['avg7_minutes'])}"
+        self.info_label.config(text=text)
+
+    def _on_double_click(self, event):
+        if not self.xs or not self.app_callback:
+            return
+        period = self.rows[self._row_index_at(event.x)]['period']
+        self.app_callback(period if len(period) == 10 else f"{period}-01")
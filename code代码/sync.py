@@ -0,0 +1,255 @@
+"""
+多机增量同步（通过共享文件夹，如网盘同步目录）
+
+每台机器只追加写自己的日志文件 <节点ID>.jsonl，内容来自本地的 changes 变更日志；
+拉取时按记录的字节偏移只读取其他节点新增的行。同步开销只与编辑次数有关，
+与数据库大小无关。
+
+冲突处理：同一行（事件按 uid，进度按 事件uid|日期）以 (Lamport 时钟, 节点ID)
+较大者为准，各机器按同样的规则合并，结果一致。
+删除事件例外，优先于与之并发的修改：无论时钟大小都删除，此后对该 uid 的修改一律作废。
+否则修改胜出的节点上事件仍在，而在删除已生效的节点上，随事件一并删掉的进度不会再同步回来。
+各节点日志的读取顺序不定：进度所属的事件还没收到（在尚未读取的其他节点日志中）时，
+进度暂存在 sync_pending，每次拉取后重试，不会丢失。
+可以用 sync_check.py 检查多个节点随机修改后能否收敛。
+
+命令行用法：
+    python sync.py D:/网盘/todo-sync
+"""
+import json
+import os
+import sys
+from itertools import islice
+
+from database import Database
+
+EVENT_FIELDS = ('title', 'description', 'start_date', 'end_date', 'start_time', 'end_time',
+                'completed', 'is_recurring', 'recurring_rule')
+
+
+def ensure_schema(db):
+    """创建记录各节点日志读取位置的表和暂存表"""
+    with db.conn:
+        db.conn.execute('''
+            CREATE TABLE IF NOT EXISTS sync_peers (
+                node TEXT PRIMARY KEY,
+                offset INTEGER NOT NULL DEFAULT 0   -- 已读取到的字节位置
+            )
+        ''')
+        db.conn.execute('''
+            CREATE TABLE IF NOT EXISTS sync_pending (
+                id INTEGER PRIMARY KEY,
+                event_uid TEXT NOT NULL,            -- 等待的事件 uid
+                change TEXT NOT NULL                -- 暂存的进度变更（JSON）
+            )
+        ''')
+        db.conn.execute("CREATE INDEX IF NOT EXISTS idx_sync_pending_uid ON sync_pending(event_uid)")
+
+
+class SyncEngine:
+    def __init__(self, db, folder, batch_size=500):
+        self.db = db
+        self.folder = folder
+        self.batch_size = batch_size
+        ensure_schema(db)
+        os.makedirs(folder, exist_ok=True)
+
+    @property
+    def log_path(self):
+        return os.path.join(self.folder, f"{self.db.node_id}.jsonl")
+
+    def sync(self):
+        """推送本地变更并拉取其他节点的变更，返回 (推送数, 应用数)"""
+        return self.push(), self.pull()
+
+    # ---------- 推送 ----------
+    def push(self):
+        """把尚未导出的本地变更追加到本节点的日志文件"""
+        key = f"sync_exported:{self.db.node_id}"
+        row = self.db.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        exported = int(row[0]) if row else 0
+
+        cursor = self.db.conn.execute('''
+            SELECT seq, tbl, row_key, op, clock, node, payload FROM changes
+            WHERE seq > ? AND node = ?
+            ORDER BY seq
+        ''', (exported, self.db.node_id))
+        count = 0
+        with open(self.log_path, 'a', encoding='utf-8', newline='\n') as fp:
+            while True:
+                rows = cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    change = dict(row)
+                    change['payload'] = json.loads(change['payload']) if change['payload'] else None
+                    fp.write(json.dumps(change, ensure_ascii=False) + '\n')
+                    exported = row['seq']
+                    count += 1
+            fp.flush()
+            os.fsync(fp.fileno())
+        if count:
+            with self.db.conn:
+                self.db.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, exported))
+        return count
+
+    # ---------- 拉取 ----------
+    def pull(self):
+        """读取其他节点日志中的新增行并应用，返回实际生效的变更数"""
+        applied = 0
+        for name in sorted(os.listdir(self.folder)):
+            node, ext = os.path.splitext(name)
+            if ext != '.jsonl' or node == self.db.node_id:
+                continue
+            applied += self._pull_peer(node, os.path.join(self.folder, name))
+        return applied + self._retry_pending()
+
+    def _retry_pending(self):
+        """重试暂存的进度变更：所属事件已收到（或已确认删除）的，重新按规则应用并移出暂存表"""
+        rows = self.db.conn.execute('''
+            SELECT p.id, p.change FROM sync_pending p
+            WHERE EXISTS (SELECT 1 FROM row_versions v WHERE v.tbl = 'events' AND v.row_key = p.event_uid)
+            ORDER BY p.id
+        ''').fetchall()
+        applied = 0
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            applied += self._apply_batch([json.loads(row['change']) for row in batch],
+                                         resolved=[(row['id'],) for row in batch])
+        return applied
+
+    def _pull_peer(self, node, path):
+        row = self.db.conn.execute("SELECT offset FROM sync_peers WHERE node = ?", (node,)).fetchone()
+        offset = row[0] if row else 0
+        applied = 0
+        with open(path, 'rb') as fp:
+            fp.seek(offset)
+            lines = self._complete_lines(fp)
+            while True:
+                batch = list(islice(lines, self.batch_size))
+                if not batch:
+                    break
+                changes = [json.loads(line) for line in batch]
+                offset += sum(len(line) for line in batch)
+                applied += self._apply_batch(changes, node, offset)
+        return applied
+
+    @staticmethod
+    def _complete_lines(fp):
+        """只产出以换行结尾的完整行（对方可能正在写入最后一行）"""
+        for line in fp:
+            if not line.endswith(b'\n'):
+                return
+            yield line
+
+    def _apply_batch(self, changes, node=None, offset=None, resolved=()):
+        """
+        在一个事务中应用一批变更，并记录读取位置
+        :param node: 变更来自的节点，offset 为读取到的位置；重试暂存变更时为空
+        :param resolved: 本批重试的暂存记录 [(id,), ...]，应用后从暂存表删除
+        """
+        conn = self.db.conn
+        # 涉及的已归档事件先移回主库（搬移本身是独立事务，不能嵌套在下面的事务里）
+        for change in changes:
+            event_uid = change['row_key'] if change['tbl'] == 'events' else change['row_key'].split('|')[0]
+            self._unarchive_uid(event_uid)
+
+        applied = 0
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('sync_applying', '1')")
+            for change in changes:
+                if self._apply(change):
+                    applied += 1
+            if node is not None:
+                conn.execute("INSERT OR REPLACE INTO sync_peers (node, offset) VALUES (?, ?)", (node, offset))
+            conn.executemany("DELETE FROM sync_pending WHERE id = ?", resolved)
+            # 远端变更不写入本地 changes，单独计数，使 get_change_seq 作为数据版本号照样增加
+            conn.execute('''
+                INSERT INTO meta (key, value) VALUES ('sync_applied', ?)
+                ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + excluded.value
+            ''', (applied,))
+            conn.execute("DELETE FROM meta WHERE key = 'sync_applying'")
+        return applied
+
+    def _unarchive_uid(self, event_uid):
+        if self.db._archive_until() is None:
+            return
+        row = self.db.conn.execute("SELECT id FROM archive.events WHERE uid = ?", (event_uid,)).fetchone()
+        if row:
+            self.db.move_events([row[0]], to_archive=False)
+
+    def _apply(self, change):
+        """按“最后写入者胜”应用一条变更，返回是否生效"""
+        conn = self.db.conn
+        tbl, key, clock, node = change['tbl'], change['row_key'], change['clock'], change['node']
+        # Lamport 时钟：本地时钟追上远端，保证之后的本地修改排在其后
+        conn.execute('''
+            UPDATE meta SET value = MAX(CAST(value AS INTEGER), ?) WHERE key = 'lamport'
+        ''', (clock,))
+        current = conn.execute(
+            "SELECT clock, node FROM row_versions WHERE tbl = ? AND row_key = ?", (tbl, key)).fetchone()
+        newer = current is None or (current['clock'], current['node']) < (clock, node)
+
+        payload = change['payload']
+        if tbl == 'events':
+            row = conn.execute("SELECT id FROM events WHERE uid = ?", (key,)).fetchone()
+            if change['op'] == 'delete':
+                # 删除优先，不比较时钟（见模块说明）
+                if row is None and not newer:
+                    return False
+                if row:
+                    conn.execute("DELETE FROM progress WHERE event_id = ?", (row[0],))
+                    conn.execute("DELETE FROM events WHERE id = ?", (row[0],))
+            elif not newer:
+                return False
+            elif row:
+                conn.execute(f"UPDATE events SET {','.join(f + '=?' for f in EVENT_FIELDS)} WHERE id = ?",
+                             [payload[f] for f in EVENT_FIELDS] + [row[0]])
+            elif current:
+                # 有版本记录而本地没有这一行：事件已被删除（归档的已在 _apply_batch 中移回），修改作废
+                return False
+            else:
+                conn.execute(f"INSERT INTO events ({','.join(EVENT_FIELDS)}, uid) "
+                             f"VALUES ({','.join(['?'] * (len(EVENT_FIELDS) + 1))})",
+                             [payload[f] for f in EVENT_FIELDS] + [key])
+        elif not newer:
+            return False
+        else:
+            event_uid, date = key.split('|', 1)
+            row = conn.execute("SELECT id FROM events WHERE uid = ?", (event_uid,)).fetchone()
+            if row is None:
+                # 事件在本地已删除时进度无处可挂，直接丢弃；
+                # 从未见过这个事件时说明它在尚未读取的其他节点日志中，暂存到拉取后重试
+                known = conn.execute(
+                    "SELECT 1 FROM row_versions WHERE tbl = 'events' AND row_key = ?", (event_uid,)).fetchone()
+                if not known:
+                    conn.execute("INSERT INTO sync_pending (event_uid, change) VALUES (?, ?)",
+                                 (event_uid, json.dumps(change, ensure_ascii=False)))
+                return False
+            if change['op'] == 'delete':
+                conn.execute("DELETE FROM progress WHERE event_id = ? AND date = ?", (row[0], date))
+            else:
+                conn.execute('''
+                    INSERT INTO progress (event_id, date, value, completed) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(event_id, date) DO UPDATE SET value = excluded.value, completed = excluded.completed
+                ''', (row[0], date, payload['value'], payload['completed']))
+
+        if newer:
+            conn.execute("INSERT OR REPLACE INTO row_versions (tbl, row_key, clock, node) VALUES (?, ?, ?, ?)",
+                         (tbl, key, clock, node))
+        return True
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="通过共享文件夹在多台机器间增量同步")
+    parser.add_argument('folder', help="共享文件夹路径")
+    parser.add_argument('--db', default='todo.db', help="数据库文件路径")
+    args = parser.parse_args(argv)
+    with Database(args.db) as db:
+        pushed, applied = SyncEngine(db, args.folder).sync()
+        print(f"推送 {pushed} 条变更，应用 {applied} 条变更", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""
+同步收敛检查：几个节点通过同一个共享文件夹同步，随机增删改后检查各节点的数据是否一致
+
+先运行固定场景：一个节点删除带进度的事件，同步后另一个节点上的事件和进度都应被删除；
+再运行随机场景：每轮各节点随机新增 / 修改 / 完成 / 删除事件、填写进度，然后按随机顺序同步。
+最后所有节点再同步两遍，逐个核对：
+- 各节点的事件（按 uid）和进度（按 事件uid|日期）完全相同；
+- 没有所属事件已不存在的进度（孤立进度）；
+- 每日汇总与各自的事件、进度一致，且各节点相同。
+有任何不一致时退出码为 1。
+
+命令行用法：
+    python sync_check.py [--nodes 3] [--rounds 30] [--ops 20] [--seed 1] [-v]
+在临时目录中建库和共享文件夹，结束后删除。
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+from datetime import date, timedelta
+
+from database import Database
+from sync import EVENT_FIELDS, SyncEngine
+
+START = date(2026, 1, 5)
+DAYS = 14
+
+
+def _day(offset):
+    return (START + timedelta(days=offset)).strftime("%Y-%m-%d")
+
+
+def snapshot(db):
+    """节点数据的可比较形式：(事件, 进度, 每日汇总)"""
+    events = {row['uid']: tuple(row[f] for f in EVENT_FIELDS)
+              for row in db.conn.execute(f"SELECT uid, {','.join(EVENT_FIELDS)} FROM events")}
+    progress = {f"{row['uid']}|{row['date']}": (row['value'], row['completed'])
+                for row in db.conn.execute('''
+                    SELECT e.uid, p.date, p.value, p.completed
+                    FROM progress p JOIN events e ON e.id = p.event_id
+                ''')}
+    summary = {row['date']: (row['total'], row['completed'], row['progress_submitted'])
+               for row in db.get_daily_summary(_day(0), _day(DAYS))}
+    return events, progress, summary
+
+
+def check_node(name, db):
+    """单个节点内部的一致性，返回问题列表"""
+    problems = []
+    orphans = db.conn.execute('''
+        SELECT COUNT(*) FROM progress WHERE event_id NOT IN (SELECT id FROM events)
+    ''').fetchone()[0]
+    if orphans:
+        problems.append(f"{name}: {orphans} 条孤立进度")
+    stored = {row['date']: row for row in db.get_daily_summary(_day(0), _day(DAYS))}
+    for offset in range(DAYS + 1):
+        day = _day(offset)
+        total, completed = db.conn.execute('''
+            SELECT COUNT(*), COALESCE(SUM(completed != 0), 0) FROM events
+            WHERE start_date <= ? AND COALESCE(end_date, start_date) >= ?
+        ''', (day, day)).fetchone()
+        submitted = db.conn.execute("SELECT COUNT(*) FROM progress WHERE date = ?", (day,)).fetchone()[0]
+        row = stored.get(day)
+        actual = (row['total'], row['completed'], row['progress_submitted']) if row else (0, 0, 0)
+        if actual != (total, completed, submitted):
+            problems.append(f"{name}: {day} 每日汇总为 {actual}，实际为 {(total, completed, submitted)}")
+    return problems
+
+
+def compare(nodes, verbose=False):
+    """所有节点内部一致且彼此相同时返回空列表"""
+    problems = []
+    for name, db, _ in nodes:
+        problems += check_node(name, db)
+    base_name, base_db, _ = nodes[0]
+    base = snapshot(base_db)
+    for name, db, _ in nodes[1:]:
+        other = snapshot(db)
+        for label, mine, theirs in zip(("事件", "进度", "每日汇总"), base, other):
+            if mine != theirs:
+                diff = sorted(set(mine.items()) ^ set(theirs.items()))
+                problems.append(f"{base_name} 与 {name} 的{label}不同（{len(diff)} 处）")
+                if verbose:
+                    problems += [f"    {item}" for item in diff[:10]]
+    return problems
+
+
+def sync_all(nodes, rng=None):
+    order = list(nodes)
+    if rng:
+        rng.shuffle(order)
+    for _, _, engine in order:
+        engine.sync()
+
+
+def set_progress(db, event_id, day, value):
+    row = db.get_progress_for_event_and_date(event_id, day)
+    if row:
+        db.update_progress(row['id'], {'value': value})
+    else:
+        db.add_progress({'event_id': event_id, 'date': day, 'value': value})
+
+
+def scenario_delete(nodes):
+    """一个节点删除带进度的事件，其他节点同步后事件和进度都应删除"""
+    (_, first, _), (_, second, _) = nodes[0], nodes[1]
+    event_id = first.add_event({'title': "删除场景", 'start_date': _day(0), 'end_date': _day(3)})
+    for offset in range(3):
+        set_progress(first, event_id, _day(offset), offset + 1)
+    uid = first.conn.execute("SELECT uid FROM events WHERE id = ?", (event_id,)).fetchone()[0]
+    sync_all(nodes)
+    remote = second.conn.execute("SELECT id FROM events WHERE uid = ?", (uid,)).fetchone()
+    if remote is None:
+        return ["删除场景：事件没有同步到第二个节点"]
+    second.delete_event(remote[0])
+    sync_all(nodes)
+    sync_all(nodes)
+    problems = []
+    for name, db, _ in nodes:
+        if db.conn.execute("SELECT 1 FROM events WHERE uid = ?", (uid,)).fetchone():
+            problems.append(f"删除场景：{name} 上的事件没有删除")
+    return problems + compare(nodes)
+
+
+def random_ops(db, rng, count):
+    """在一个节点上随机修改 count 次"""
+    for _ in range(count):
+        events = db.conn.execute("SELECT id, start_date, end_date FROM events").fetchall()
+        action = rng.random()
+        if action < 0.3 or not events:
+            start = rng.randrange(DAYS)
+            end = min(DAYS, start + rng.choice((0, 0, 1, 3)))
+            db.add_event({'title': f"事项{rng.randrange(10000)}", 'start_date': _day(start), 'end_date': _day(end)})
+            continue
+        row = rng.choice(events)
+        event_id = row['id']
+        if action < 0.5:
+            db.update_event(event_id, {'title': f"改名{rng.randrange(10000)}"})
+        elif action < 0.65:
+            db.update_event(event_id, {'completed': rng.choice((0, 1))})
+        elif action < 0.8:
+            db.delete_event(event_id)
+        else:
+            first = date.fromisoformat(row['start_date'])
+            last = date.fromisoformat(row['end_date'] or row['start_date'])
+            day = first + timedelta(days=rng.randrange((last - first).days + 1))
+            set_progress(db, event_id, day.strftime("%Y-%m-%d"), rng.randrange(1, 10))
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="多节点同步收敛检查")
+    parser.add_argument('--nodes', type=int, default=3, help="节点数（至少 2）")
+    parser.add_argument('--rounds', type=int, default=30, help="随机修改的轮数")
+    parser.add_argument('--ops', type=int, default=20, help="每轮每个节点的修改次数")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('-v', '--verbose', action='store_true', help="列出不一致的行")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix="sync_check_")
+    folder = os.path.join(workdir, "shared")
+    nodes = []
+    try:
+        for i in range(max(2, args.nodes)):
+            db = Database(os.path.join(workdir, f"node{i}.db"))
+            nodes.append((f"节点{i}", db, SyncEngine(db, folder)))
+
+        problems = scenario_delete(nodes)
+        print(f"删除场景：{'通过' if not problems else '失败'}")
+        for _ in range(args.rounds):
+            for _, db, _ in nodes:
+                random_ops(db, rng, args.ops)
+            sync_all(nodes, rng)
+        sync_all(nodes)
+        sync_all(nodes)
+        random_problems = compare(nodes, args.verbose)
+        counts = "、".join(f"{name} {len(snapshot(db)[0])} 个事件" for name, db, _ in nodes)
+        print(f"随机场景：{'通过' if not random_problems else '失败'}（{counts}）")
+        problems += random_problems
+    finally:
+        for _, db, _ in nodes:
+            db.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for problem in problems:
+        print(problem)
+    print("全部通过" if not problems else f"{len(problems)} 项不一致")
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
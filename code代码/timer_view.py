@@ -1,7 +1,12 @@
 import tkinter as tk
 from tkinter import ttk , messagebox
-from datetime import datetime
+import heapq
+import itertools
+import math
 import sys
+import time
+from clock import SystemClock
+from db_worker import deliver
 
 if sys.platform == 'win32':
     font_family = '微软雅黑'
@@ -18,6 +23,77 @@ def center_window(reference, child):
     y = ref.winfo_rooty() + (ref.winfo_height() - child.winfo_height()) // 2
     child.geometry(f"+{x}+{y}")
 
+def format_seconds(total):
+    return f"{total // 3600:02d}:{(total % 3600) // 60:02d}:{total % 60:02d}"
+
+
+# ==================== 界面刷新时钟 ====================
+class RenderClock:
+    """
+    共享的界面刷新时钟（单例）
+    所有可见的计时显示订阅同一个时钟，在每个整秒边界统一刷新；
+    没有订阅者或主窗口隐藏（托盘、最小化）时不调度任何 after，空闲时不占 CPU
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.subscribers = []
+            cls._instance.after_id = None
+            cls._instance.suspended = False
+        return cls._instance
+
+    def subscribe(self, callback):
+        if callback not in self.subscribers:
+            self.subscribers.append(callback)
+        self._schedule()
+
+    def unsubscribe(self, callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+        if not self.subscribers:
+            self._cancel()
+
+    def suspend(self):
+        """主窗口隐藏时暂停刷新"""
+        self.suspended = True
+        self._cancel()
+
+    def resume(self):
+        """主窗口重新显示时立即刷新一次并恢复时钟"""
+        if not self.suspended:
+            return
+        self.suspended = False
+        if self.subscribers:
+            self._tick()
+
+    def _schedule(self):
+        root = tk._default_root
+        if self.after_id is None and self.subscribers and not self.suspended and root:
+            # 对齐到下一个整秒
+            delay = 1000 - int(time.time() * 1000) % 1000
+            self.after_id = root.after(delay, self._tick)
+
+    def _cancel(self):
+        if self.after_id is not None:
+            try:
+                tk._default_root.after_cancel(self.after_id)
+            except (tk.TclError, AttributeError):
+                pass
+            self.after_id = None
+
+    def _tick(self):
+        self.after_id = None
+        for callback in list(self.subscribers):
+            try:
+                callback()
+            except tk.TclError:
+                # 部件已销毁但没有退订
+                self.unsubscribe(callback)
+        self._schedule()
+
+
 # ==================== 计时器窗口 ====================
 class TimerWindow:
     def __init__(self, parent, db, event_id):
@@ -37,7 +113,7 @@ class TimerWindow:
         self.task = self.manager.get_task(event_id)
         if self.task and self.task.window:
             # 如果窗口已存在，激活它
-            self.task.window.lift()
+            self.task.window.window.lift()
             return
         elif not self.task:
             # 创建新任务（默认正向计时，初始0）
@@ -66,6 +142,9 @@ class TimerWindow:
 
         self.create_widgets()
         self.update_display()
+        # 由共享时钟每秒刷新显示，关闭窗口时退订
+        self.clock = RenderClock()
+        self.clock.subscribe(self.update_display)
 
     def create_widgets(self):
         # 标题
@@ -139,109 +218,206 @@ class TimerWindow:
             self.start_pause_btn.config(text="开始")
 
     def update_display(self):
-        hours = self.task.seconds // 3600
-        minutes = (self.task.seconds % 3600) // 60
-        seconds = self.task.seconds % 60
-        self.time_label.config(text=f"{hours:02d}:{minutes:02d}:{seconds:02d}")
-        # 每秒更新（通过 manager 的循环驱动，但窗口也需要定期刷新）
-        self.window.after(500, self.update_display)  # 每0.5秒刷新一次界面
+        self.time_label.config(text=format_seconds(self.task.seconds))
 
     def complete(self):
         self.manager.complete_task(self.event_id)
-        self.window.destroy()
+        self.close()
 
     def on_close(self):
         self.task.window = None
-        self.window.destroy()
+        self.close()
+
+    def close(self):
+        """退订刷新时钟并销毁窗口（计时结束时也由管理器调用）"""
+        self.clock.unsubscribe(self.update_display)
+        if self.window.winfo_exists():
+            self.window.destroy()
 
 
 class TimerTask:
-    """单个计时任务"""
-    def __init__(self, event_id, mode='stopwatch', initial_seconds=0):
+    """
+    单个计时任务
+    时间由时钟的单调时间戳计算，不依赖每秒的 after 回调：界面隐藏、
+    时钟暂停期间照常计时，正计时也不需要任何周期性工作
+    """
+    def __init__(self, event_id, mode='stopwatch', initial_seconds=0, clock=None):
         self.event_id = event_id
+        self.clock = clock or SystemClock()
         self.mode = mode          # 'stopwatch' 或 'countdown'
-        self.seconds = initial_seconds
-        self.running = False
+        self._base = initial_seconds  # 最近一次开始 / 暂停时的秒数
+        self._started = None      # 运行中时为开始时刻（clock.monotonic()），暂停时为 None
         self.window = None        # 关联的计时器窗口
+        self.on_change = None     # 开始、暂停或修改时间后的回调（由管理器设置）
+
+    def _exact(self):
+        if self._started is None:
+            return self._base
+        elapsed = self.clock.monotonic() - self._started
+        if self.mode == 'countdown':
+            return max(0, self._base - elapsed)
+        return self._base + elapsed
+
+    @property
+    def seconds(self):
+        """显示用的整秒数（倒计时向上取整，剩余不足一秒时仍显示 1）"""
+        value = self._exact()
+        return math.ceil(value) if self.mode == 'countdown' else int(value)
+
+    @seconds.setter
+    def seconds(self, value):
+        self._base = value
+        if self._started is not None:
+            self._started = self.clock.monotonic()
+        self._changed()
+
+    @property
+    def running(self):
+        return self._started is not None
+
+    @running.setter
+    def running(self, value):
+        if value and self._started is None:
+            self._started = self.clock.monotonic()
+        elif not value and self._started is not None:
+            self._base = self._exact()
+            self._started = None
+        else:
+            return
+        self._changed()
+
+    @property
+    def deadline(self):
+        """运行中的倒计时结束时刻（monotonic），其他情况为 None"""
+        if self._started is None or self.mode != 'countdown':
+            return None
+        return self._started + self._base
+
+    def _changed(self):
+        if self.on_change:
+            self.on_change(self)
+
 
 class TimerManager:
-    """全局计时管理器（单例）"""
+    """
+    全局计时管理器（单例）
+    运行中倒计时的结束时刻放在小顶堆中，只为最早的一个设置 after，到点时精确完成；
+    任务暂停、改时间或移除后旧的堆项不立即删除，出堆时发现与任务当前的结束时刻不符即丢弃。
+    正计时没有任何周期性工作，界面刷新由 RenderClock 负责
+    时间和定时回调来自 clock（默认 SystemClock），测试时可在添加任务前替换为 VirtualClock
+    """
     _instance = None
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
             cls._instance.tasks = {}
-            cls._instance.callbacks = []      # 界面更新回调（用于计时器视图）
+            cls._instance.callbacks = []      # 任务增减、开始 / 暂停时的回调（用于计时器视图）
+            cls._instance.deadlines = []      # 小顶堆 (结束时刻, 序号, 事件ID)
+            cls._instance._seq = itertools.count()
             cls._instance.after_id = None
+            cls._instance.armed_deadline = None  # 当前 after 对应的结束时刻
+            cls._instance._notify_pending = False
             cls._instance.refresh_daily_callback = None  # 刷新今日视图的回调
+            cls._instance.clock = SystemClock()
+            cls._instance.db_path = 'todo.db'     # 倒计时结束时标记事件完成所用的数据库
         return cls._instance
 
     def add_task(self, event_id, mode, initial_seconds):
         if event_id in self.tasks:
             return self.tasks[event_id]
-        task = TimerTask(event_id, mode, initial_seconds)
+        task = TimerTask(event_id, mode, initial_seconds, self.clock)
+        task.on_change = self._task_changed
         self.tasks[event_id] = task
-        self._start_updates()
+        self._task_changed(task)
         return task
 
     def remove_task(self, event_id):
-        if event_id in self.tasks:
-            del self.tasks[event_id]
-            if not self.tasks:
-                self._stop_updates()
+        task = self.tasks.pop(event_id, None)
+        if task:
+            task.on_change = None
+            self._task_changed()
 
     def get_task(self, event_id):
         return self.tasks.get(event_id)
 
-    def _start_updates(self):
-        if self.after_id is None:
-            self._update()
-
-    def _stop_updates(self):
-        if self.after_id:
-            import tkinter as tk
-            try:
-                tk._default_root.after_cancel(self.after_id)
-            except:
-                pass
-            self.after_id = None
+    def snapshot(self):
+        """当前所有计时任务的状态（字典列表），可在其他线程中读取，如 API 服务"""
+        return [{'event_id': task.event_id, 'mode': task.mode,
+                 'seconds': task.seconds, 'running': task.running}
+                for task in list(self.tasks.values())]
+
+    def _task_changed(self, task=None):
+        """任务增减或状态变化：登记新的结束时刻，重新设置定时，并通知计时器视图"""
+        if task is not None and task.deadline is not None:
+            heapq.heappush(self.deadlines, (task.deadline, next(self._seq), task.event_id))
+        self._arm()
+        self._notify()
+
+    def _is_current(self, entry):
+        task = self.tasks.get(entry[2])
+        return task is not None and task.deadline == entry[0]
+
+    def _arm(self):
+        """丢弃堆顶的过期项，为最早的结束时刻设置（或取消）after"""
+        while self.deadlines and not self._is_current(self.deadlines[0]):
+            heapq.heappop(self.deadlines)
+        deadline = self.deadlines[0][0] if self.deadlines else None
+        if deadline == self.armed_deadline:
+            return
+        self._cancel()
+        if deadline is not None:
+            delay = max(0, math.ceil((deadline - self.clock.monotonic()) * 1000))
+            self.after_id = self.clock.after(delay, self._expire)
+            if self.after_id is not None:
+                self.armed_deadline = deadline
+
+    def _cancel(self):
+        if self.after_id is not None:
+            self.clock.after_cancel(self.after_id)
+        self.after_id = None
+        self.armed_deadline = None
+
+    def _expire(self):
+        """完成所有已到结束时刻的倒计时（同一时刻结束的任务一起处理）"""
+        self.after_id = None
+        self.armed_deadline = None
+        now = self.clock.monotonic() + 0.001   # 容忍 after 的毫秒取整
+        while self.deadlines and self.deadlines[0][0] <= now:
+            entry = heapq.heappop(self.deadlines)
+            if self._is_current(entry):
+                self._complete_task(entry[2], auto=True)
+        self._arm()
+
+    def _notify(self):
+        """通知计时器视图；同一轮事件中的多次变化（如批量开始）合并为一次"""
+        if self._notify_pending:
+            return
+        self._notify_pending = True
+        if self.clock.after_idle(self._run_callbacks) is None:
+            self._run_callbacks()
 
-    def _update(self):
-        import tkinter as tk
-        for task in list(self.tasks.values()):
-            if task.running:
-                if task.mode == 'stopwatch':
-                    task.seconds += 1
-                else:  # countdown
-                    task.seconds -= 1
-                    if task.seconds <= 0:
-                        task.seconds = 0
-                        self._complete_task(task.event_id, auto=True)
-                        continue
-        # 通知计时器视图刷新
-        for cb in self.callbacks:
+    def _run_callbacks(self):
+        self._notify_pending = False
+        for cb in list(self.callbacks):
             try:
                 cb()
-            except:
+            except Exception:
                 pass
-        # 继续下一次更新
-        root = tk._default_root
-        if root and self.tasks:
-            self.after_id = root.after(1000, self._update)
-        else:
-            self.after_id = None
 
     def _complete_task(self, event_id, auto=False):
         from database import Database
-        db = Database()
-        event = db.get_event(event_id)
-        if event and not event['completed']:
-            update_data = {'completed': 1}
-            if not event.get('end_time'):
-                from datetime import datetime
-                update_data['end_time'] = datetime.now().strftime("%H:%M")
-            db.update_event(event_id, update_data)
+        # 数据库已由主程序初始化，这里只读写数据；用完即关闭连接
+        with Database(self.db_path, init_schema=False) as db:
+            event = db.get_event(event_id)
+            if event and not event['completed']:
+                update_data = {'completed': 1}
+                if not event.get('end_time'):
+                    update_data['end_time'] = self.clock.now().strftime("%H:%M")
+                db.update_event(event_id, update_data)
+        task = self.tasks.get(event_id)
+        if task and task.window:
+            task.window.close()
         self.remove_task(event_id)
         # 刷新今日视图
         if self.refresh_daily_callback:
@@ -260,10 +436,13 @@ class TimerManager:
             self.callbacks.remove(callback)
 
 class TimerView:
-    def __init__(self, parent, db, app_callback):
+    def __init__(self, parent, db, app_callback, worker):
         self.parent = parent
         self.db = db
         self.app_callback = app_callback  # 用于打开计时窗口
+        self.worker = worker              # 后台数据库线程
+        self.titles = {}                  # 事件ID -> 标题缓存，避免每秒查询数据库
+        self._pending_titles = set()      # 正在后台查询标题的事件ID
         self.manager = TimerManager()
         self.manager.register_callback(self.refresh_list)
 
@@ -284,6 +463,11 @@ class TimerView:
 
         self.tree.bind("<Double-1>", self.on_item_double_click)
 
+        # 标签页可见时才订阅刷新时钟（Notebook 切换标签页时对页面发送 Map / Unmap）
+        self.clock = RenderClock()
+        parent.bind("<Map>", self._on_map, add="+")
+        parent.bind("<Unmap>", lambda e: self.clock.unsubscribe(self.update_times), add="+")
+
         btn_frame = ttk.Frame(self.frame)
         btn_frame.pack(pady=5)
         ttk.Button(btn_frame, text="暂停/继续", command=self.toggle_selected).pack(side=tk.LEFT, padx=2)
@@ -302,17 +486,18 @@ class TimerView:
         for item in self.tree.get_children():
             self.tree.delete(item)
 
-        # 重新插入所有任务
+        # 重新插入所有任务（标题未缓存的先显示“加载中…”，后台查询完成后再刷新）
+        missing = []
         for event_id, task in self.manager.tasks.items():
-            event = self.db.get_event(event_id)
-            if not event:
-                continue
-            hours = task.seconds // 3600
-            minutes = (task.seconds % 3600) // 60
-            seconds = task.seconds % 60
-            time_str = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+            title = self.titles.get(event_id)
+            if title is None:
+                if event_id not in self._pending_titles:
+                    missing.append(event_id)
+                title = "加载中…"
             status = "运行中" if task.running else "暂停"
-            self.tree.insert("", tk.END, iid=event_id, values=(event['title'], time_str, status))
+            self.tree.insert("", tk.END, iid=event_id, values=(title, format_seconds(task.seconds), status))
+        if missing:
+            self._load_titles(missing)
 
         # 恢复选中（如果之前的选中项仍然存在）
         if selected_id and str(selected_id) in self.tree.get_children():
@@ -320,6 +505,34 @@ class TimerView:
             self.tree.focus(str(selected_id))  # 可选：将焦点移到该项
             self.tree.see(str(selected_id))  # 可选：滚动到可见区域
 
+    def _on_map(self, event):
+        self.refresh_list()
+        self.clock.subscribe(self.update_times)
+
+    def update_times(self):
+        """时钟每秒调用：只更新时间列，不重建列表"""
+        for event_id, task in list(self.manager.tasks.items()):
+            if self.tree.exists(event_id):
+                self.tree.set(event_id, "time", format_seconds(task.seconds))
+
+    def _load_titles(self, event_ids):
+        """后台查询事件标题并写入缓存"""
+        self._pending_titles.update(event_ids)
+
+        def query(db):
+            titles = {}
+            for event_id in event_ids:
+                event = db.get_event(event_id)
+                titles[event_id] = event['title'] if event else "（已删除）"
+            return titles
+
+        def done(titles):
+            self._pending_titles.difference_update(titles)
+            self.titles.update(titles)
+            self.refresh_list()
+
+        deliver(self.frame, self.worker.submit(query), done)
+
     def toggle_selected(self):
         selected = self.tree.selection()
         if not selected:
@@ -0,0 +1,239 @@
+"""
+待办事项命令行工具（不依赖 tkinter / pygame / pystray，可用于脚本批量操作）
+
+用法示例：
+    python todo_cli.py add "写周报" --date 2026-02-18 --time 14:00
+    python todo_cli.py add - < tasks.jsonl          # 标准输入批量添加，单个事务
+    python todo_cli.py list --date 2026-02-18
+    python todo_cli.py list --range 2026-01-01 2026-12-31 --json
+    python todo_cli.py complete 12
+    python todo_cli.py progress 7 60 --date 2026-02-19
+    python todo_cli.py export events events.csv     # .csv / .jsonl / .ics
+    python todo_cli.py import events.csv progress.jsonl
+    python todo_cli.py stats --range 2026-01-01 2026-12-31
+    python todo_cli.py workspace add 工作 work.db      # 登记工作区，主程序合并显示
+    python todo_cli.py list --workspace '*'          # 所有工作区合并列出
+
+批量添加时每行可以是 JSON 对象（字段同 events 表），或以制表符分隔的
+"标题<TAB>开始日期[<TAB>开始时间[<TAB>结束日期]]"。
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+from database import Database
+
+LIST_COLUMNS = ('id', 'start_date', 'end_date', 'start_time', 'end_time', 'completed', 'title', 'workspace')
+
+
+def _today():
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+def _write_event(ev, as_json, out):
+    if as_json:
+        out.write(json.dumps(ev, ensure_ascii=False) + '\n')
+    else:
+        out.write('\t'.join('' if ev.get(c) is None else str(ev[c]) for c in LIST_COLUMNS) + '\n')
+
+
+def _parse_stdin_line(line):
+    """把标准输入的一行解析为事件字典"""
+    if line.startswith('{'):
+        return json.loads(line)
+    fields = line.split('\t')
+    event = {'title': fields[0], 'start_date': fields[1] if len(fields) > 1 and fields[1] else _today()}
+    if len(fields) > 2 and fields[2]:
+        event['start_time'] = fields[2]
+    if len(fields) > 3 and fields[3]:
+        event['end_date'] = fields[3]
+    return event
+
+
+def cmd_add(db, args, out):
+    if args.title != '-':
+        event_id = db.add_event({
+            'title': args.title,
+            'description': args.desc,
+            'start_date': args.date or _today(),
+            'end_date': args.end_date,
+            'start_time': args.time,
+            'end_time': args.end_time,
+        }, args.workspace)
+        out.write(f"{event_id}\n")
+        return
+
+    # 批量：所有行在一个事务中插入（与单个添加一样写入 --workspace 指定的工作区）
+    def events():
+        for line in sys.stdin:
+            line = line.rstrip('\r\n')
+            if not line.strip():
+                continue
+            event = _parse_stdin_line(line)
+            if not event.get('title') or not event.get('start_date'):
+                raise ValueError(f"缺少必要字段 title/start_date: {line}")
+            yield event
+
+    count = db.add_events(events(), args.workspace)
+    out.write(f"已添加 {count} 个事项\n")
+
+
+def cmd_list(db, args, out):
+    if args.range:
+        if args.workspace is not None:
+            raise SystemExit("--range 只支持默认工作区")
+        events = db.iter_events_between(args.range[0], args.range[1])
+    else:
+        events = db.get_events_by_date(args.date or _today(), args.workspace)
+    if not args.json:
+        out.write('\t'.join(LIST_COLUMNS) + '\n')
+    for ev in events:
+        _write_event(ev, args.json, out)
+
+
+def cmd_complete(db, args, out):
+    event = db.get_event(args.event_id)
+    if not event:
+        raise SystemExit(f"事件不存在: {args.event_id}")
+    data = {'completed': 0 if args.undo else 1}
+    if not args.undo and not event.get('end_time'):
+        data['end_time'] = datetime.now().strftime("%H:%M")
+    db.update_event(args.event_id, data)
+
+
+def cmd_progress(db, args, out):
+    date = args.date or _today()
+    existing = db.get_progress_for_event_and_date(args.event_id, date)
+    if existing:
+        db.update_progress(existing['id'], {'value': args.value, 'completed': 1})
+    else:
+        db.add_progress({'event_id': args.event_id, 'date': date, 'value': args.value, 'completed': 1})
+
+
+def cmd_export(db, args, out):
+    if args.path.lower().endswith('.ics'):
+        import ical
+        with open(args.path, 'w', encoding='utf-8', newline='') as fp:
+            count = ical.export_ics(db, fp)
+    else:
+        import data_transfer
+        fmt = data_transfer.guess_format(args.path)
+        if args.path == '-':
+            count = data_transfer.export_table(db, args.table, out, 'json')
+        else:
+            with open(args.path, 'w', encoding='utf-8', newline='') as fp:
+                count = data_transfer.export_table(db, args.table, fp, fmt)
+    print(f"已导出 {count} 行", file=sys.stderr)
+
+
+def cmd_import(db, args, out):
+    if args.events.lower().endswith('.ics'):
+        import ical
+        with open(args.events, encoding='utf-8', newline='') as fp:
+            stats = ical.import_ics(db, fp, os.path.basename(args.events))
+        print(f"新增 {stats['inserted']}，更新 {stats['updated']}，未变化 {stats['unchanged']}", file=sys.stderr)
+        return
+    import data_transfer
+    with open(args.events, encoding='utf-8', newline='') as fp:
+        count = data_transfer.import_events(db, data_transfer.read_rows(fp, data_transfer.guess_format(args.events)))
+    print(f"已导入 {count} 个事件", file=sys.stderr)
+    if args.progress:
+        with open(args.progress, encoding='utf-8', newline='') as fp:
+            count = data_transfer.import_progress(
+                db, data_transfer.read_rows(fp, data_transfer.guess_format(args.progress)))
+        print(f"已导入 {count} 条进度", file=sys.stderr)
+
+
+def cmd_stats(db, args, out):
+    start, end = args.range or (_today(), _today())
+    row = db.conn.execute('''
+        SELECT COUNT(*) AS days, COALESCE(SUM(total), 0) AS total,
+               COALESCE(SUM(completed), 0) AS completed,
+               COALESCE(SUM(progress_submitted), 0) AS progress_submitted
+        FROM daily_summary WHERE date BETWEEN ? AND ? AND (total > 0 OR progress_submitted > 0)
+    ''', (start, end)).fetchone()
+    rate = row['completed'] / row['total'] * 100 if row['total'] else 0
+    out.write(f"范围\t{start} ~ {end}\n有事项的天数\t{row['days']}\n事项（按天计）\t{row['total']}\n"
+              f"已完成\t{row['completed']}\n完成率\t{rate:.1f}%\n进度提交\t{row['progress_submitted']}\n")
+
+
+def cmd_workspace(db, args, out):
+    if args.action != 'list' and not args.name:
+        raise SystemExit("请指定工作区名称")
+    if args.action == 'add':
+        if not args.path:
+            raise SystemExit("请指定工作区数据库文件路径")
+        db.add_workspace(args.name, args.path)
+    elif args.action == 'remove':
+        db.remove_workspace(args.name)
+    else:
+        for name, path in sorted(db.list_workspaces().items()):
+            out.write(f"{name}\t{path}\n")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='todo-cli', description="待办事项命令行工具")
+    parser.add_argument('--db', default='todo.db', help="数据库文件路径")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('add', help="添加事项；标题为 - 时从标准输入批量读取")
+    p.add_argument('title')
+    p.add_argument('--date', help="开始日期，默认今天")
+    p.add_argument('--end-date', help="结束日期（多天项目）")
+    p.add_argument('--time', help="开始时间 HH:MM")
+    p.add_argument('--end-time', help="结束时间 HH:MM")
+    p.add_argument('--desc', help="描述")
+    p.add_argument('--workspace', help="写入的工作区，默认为主库")
+    p.set_defaults(func=cmd_add)
+
+    p = sub.add_parser('list', help="列出事项")
+    group = p.add_mutually_exclusive_group()
+    group.add_argument('--date', help="日期，默认今天")
+    group.add_argument('--range', nargs=2, metavar=('START', 'END'), help="日期范围（流式输出）")
+    p.add_argument('--json', action='store_true', help="每行输出一个 JSON 对象")
+    p.add_argument('--workspace', help="工作区名称，* 表示合并全部，默认为主库")
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser('complete', help="标记完成")
+    p.add_argument('event_id', type=int)
+    p.add_argument('--undo', action='store_true', help="改回未完成")
+    p.set_defaults(func=cmd_complete)
+
+    p = sub.add_parser('progress', help="提交多天项目的进度")
+    p.add_argument('event_id', type=int)
+    p.add_argument('value', type=float)
+    p.add_argument('--date', help="日期，默认今天")
+    p.set_defaults(func=cmd_progress)
+
+    p = sub.add_parser('export', help="导出 events / progress（.csv、.jsonl 或 .ics）")
+    p.add_argument('table', choices=('events', 'progress'))
+    p.add_argument('path', help="输出文件，- 表示标准输出")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser('import', help="导入事件（及进度）文件")
+    p.add_argument('events')
+    p.add_argument('progress', nargs='?')
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser('stats', help="统计完成情况")
+    p.add_argument('--range', nargs=2, metavar=('START', 'END'), help="日期范围，默认今天")
+    p.set_defaults(func=cmd_stats)
+
+    p = sub.add_parser('workspace', help="管理工作区（其他待办数据库文件，与主库一起附加、合并显示）")
+    p.add_argument('action', choices=('list', 'add', 'remove'))
+    p.add_argument('name', nargs='?', help="工作区名称（字母、数字、汉字、下划线）")
+    p.add_argument('path', nargs='?', help="add 时的数据库文件路径，不存在时创建")
+    p.set_defaults(func=cmd_workspace)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    with Database(args.db) as db:
+        args.func(db, args, sys.stdout)
+
+
+if __name__ == '__main__':
+    main()